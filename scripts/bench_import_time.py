@@ -0,0 +1,86 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+# Modules that lightweight entry points must never pull in.
+HEAVY_MODULES = ["torch", "transformers", "matplotlib", "seaborn", "openai", "anthropic"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(module: str, root: Path) -> dict:
+    """
+    Import `module` in a fresh interpreter and report wall time and which
+    heavy modules got loaded along the way.
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{root / 'src'}{os.pathsep}{env.get('PYTHONPATH', '')}"
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Fail if importing a lightweight normsense module is too slow."
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=[
+            "normsense.analysis.aggregate",
+            "normsense.analysis.errors",
+            "normsense.analysis.plots",
+            "normsense.scoring.judge_model",
+            "normsense.models.registry",
+        ],
+    )
+    parser.add_argument("--budget", type=float, default=1.5, help="seconds per import")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module (best is kept)")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    failures = []
+
+    for module in args.modules:
+        runs = [measure_import(module, root) for _ in range(args.repeat)]
+        best = min(r["seconds"] for r in runs)
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+
+        status = "OK"
+        if best > args.budget:
+            status = "SLOW"
+            failures.append(f"{module} took {best:.3f}s (budget {args.budget:.3f}s)")
+        if heavy:
+            status = "HEAVY"
+            failures.append(f"{module} imported {heavy}")
+        print(f"[{status}] import {module}: {best:.3f}s")
+
+    if failures:
+        print("\nImport-time check failed:")
+        for msg in failures:
+            print(f"  - {msg}")
+        sys.exit(1)
+
+    print("\nAll imports within budget.")
+
+
+if __name__ == "__main__":
+    main()
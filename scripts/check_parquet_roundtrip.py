@@ -0,0 +1,109 @@
+from __future__ import annotations
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from normsense.storage.files import iter_jsonl
+from normsense.storage.parquet import ParquetRecordWriter
+from normsense.storage.records import iter_records
+from normsense.storage.results_store import ResultsStore
+from normsense.storage.writer import RecordWriter
+
+# Round-trip check for Parquet storage (needs pyarrow).
+#
+# Synthetic Phase 2 / Phase 3 records are written as JSONL, converted to a
+# Parquet dataset, read back with iter_records() and ingested into a results
+# store. Both formats must give the same records and the same aggregates.
+
+MODELS = ["model_a", "model_b"]
+VARIANTS = ["neutral", "empathy_primed"]
+DIMENSIONS = ["politeness", "empathy", "contextual_fit", "overall"]
+
+
+def make_records(num_scenarios: int, seed: int):
+    rng = np.random.default_rng(seed)
+    responses, scores = [], []
+    for s in range(num_scenarios):
+        for model in MODELS:
+            for variant in VARIANTS:
+                key = {
+                    "scenario_id": f"SC{s:03d}",
+                    "scenario_domain": "workplace" if s % 2 else "personal",
+                    "scenario_norm_type": "empathy",
+                    "scenario_cultural_tag": "Global",
+                    "scenario_stakes_level": "low",
+                    "model_name": model,
+                    "prompt_variant": variant,
+                }
+                responses.append({
+                    **key,
+                    "scenario_prompt_source": "original",
+                    "system_prompt": "sys",
+                    "user_prompt": f"prompt {s}",
+                    "response_text": f"response {s} {model} {variant}",
+                    "raw": {"tokens": int(rng.integers(10, 100))},
+                    "timestamp": 1.0 + s,
+                })
+                if rng.random() < 0.1:
+                    score = {"error": "judge output was not JSON"}
+                else:
+                    score = {dim: float(rng.integers(1, 6)) for dim in DIMENSIONS}
+                    score["rationale"] = "ok"
+                scores.append({**key, "scores": score, "timestamp": 2.0 + s})
+    return responses, scores
+
+
+def _key(record):
+    return (record["scenario_id"], record["model_name"], record["prompt_variant"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the JSONL -> Parquet -> results store round trip.")
+    parser.add_argument("--scenarios", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    responses, scores = make_records(args.scenarios, args.seed)
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for kind, records in (("responses", responses), ("scores", scores)):
+            jsonl_path = tmp / f"{kind}.jsonl"
+            parquet_path = tmp / f"{kind}.parquet"
+            with RecordWriter(jsonl_path) as writer:
+                for record in records:
+                    writer.write(record)
+            with ParquetRecordWriter(parquet_path, kind=kind) as writer:
+                writer.write_many(iter_jsonl(jsonl_path))
+
+            from_jsonl = sorted(iter_jsonl(jsonl_path), key=_key)
+            from_parquet = sorted(iter_records(parquet_path), key=_key)
+            same = from_jsonl == from_parquet
+            print(f"{kind:<10} {len(from_parquet)} records read back: {'ok' if same else 'FAIL'}")
+            if not same:
+                failed.append(f"{kind} records")
+
+        with ResultsStore(tmp / "store.sqlite") as store:
+            store.ingest_scores("jsonl", iter_records(tmp / "scores.jsonl"))
+            store.ingest_scores("parquet", iter_records(tmp / "scores.parquet"))
+            by_format = {
+                run: store.aggregate(runs=[run]).sort_values(["model_name", "prompt_variant"])
+                .reset_index(drop=True)
+                for run in ("jsonl", "parquet")
+            }
+        print(by_format["parquet"].to_string(index=False))
+        means = [f"{dim}_mean" for dim in DIMENSIONS]
+        if by_format["parquet"][means].isna().any().any():
+            failed.append("null score means from Parquet")
+        if not by_format["jsonl"].equals(by_format["parquet"]):
+            failed.append("store aggregates")
+
+    if failed:
+        raise SystemExit(f"Round trip failed: {failed}")
+    print("JSONL and Parquet round trips agree.")
+
+
+if __name__ == "__main__":
+    main()
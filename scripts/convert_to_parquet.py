@@ -0,0 +1,28 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+
+from normsense.storage.files import base_name, iter_jsonl
+from normsense.storage.parquet import ParquetRecordWriter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert a Phase 2 / Phase 3 JSONL file into a partitioned Parquet dataset."
+    )
+    parser.add_argument("in_path", help="JSONL input (.jsonl, .jsonl.gz or .jsonl.zst)")
+    parser.add_argument("--kind", choices=["responses", "scores"], required=True)
+    parser.add_argument("--out", default=None, help="output dataset directory (default: <in>.parquet)")
+    args = parser.parse_args()
+
+    in_path = Path(args.in_path)
+    out_path = Path(args.out) if args.out else in_path.with_name(base_name(in_path)).with_suffix(".parquet")
+
+    with ParquetRecordWriter(out_path, kind=args.kind) as writer:
+        writer.write_many(iter_jsonl(in_path))
+
+    print(f"Wrote {writer.num_written} records to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
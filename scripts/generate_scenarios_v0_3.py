@@ -1,16 +1,19 @@
 from __future__ import annotations
+import argparse
 from pathlib import Path
 
 from normsense.scenarios import (
-    Scenario,
     ScenarioSet,
-    Domain,
     NormType,
     save_scenarios,
+    write_scenarios_jsonl,
 )
+from normsense.scenario_generator import ScenarioGrid
+from normsense.sharding import in_shard, parse_shard
+from normsense.storage.files import base_name
 
 
-def build_scenarios() -> ScenarioSet:
+def build_grid(expand_cultures: bool = False, expand_stakes: bool = False) -> ScenarioGrid:
     # 4 domains × 4 norm_types × 7 situations = 112 scenarios
     base_contexts: dict[str, list[str]] = {
         "personal": [
@@ -51,19 +54,20 @@ def build_scenarios() -> ScenarioSet:
         ],
     }
 
-    norm_tail: dict[NormType, str] = {
-        NormType.POLITENESS: (
-            "What is a polite and respectful way to respond in this situation?"
-        ),
-        NormType.EMPATHY: (
-            "What is an empathetic way to respond that acknowledges the other person's feelings?"
-        ),
-        NormType.CONTEXTUAL_FIT: (
-            "What response would best fit the social and cultural context in this situation?"
-        ),
-        NormType.MIXED: (
-            "How could you respond in a way that balances politeness, empathy, and practical clarity?"
-        ),
+    # First entry per norm type is the v0.3 wording; append paraphrases to grow the set.
+    norm_tail: dict[NormType, list[str]] = {
+        NormType.POLITENESS: [
+            "What is a polite and respectful way to respond in this situation?",
+        ],
+        NormType.EMPATHY: [
+            "What is an empathetic way to respond that acknowledges the other person's feelings?",
+        ],
+        NormType.CONTEXTUAL_FIT: [
+            "What response would best fit the social and cultural context in this situation?",
+        ],
+        NormType.MIXED: [
+            "How could you respond in a way that balances politeness, empathy, and practical clarity?",
+        ],
     }
 
     cultures: dict[str, list[str]] = {
@@ -75,41 +79,52 @@ def build_scenarios() -> ScenarioSet:
 
     stakes_levels = ["low", "moderate", "high"]
 
-    scenarios: list[Scenario] = []
-    sid = 1
-
-    for domain in Domain:
-        domain_key = domain.value
-        for norm_type in NormType:
-            contexts = base_contexts[domain_key]
-            culture_list = cultures[domain_key]
-            for idx, context in enumerate(contexts):
-                stakes = stakes_levels[idx % len(stakes_levels)]
-                cultural_tag = culture_list[idx % len(culture_list)]
-                text = f"{context} {norm_tail[norm_type]}"
-
-                scenario = Scenario(
-                    id=f"SC{sid:03d}",
-                    text=text,
-                    domain=domain,
-                    norm_type=norm_type,
-                    cultural_tag=cultural_tag,
-                    stakes_level=stakes,
-                    prompt_source="original",
-                    notes=f"{domain_key}, {norm_type.value}, example {idx + 1}",
-                )
-                scenarios.append(scenario)
-                sid += 1
-
-    return ScenarioSet(version="v0.3", scenarios=scenarios)
+    return ScenarioGrid(
+        contexts=base_contexts,
+        norm_tails=norm_tail,
+        cultures=cultures,
+        stakes_levels=stakes_levels,
+        expand_cultures=expand_cultures,
+        expand_stakes=expand_stakes,
+    )
+
+
+def build_scenarios() -> ScenarioSet:
+    return ScenarioSet(version="v0.3", scenarios=list(build_grid()))
 
 
 def main() -> None:
-    scenario_set = build_scenarios()
     root = Path(__file__).resolve().parents[1]
-    out_path = root / "data" / "raw" / "normsense_scenarios_v0.3.json"
-    save_scenarios(scenario_set, out_path)
-    print(f"Wrote {len(scenario_set.scenarios)} scenarios to {out_path}")
+
+    parser = argparse.ArgumentParser(description="Generate the NormSense scenario set.")
+    parser.add_argument(
+        "--out",
+        default=str(root / "data" / "raw" / "normsense_scenarios_v0.3.json"),
+        help="output path; .jsonl (optionally .gz / .zst) streams scenarios without building the set",
+    )
+    parser.add_argument("--expand-cultures", action="store_true", help="every culture of each domain")
+    parser.add_argument("--expand-stakes", action="store_true", help="every stakes level")
+    parser.add_argument("--sample", type=int, default=None, help="deterministic sample of N scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard", default=None, help="i/N: only the i-th (0-based) of N id-hash partitions")
+    args = parser.parse_args()
+
+    grid = build_grid(args.expand_cultures, args.expand_stakes)
+    scenarios = iter(grid)
+    if args.sample is not None:
+        scenarios = iter(grid.sample(args.sample, seed=args.seed))
+    if args.shard:
+        index, count = parse_shard(args.shard)
+        scenarios = (s for s in scenarios if in_shard((s.id,), index, count))
+
+    out_path = Path(args.out)
+    if base_name(out_path).endswith(".jsonl"):
+        num = write_scenarios_jsonl(scenarios, out_path, version="v0.3")
+    else:
+        scenario_set = ScenarioSet(version="v0.3", scenarios=list(scenarios))
+        save_scenarios(scenario_set, out_path)
+        num = len(scenario_set.scenarios)
+    print(f"Wrote {num} scenarios to {out_path} (grid of {len(grid)})")
 
 
 if __name__ == "__main__":
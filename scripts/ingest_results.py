@@ -0,0 +1,57 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+
+from normsense.scenarios import load_scenarios
+from normsense.storage.files import find_artifact
+from normsense.storage.records import iter_records
+from normsense.storage.results_store import ResultsStore
+
+
+def main() -> None:
+    root = Path(__file__).resolve().parents[1]
+    processed = root / "data" / "processed"
+
+    parser = argparse.ArgumentParser(
+        description="Ingest scenarios, Phase 2 responses and Phase 3 scores into the results store."
+    )
+    parser.add_argument("--run-id", required=True, help="id to file this run under")
+    parser.add_argument("--label", default=None, help="free-form description of the run")
+    parser.add_argument("--store", default=str(root / "data" / "results_store.sqlite"))
+    parser.add_argument(
+        "--scenarios",
+        default=str(root / "data" / "raw" / "normsense_scenarios_v0.3.json"),
+    )
+    parser.add_argument("--responses", default=str(processed / "model_responses_v0.3.jsonl"))
+    parser.add_argument("--scores", default=str(processed / "model_scores_v0.3.jsonl"))
+    parser.add_argument("--replace", action="store_true", help="drop existing rows of this run first")
+    parser.add_argument("--list", action="store_true", help="only list the runs in the store")
+    args = parser.parse_args()
+
+    with ResultsStore(args.store) as store:
+        if args.list:
+            print(store.runs().to_string(index=False))
+            return
+
+        if args.replace:
+            store.delete_run(args.run_id)
+        store.add_run(args.run_id, label=args.label)
+
+        scenario_set = load_scenarios(args.scenarios)
+        n = store.ingest_scenarios(args.run_id, scenario_set.scenarios)
+        print(f"[{args.run_id}] {n} scenarios from {args.scenarios}")
+
+        for kind, path, ingest in (
+            ("responses", args.responses, store.ingest_responses),
+            ("scores", args.scores, store.ingest_scores),
+        ):
+            path = find_artifact(path)
+            if not path.exists():
+                print(f"[WARN] No {kind} at {path}; skipping.")
+                continue
+            n = ingest(args.run_id, iter_records(path))
+            print(f"[{args.run_id}] {n} {kind} from {path}")
+
+
+if __name__ == "__main__":
+    main()
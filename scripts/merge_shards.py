@@ -0,0 +1,71 @@
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+
+from normsense.scenarios import load_scenarios
+from normsense.generation import (
+    add_work_filter_args,
+    build_work_items,
+    select_models,
+    select_scenarios,
+    select_variants,
+)
+from normsense.models.registry import ModelRegistry
+from normsense.sharding import keys_from_jsonl, merge_shards
+
+
+def main() -> None:
+    root = Path(__file__).resolve().parents[1]
+
+    parser = argparse.ArgumentParser(
+        description="Merge per-shard outputs into one deduplicated file and check coverage."
+    )
+    parser.add_argument("out_path", help="merged output path (the un-sharded file name)")
+    parser.add_argument("--num-shards", type=int, required=True)
+    parser.add_argument(
+        "--config",
+        default=None,
+        help="model registry config; expect every scenario x variant x model key (Phase 2)",
+    )
+    parser.add_argument(
+        "--expect-from",
+        default=None,
+        help="expect every non-error key of this JSONL file (e.g. Phase 2 responses for Phase 3)",
+    )
+    add_work_filter_args(parser)
+    args = parser.parse_args()
+
+    expected = None
+    if args.config:
+        scenario_set = load_scenarios(root / "data" / "raw" / "normsense_scenarios_v0.3.json")
+        scenarios = select_scenarios(scenario_set.scenarios, args.scenarios, args.limit)
+        registry = select_models(ModelRegistry.from_file(args.config), args.models)
+        expected = {
+            item.key
+            for item in build_work_items(scenarios, select_variants(args.variants), registry.names)
+        }
+    elif args.expect_from:
+        expected = keys_from_jsonl(args.expect_from)
+
+    report = merge_shards(args.out_path, args.num_shards, expected_keys=expected)
+
+    print(
+        f"Merged {report.num_records} records into {args.out_path} "
+        f"({report.num_duplicates} duplicates dropped)."
+    )
+    for path in report.missing_shards:
+        print(f"[WARN] Missing shard file: {path}")
+    if report.unexpected_keys:
+        print(f"[WARN] {len(report.unexpected_keys)} records outside the expected work list.")
+    if expected is not None:
+        print(f"Coverage: {len(expected) - len(report.missing_keys)}/{len(expected)} keys.")
+        for key in report.missing_keys[:20]:
+            print(f"  missing: {key}")
+
+    if not report.complete:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from __future__ import annotations
+import argparse
+import json
+import sys
+
+from normsense.storage.index import build_index, index_path, load_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build or query the byte-offset sidecar index of a JSONL (.gz / .zst) file."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="(re)build the index with one pass over the file")
+    p_build.add_argument("path")
+
+    p_get = sub.add_parser("get", help="print records by key")
+    p_get.add_argument("path")
+    p_get.add_argument(
+        "keys",
+        nargs="+",
+        help="scenario_id|prompt_variant|model_name (as in the work queue task keys)",
+    )
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_index(args.path)
+        print(f"Indexed {len(index)} records -> {index_path(args.path)}")
+        return
+
+    index = load_index(args.path, build_missing=True)
+    keys = [tuple(k.split("|")) for k in args.keys]
+    found = index.fetch_many(keys)
+    for key in keys:
+        record = found.get(key)
+        if record is None:
+            print(f"[WARN] Not found: {'|'.join(key)}", file=sys.stderr)
+            continue
+        print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
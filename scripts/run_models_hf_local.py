@@ -1,124 +1,87 @@
 from __future__ import annotations
-import json
+import argparse
 import time
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 from normsense.scenarios import load_scenarios, ScenarioSet
-from normsense.prompts import (
-    PromptVariant,
-    build_system_prompt,
-    build_user_prompt,
+from normsense.generation import (
+    add_work_filter_args,
+    build_work_items,
+    run_generation,
+    select_models,
+    select_scenarios,
+    select_variants,
+    shard_work_items,
 )
-from normsense.models.base import ModelResponse
-from normsense.models.huggingface_local import HFLocalCausalLM
-
-
-def build_hf_models():
-    """
-    Build the local Hugging Face models we will actually run.
-    """
-    models = {}
-
-    # Small, lightweight chat model 
-    models["TinyLlama/TinyLlama-1.1B-Chat-v1.0"] = HFLocalCausalLM(
-        model_id="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
-        max_new_tokens=200,
-        temperature=0.7,
-        top_p=0.9,
-    )
-
-    # Optional: larger model (may be too heavy for local machine)
-    try:
-        models["mistralai/Mistral-7B-Instruct-v0.2"] = HFLocalCausalLM(
-            model_id="mistralai/Mistral-7B-Instruct-v0.2",
-            max_new_tokens=200,
-            temperature=0.7,
-            top_p=0.9,
-        )
-    except Exception as e:
-        print(f"[WARN] Could not load Mistral-7B model: {e}")
-        print("[WARN] Continuing with TinyLlama only.")
-
-    return models
+from normsense.models.registry import ModelRegistry
+from normsense.sharding import parse_shard, shard_path
+from normsense.storage.files import COMPRESSION_CHOICES
+from normsense.storage.records import OUTPUT_FORMATS, output_path, record_sink
 
 
 def main() -> None:
     load_dotenv()
 
     root = Path(__file__).resolve().parents[1]
-    data_path = root / "data" / "raw" / "normsense_scenarios_v0.3.json"
-    out_path = root / "data" / "processed" / "model_responses_hf_local.jsonl"
-
-    scenario_set: ScenarioSet = load_scenarios(data_path)
-    scenarios = scenario_set.scenarios
-    print(f"Loaded {len(scenarios)} scenarios from {data_path}")
-
-    models = build_hf_models()
-    print(f"Active HF models: {list(models.keys())}")
-
-    variants = [
-        PromptVariant.NEUTRAL,
-        PromptVariant.ROLE_PRIMED,
-        PromptVariant.EMPATHY_PRIMED,
-    ]
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    num_written = 0
-
-    with out_path.open("w", encoding="utf-8") as f_out:
-        for scenario in scenarios:
-            for variant in variants:
-                system_prompt = build_system_prompt(variant)
-                user_prompt = build_user_prompt(scenario)
-
-                for model_name, model in models.items():
-                    print(
-                        f"Running HF model={model_name}, "
-                        f"variant={variant.value}, scenario={scenario.id}"
-                    )
-
-                    try:
-                        resp: ModelResponse = model.generate(
-                            system_prompt=system_prompt,
-                            user_prompt=user_prompt,
-                            scenario_id=scenario.id,
-                            prompt_variant=variant.value,
-                        )
-
-                        record = {
-                            "scenario_id": resp.scenario_id,
-                            "scenario_domain": scenario.domain.value,
-                            "scenario_norm_type": scenario.norm_type.value,
-                            "scenario_cultural_tag": scenario.cultural_tag,
-                            "scenario_stakes_level": scenario.stakes_level,
-                            "scenario_prompt_source": scenario.prompt_source,
-                            "model_name": resp.model_name,
-                            "prompt_variant": resp.prompt_variant,
-                            "system_prompt": resp.system_prompt,
-                            "user_prompt": resp.user_prompt,
-                            "response_text": resp.response_text,
-                            "raw": resp.raw,
-                            "timestamp": time.time(),
-                        }
-
-                        f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
-                        num_written += 1
+    parser = argparse.ArgumentParser(description="Phase 2: run local HF models.")
+    parser.add_argument(
+        "--config",
+        default=str(root / "configs" / "models_hf_local.json"),
+        help="model registry config (JSON or TOML)",
+    )
+    parser.add_argument(
+        "--worker",
+        default=None,
+        help="host:port of a running HF worker to attach to (skips in-process model loading)",
+    )
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="jsonl", help="output format")
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSION_CHOICES,
+        default="none",
+        help="compress JSONL output (.jsonl.gz / .jsonl.zst)",
+    )
+    add_work_filter_args(parser)
+    args = parser.parse_args()
+    if args.shard and args.format != "jsonl":
+        parser.error("--shard needs --format jsonl: shard outputs are merged by scripts/merge_shards.py")
+    t_start = time.perf_counter()
 
-                    except Exception as e:
-                        error_record = {
-                            "scenario_id": scenario.id,
-                            "model_name": model_name,
-                            "prompt_variant": variant.value,
-                            "error": str(e),
-                            "timestamp": time.time(),
-                        }
-                        f_out.write(json.dumps(error_record, ensure_ascii=False) + "\n")
-                        num_written += 1
-                        print(f"[ERROR] {model_name} failed: {e}")
+    data_path = root / "data" / "raw" / "normsense_scenarios_v0.3.json"
+    out_path = output_path(
+        root / "data" / "processed" / "model_responses_hf_local.jsonl", args.format, args.compress
+    )
 
-    print(f"Finished. Wrote {num_written} lines to {out_path}")
+    scenario_set: ScenarioSet = load_scenarios(data_path, cache=True)
+    scenarios = select_scenarios(scenario_set.scenarios, args.scenarios, args.limit)
+    print(f"Loaded {len(scenario_set.scenarios)} scenarios from {data_path}, running {len(scenarios)}")
+
+    # Weights are only loaded when the first work item for a model comes up.
+    registry = select_models(ModelRegistry.from_file(args.config), args.models)
+    if args.worker:
+        registry = registry.with_hf_worker(args.worker)
+    print(f"Selected HF models: {registry.names}")
+
+    variants = select_variants(args.variants)
+    items = build_work_items(scenarios, variants, registry.names)
+    if args.shard:
+        index, count = parse_shard(args.shard)
+        items = shard_work_items(items, index, count)
+        out_path = shard_path(out_path, index, count)
+        print(f"Running shard {index}/{count} -> {out_path}")
+
+    with record_sink(out_path, args.format, kind="responses", index=True) as write:
+        num_written = run_generation(items, registry, write=write, label="HF model")
+
+    print(f"Finished. Wrote {num_written} records to {out_path}")
+    print(f"Total time (startup + evaluation): {time.perf_counter() - t_start:.2f}s")
+    for name, model in registry.loaded_models().items():
+        timings = getattr(model, "startup_timings", {})
+        if timings:
+            print(f"  startup {name}: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
 
 
 if __name__ == "__main__":
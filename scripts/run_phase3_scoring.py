@@ -1,74 +1,198 @@
 from __future__ import annotations
-import json
+import argparse
 from pathlib import Path
 import time
 
+import numpy as np
 from dotenv import load_dotenv
 
+from normsense.models.registry import ModelRegistry
 from normsense.scoring.judge_model import JudgeModel
+from normsense.scoring.panel import JudgePanel, PanelJudge, panel_agreement
+from normsense.scoring.runner import distilled_score_records
 from normsense.scenarios import load_scenarios, ScenarioSet
+from normsense.sharding import in_shard, parse_shard, shard_path, work_key
+from normsense.storage.files import COMPRESSION_CHOICES, find_artifact
+from normsense.storage.records import OUTPUT_FORMATS, iter_records, output_path, record_sink
 
 
 def main() -> None:
     load_dotenv()
 
+    parser = argparse.ArgumentParser(description="Phase 3: score model responses with the judge.")
+    parser.add_argument(
+        "--worker",
+        default=None,
+        help="host:port of a running HF worker to attach to (skips in-process model loading)",
+    )
+    parser.add_argument(
+        "--shard",
+        default=None,
+        help="i/N: only score the i-th (0-based) of N deterministic partitions of the responses",
+    )
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="jsonl", help="output format")
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSION_CHOICES,
+        default="none",
+        help="compress JSONL output (.jsonl.gz / .jsonl.zst)",
+    )
+    parser.add_argument(
+        "--responses",
+        default=None,
+        help="Phase 2 output to score (JSONL file, optionally .gz / .zst, Parquet dataset or normalized directory)",
+    )
+    parser.add_argument(
+        "--judge",
+        choices=["llm", "distilled", "prescreen"],
+        default="llm",
+        help="llm: LLM judge only; distilled: distilled judge only (see scripts/train_distilled_judge.py); "
+        "prescreen: distilled judge first, LLM judge for responses it scores at or below --prescreen-below",
+    )
+    parser.add_argument(
+        "--distilled",
+        default=None,
+        help="distilled judge file (default data/processed/distilled_judge.npz)",
+    )
+    parser.add_argument(
+        "--prescreen-below",
+        type=float,
+        default=3.0,
+        help="distilled overall score at or below which --judge prescreen asks the LLM judge",
+    )
+    parser.add_argument(
+        "--judges",
+        default=None,
+        help="model registry config (like configs/models_phase2.json) of LLM judges to use instead of the "
+        "local TinyLlama judge; several judges form a panel. max_concurrency and requests_per_minute "
+        "of each entry bound its concurrent requests",
+    )
+    parser.add_argument("--judge-models", default=None, help="comma-separated judge names from --judges")
+    parser.add_argument("--retries", type=int, default=3, help="retries per failed --judges request")
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="output path (default data/processed/model_scores_v0.3.jsonl for --judge llm, "
+        "model_scores_v0.3.<distilled|prescreen>.jsonl otherwise)",
+    )
+    parser.add_argument("--batch-size", type=int, default=4096, help="responses per judge batch")
+    args = parser.parse_args()
+    if args.shard and args.format != "jsonl":
+        parser.error("--shard needs --format jsonl: shard outputs are merged by scripts/merge_shards.py")
+    t_start = time.perf_counter()
+
     root = Path(__file__).resolve().parents[1]
 
     # Phase 2 output (model responses)
-    responses_path = root / "data" / "processed" / "model_responses_hf_local.jsonl"
+    responses_path = find_artifact(
+        args.responses or root / "data" / "processed" / "model_responses_hf_local.jsonl"
+    )
 
-    # Output path for scoring
-    out_path = root / "data" / "processed" / "model_scores_v0.3.jsonl"
+    # Output path for scoring. Distilled / prescreen scores never share the
+    # LLM-judge file: it is the distilled judge's training data and Phase 4's input.
+    default_name = {
+        "llm": "model_scores_v0.3.jsonl",
+        "distilled": "model_scores_v0.3.distilled.jsonl",
+        "prescreen": "model_scores_v0.3.prescreen.jsonl",
+    }[args.judge]
+    out_path = output_path(
+        Path(args.out) if args.out else root / "data" / "processed" / default_name, args.format, args.compress
+    )
+
+    shard_index, shard_count = parse_shard(args.shard) if args.shard else (0, 1)
+    if shard_count > 1:
+        out_path = shard_path(out_path, shard_index, shard_count)
+        print(f"Scoring shard {shard_index}/{shard_count} -> {out_path}")
 
     # Load scenarios so we can access the original scenario text by ID
     scenario_set: ScenarioSet = load_scenarios(
-        root / "data" / "raw" / "normsense_scenarios_v0.3.json"
-    )
-    scenario_by_id = {s.id: s for s in scenario_set.scenarios}
-
-    judge = JudgeModel(
-        model_id="TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+        root / "data" / "raw" / "normsense_scenarios_v0.3.json", cache=True
     )
+    scenario_by_id = scenario_set.by_id
+
+    panel = None
+    if args.judge != "distilled" and args.judges:
+        registry = ModelRegistry.from_file(args.judges)
+        if args.judge_models:
+            registry = registry.select(n.strip() for n in args.judge_models.split(",") if n.strip())
+        panel = JudgePanel.from_registry(registry, max_retries=args.retries)
+        print(f"Judges: {', '.join(panel.names)}")
+    elif args.judge != "distilled":
+        judge = JudgeModel(
+            model_id="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
+            worker_address=args.worker,
+        )
+        panel = JudgePanel([PanelJudge(judge)], max_retries=0)
+    distilled = None
+    if args.judge != "llm":
+        from normsense.scoring.distilled import DistilledJudge
+
+        distilled = DistilledJudge.load(args.distilled or root / "data" / "processed" / "distilled_judge.npz")
+        overall = distilled.dimensions.index("overall")
+    t_ready = time.perf_counter()
+    print(f"Startup took {t_ready - t_start:.2f}s")
 
     num_scored = 0
-
-    with responses_path.open("r", encoding="utf-8") as f_in, \
-         out_path.open("w", encoding="utf-8") as f_out:
-
-        for line in f_in:
-            record = json.loads(line)
-
+    num_llm = 0
+    batch = []
+    ratings = []
+
+    def llm_score(records, write) -> None:
+        # Records are written as soon as the judges finish them, not per batch.
+        nonlocal num_llm
+        values, _ = panel.score_records(records, scenario_by_id, write=write)
+        ratings.append(values)
+        num_llm += len(records)
+
+    def flush(write) -> None:
+        if distilled is None:
+            llm_score(batch, write)
+        else:
+            values, out_records = distilled_score_records(distilled, batch, scenario_by_id)
+            picked = []
+            for record, row, out_record in zip(batch, values, out_records):
+                if panel is not None and row[overall] <= args.prescreen_below:
+                    picked.append(record)
+                else:
+                    write(out_record)
+            if picked:
+                llm_score(picked, write)
+        batch.clear()
+
+    with record_sink(out_path, args.format, kind="scores") as write:
+        for record in iter_records(responses_path):
             # Skip error records from Phase 2
             if "error" in record:
                 continue
 
-            scenario_id = record["scenario_id"]
-            model_response = record["response_text"]
-
-            scenario = scenario_by_id.get(scenario_id)
-            if scenario is None:
-                # Should not happen, but be safe
-                scenario_text = record.get("user_prompt", "")
-            else:
-                scenario_text = scenario.text
-
-            try:
-                score = judge.score(scenario_text, model_response)
-            except Exception as e:
-                score = {"error": str(e)}
-
-            out_record = {
-                "scenario_id": scenario_id,
-                "model_name": record["model_name"],
-                "prompt_variant": record["prompt_variant"],
-                "scores": score,
-                "timestamp": time.time(),
-            }
-
-            f_out.write(json.dumps(out_record, ensure_ascii=False) + "\n")
+            if not in_shard(work_key(record), shard_index, shard_count):
+                continue
+
             num_scored += 1
+            batch.append(record)
+            if len(batch) >= args.batch_size:
+                flush(write)
+        if batch:
+            flush(write)
+    if panel is not None:
+        panel.close()
 
     print(f"Done scoring. Wrote {num_scored} records to {out_path}")
+    if args.judge == "prescreen":
+        print(
+            f"LLM judge re-scored {num_llm} of {num_scored} records "
+            f"(distilled overall <= {args.prescreen_below:g})."
+        )
+    if panel is not None and len(panel.names) > 1 and ratings:
+        print("Judge panel agreement (Krippendorff's alpha, interval; mad = mean absolute difference):")
+        for row in panel_agreement(np.concatenate(ratings), panel.names):
+            print("  " + ", ".join(
+                f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()
+            ))
+    print(
+        f"Startup: {t_ready - t_start:.2f}s, "
+        f"evaluation: {time.perf_counter() - t_ready:.2f}s"
+    )
 
 
 if __name__ == "__main__":
@@ -1,23 +1,130 @@
 from __future__ import annotations
+import argparse
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from normsense.analysis.aggregate import load_scores, summarize_by_model_variant
+from normsense.analysis.aggregate import load_scores, summarize_from_store, summarize_with_cis
+from normsense.analysis.cube import attach_facets, cube
+from normsense.analysis.effects import fit_effects
+from normsense.analysis.significance import paired_tests
+from normsense.analysis.streaming import StreamingAggregator
+from normsense.scenarios import load_scenarios
+from normsense.storage.files import find_artifact
 
 
 def main() -> None:
     load_dotenv()
 
     root = Path(__file__).resolve().parents[1]
-    scores_path = root / "data" / "processed" / "model_scores_v0.3.jsonl"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scores",
+        default=str(root / "data" / "processed" / "model_scores_v0.3.jsonl"),
+        help="Phase 3 output (JSONL file, optionally .gz / .zst, or Parquet dataset)",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help="summarize from a results store (see scripts/ingest_results.py) instead of --scores",
+    )
+    parser.add_argument("--runs", default=None, help="comma-separated run ids to include (with --store)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only read score records appended since the last run (JSONL --scores); follows the "
+        ".partial-<name> file of a Phase 3 run that is still writing",
+    )
+    parser.add_argument(
+        "--state",
+        default=str(root / "data" / "processed" / ".phase4_aggregate_state.json"),
+        help="saved aggregation state for --incremental",
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=10_000,
+        help="bootstrap resamples for the confidence-interval columns (0 to skip; needs a full --scores load)",
+    )
+    parser.add_argument(
+        "--permutations",
+        type=int,
+        default=10_000,
+        help="sign flips for the paired variant/model tests (0 to skip; needs a full --scores load)",
+    )
+    parser.add_argument(
+        "--cube",
+        action="store_true",
+        help="also write per-facet breakdowns (model / variant x domain, norm_type, culture, stakes)",
+    )
+    parser.add_argument(
+        "--skip-effects",
+        action="store_true",
+        help="do not fit the scenario difficulty / model ability / variant / facet effects model",
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=str(root / "data" / "raw" / "normsense_scenarios_v0.3.json"),
+        help="scenario set used to fill in facets missing from older score records",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
     out_csv = root / "data" / "processed" / "model_score_summary_by_model_variant.csv"
+    tests_csv = root / "data" / "processed" / "model_score_paired_tests.csv"
+    cube_csv = root / "data" / "processed" / "model_score_cube.csv"
+    effects_csv = root / "data" / "processed" / "model_score_effects.csv"
+    effects_fit_csv = root / "data" / "processed" / "model_score_effects_fit.csv"
+    tests = None
+    breakdown = None
+    effects = None
+
+    if args.store:
+        runs = args.runs.split(",") if args.runs else None
+        print(f"Aggregating scores in {args.store} (runs: {runs or 'all'}) ...")
+        summary = summarize_from_store(args.store, runs=runs)
+    elif args.incremental:
+        scores_path = find_artifact(args.scores)
+        # Facets are read from the records; the scenario set only fills in older ones.
+        scenario_facets = None
+        if Path(args.scenarios).exists():
+            scenario_facets = {
+                s.id: {
+                    "domain": s.domain.value,
+                    "norm_type": s.norm_type.value,
+                    "cultural_tag": s.cultural_tag,
+                    "stakes_level": s.stakes_level,
+                }
+                for s in load_scenarios(args.scenarios, cache=True).scenarios
+            }
+        agg = StreamingAggregator.load(args.state, scores_path, scenario_facets=scenario_facets)
+        num_new = agg.update()
+        agg.save(args.state)
+        print(f"Aggregated {num_new} new score records ({agg.num_records} total) from {agg.live_path()}.")
 
-    print(f"Loading scores from {scores_path} ...")
-    df = load_scores(scores_path)
-    print(f"Loaded {len(df)} scored rows.")
+        summary = agg.summary()
+        if args.cube:
+            breakdown = agg.breakdown()
+    else:
+        scores_path = find_artifact(args.scores)
+        print(f"Loading scores from {scores_path} ...")
+        with_facets = args.cube or not args.skip_effects
+        df = load_scores(scores_path, facets=with_facets)
+        print(f"Loaded {len(df)} scored rows.")
+        judges = df["judge"].value_counts()
+        if (judges > 0).sum() > 1:
+            print(f"[WARN] {scores_path} mixes judges ({dict(judges[judges > 0])}); CIs and tests pool them")
 
-    summary = summarize_by_model_variant(df)
+        summary = summarize_with_cis(df, n_boot=args.bootstrap, confidence=args.confidence, seed=args.seed)
+        if args.permutations > 0:
+            tests = paired_tests(df, n_perm=args.permutations, seed=args.seed)
+        if with_facets and Path(args.scenarios).exists():
+            df = attach_facets(df, load_scenarios(args.scenarios, cache=True))
+        if args.cube:
+            breakdown = cube(df)
+        if not args.skip_effects:
+            effects = fit_effects(df)
     print("Summary:")
     print(summary)
 
@@ -25,6 +132,22 @@ def main() -> None:
     summary.to_csv(out_csv, index=False)
     print(f"Wrote summary to {out_csv}")
 
+    if tests is not None:
+        tests.to_csv(tests_csv, index=False)
+        num_sig = int((tests["p_perm_holm"] < 1 - args.confidence).sum())
+        print(f"Wrote {len(tests)} paired tests ({num_sig} significant after Holm) to {tests_csv}")
+
+    if breakdown is not None:
+        breakdown.to_csv(cube_csv, index=False)
+        print(f"Wrote {len(breakdown)} rows over {breakdown['grouping'].nunique()} groupings to {cube_csv}")
+
+    if effects is not None:
+        effects.effects.to_csv(effects_csv, index=False)
+        effects.fit.to_csv(effects_fit_csv, index=False)
+        print("Effects model fit:")
+        print(effects.fit)
+        print(f"Wrote {len(effects.effects)} effect estimates to {effects_csv}")
+
 
 if __name__ == "__main__":
     main()
@@ -1,29 +1,49 @@
 from __future__ import annotations
+import argparse
 from pathlib import Path
+import time
 
 from dotenv import load_dotenv
 
-from normsense.analysis.plots import (
-    load_summary,
-    plot_overall_by_model_variant,
-    plot_dimension_by_model,
-)
+from normsense.analysis.figures import facet_figure_specs, render_figures, summary_figure_specs
+from normsense.analysis.plots import load_summary
 
 
 def main() -> None:
     load_dotenv()
 
     root = Path(__file__).resolve().parents[1]
-    summary_csv = root / "data" / "processed" / "model_score_summary_by_model_variant.csv"
-    plots_dir = root / "reports" / "figures"
 
-    print(f"Loading summary from {summary_csv} ...")
-    df = load_summary(summary_csv)
+    parser = argparse.ArgumentParser(description="Phase 5: render report figures.")
+    parser.add_argument(
+        "--summary",
+        default=str(root / "data" / "processed" / "model_score_summary_by_model_variant.csv"),
+    )
+    parser.add_argument(
+        "--cube",
+        default=str(root / "data" / "processed" / "model_score_cube.csv"),
+        help="Phase 4 --cube output; per-facet figure families are drawn when it exists",
+    )
+    parser.add_argument("--out", default=str(root / "reports" / "figures"))
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="redraw figures whose inputs did not change")
+    args = parser.parse_args()
+    t_start = time.perf_counter()
+
+    print(f"Loading summary from {args.summary} ...")
+    df = load_summary(args.summary)
     print(df)
 
-    plot_overall_by_model_variant(df, plots_dir / "overall_by_model_variant.png")
-    plot_dimension_by_model(df, plots_dir)
-    print(f"Saved plots to {plots_dir}")
+    specs = summary_figure_specs(df)
+    cube_csv = Path(args.cube)
+    if cube_csv.exists():
+        specs += facet_figure_specs(load_summary(cube_csv))
+
+    rendered, skipped = render_figures(specs, args.out, workers=args.workers, force=args.force)
+    print(
+        f"Saved {len(rendered)} plots to {args.out} ({len(skipped)} up to date) "
+        f"in {time.perf_counter() - t_start:.2f}s"
+    )
 
 
 if __name__ == "__main__":
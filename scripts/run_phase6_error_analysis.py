@@ -1,56 +1,51 @@
 from __future__ import annotations
+import argparse
 from pathlib import Path
-import json
 
 from dotenv import load_dotenv
 
-from normsense.analysis.errors import (
-    load_scores_df,
-    extract_worst_examples,
-    extract_best_examples,
-)
+from normsense.analysis.errors import write_examples_markdown
+from normsense.analysis.topk import attach_responses, stream_top_k
+from normsense.storage.files import base_name, find_artifact
 
 
 def main() -> None:
     load_dotenv()
 
     root = Path(__file__).resolve().parents[1]
-    scores_path = root / "data" / "processed" / "model_scores_v0.3.jsonl"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scores",
+        default=str(root / "data" / "processed" / "model_scores_v0.3.jsonl"),
+        help="Phase 3 output (JSONL file, optionally .gz / .zst, or Parquet dataset)",
+    )
+    parser.add_argument(
+        "--responses",
+        default=str(root / "data" / "processed" / "model_responses_hf_local.jsonl"),
+        help="Phase 2 output to take response texts from (JSONL, via its offset index); skipped if missing",
+    )
+    parser.add_argument("--k", type=int, default=10, help="examples per dimension and group")
+    parser.add_argument(
+        "--global",
+        dest="global_only",
+        action="store_true",
+        help="top/bottom-k over all models and variants instead of per model x variant",
+    )
+    args = parser.parse_args()
+    scores_path = find_artifact(args.scores)
     out_path = root / "reports" / "error_analysis" / "qualitative_examples.md"
 
-    df = load_scores_df(scores_path)
-
-    worst = extract_worst_examples(df, k=10)
-    best = extract_best_examples(df, k=10)
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    with out_path.open("w", encoding="utf-8") as f:
-        f.write("# Qualitative Error Analysis\n\n")
-
-        f.write("This file contains representative examples of model performance.\n\n")
-
-        f.write("## Worst-scoring examples\n\n")
-        for key, subset in worst.items():
-            f.write(f"### {key}\n\n")
-            for idx, row in subset.iterrows():
-                f.write(f"- **Model**: {row['model_name']} ({row['prompt_variant']})\n")
-                f.write(f"  - Politeness: {row['politeness']}, "
-                        f"Empathy: {row['empathy']}, "
-                        f"Contextual Fit: {row['contextual_fit']}, "
-                        f"Overall: {row['overall']}\n")
-                f.write(f"  - Rationale: {row['rationale']}\n\n")
-
-        f.write("\n## Best-scoring examples\n\n")
-        for key, subset in best.items():
-            f.write(f"### {key}\n\n")
-            for idx, row in subset.iterrows():
-                f.write(f"- **Model**: {row['model_name']} ({row['prompt_variant']})\n")
-                f.write(f"  - Politeness: {row['politeness']}, "
-                        f"Empathy: {row['empathy']}, "
-                        f"Contextual Fit: {row['contextual_fit']}, "
-                        f"Overall: {row['overall']}\n")
-                f.write(f"  - Rationale: {row['rationale']}\n\n")
+    group_cols = [] if args.global_only else ["model_name", "prompt_variant"]
+    examples = stream_top_k(scores_path, k=args.k, group_cols=group_cols)
+
+    # Offset lookups need a JSONL file (plain, .gz or .zst)
+    responses_path = find_artifact(args.responses)
+    if responses_path.is_file() and base_name(responses_path).endswith(".jsonl"):
+        print(f"Joining response texts from {responses_path} ...")
+        examples = attach_responses(examples, responses_path)
+
+    write_examples_markdown(out_path, examples, group_cols)
 
     print(f"Saved qualitative analysis to {out_path}")
 
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from normsense.analysis.clusters import TEXT_SOURCES, cluster_rationales, write_clusters_markdown
+from normsense.storage.files import find_artifact
+
+
+def main() -> None:
+    load_dotenv()
+
+    root = Path(__file__).resolve().parents[1]
+
+    parser = argparse.ArgumentParser(description="Cluster judge rationales to find recurring failure modes.")
+    parser.add_argument(
+        "--scores",
+        default=str(root / "data" / "processed" / "model_scores_v0.3.jsonl"),
+        help="Phase 3 output (JSONL file, optionally .gz / .zst, or Parquet dataset)",
+    )
+    parser.add_argument(
+        "--responses",
+        default=str(root / "data" / "processed" / "model_responses_hf_local.jsonl"),
+        help="Phase 2 output, for --text response / both (JSONL, via its offset index)",
+    )
+    parser.add_argument("--text", choices=TEXT_SOURCES, default="rationale", help="what to cluster")
+    parser.add_argument("--clusters", type=int, default=20)
+    parser.add_argument("--dimension", default="overall", help="score dimension for --max-score")
+    parser.add_argument(
+        "--max-score",
+        type=float,
+        default=2.0,
+        help="only cluster judgments scoring at most this on --dimension (-1 for all)",
+    )
+    parser.add_argument("--examples", type=int, default=5, help="representative examples per cluster")
+    parser.add_argument(
+        "--epochs", type=int, default=1, help="mini-batch passes for inputs larger than one chunk"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    scores_path = find_artifact(args.scores)
+    out_path = root / "reports" / "error_analysis" / "rationale_clusters.md"
+    processed = root / "data" / "processed"
+
+    max_score = None if args.max_score < 0 else args.max_score
+    which = "all" if max_score is None else f"{args.dimension} <= {max_score:g}"
+    print(f"Clustering {args.text} texts of {scores_path} ({which}) ...")
+    result = cluster_rationales(
+        scores_path,
+        n_clusters=args.clusters,
+        dimension=args.dimension,
+        max_score=max_score,
+        text=args.text,
+        responses_path=find_artifact(args.responses) if args.text != "rationale" else None,
+        n_examples=args.examples,
+        epochs=args.epochs,
+        seed=args.seed,
+    )
+    print(f"Clustered {result.num_documents} documents into {len(result.clusters)} clusters.")
+
+    processed.mkdir(parents=True, exist_ok=True)
+    result.clusters.to_csv(processed / "rationale_clusters.csv", index=False)
+    result.breakdown.to_csv(processed / "rationale_cluster_breakdown.csv", index=False)
+    result.examples.to_csv(processed / "rationale_cluster_examples.csv", index=False)
+    write_clusters_markdown(out_path, result, title=f"Rationale Clusters ({which})")
+
+    print(result.clusters[["cluster", "n", "share", "top_terms"]])
+    print(f"Saved cluster report to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
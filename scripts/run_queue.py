@@ -0,0 +1,201 @@
+from __future__ import annotations
+import argparse
+import os
+import socket
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from normsense.scenarios import load_scenarios
+from normsense.prompts import PromptVariant
+from normsense.generation import (
+    WorkItem,
+    add_work_filter_args,
+    build_work_items,
+    run_work_item,
+    select_models,
+    select_scenarios,
+    select_variants,
+)
+from normsense.models.registry import ModelRegistry
+from normsense.scoring.judge_model import JudgeModel
+from normsense.scoring.runner import score_record
+from normsense.storage.writer import RecordWriter
+from normsense.work_queue import WorkQueue
+
+GENERATE = "generate"
+JUDGE = "judge"
+# Kinds whose tasks enqueue tasks of the key kind on completion.
+UPSTREAM = {JUDGE: [GENERATE]}
+
+
+def _record_error(task_kind: str, record) -> str | None:
+    if task_kind == GENERATE:
+        return record.get("error")
+    return (record.get("scores") or {}).get("error")
+
+
+def cmd_init(args, root: Path) -> None:
+    scenario_set = load_scenarios(args.scenarios_path, cache=True)
+    scenarios = select_scenarios(scenario_set.scenarios, args.scenarios, args.limit)
+    registry = select_models(ModelRegistry.from_file(args.config), args.models)
+    items = build_work_items(scenarios, select_variants(args.variants), registry.names)
+
+    tasks = (
+        (GENERATE, "|".join(item.key), dict(zip(("scenario_id", "prompt_variant", "model_name"), item.key)))
+        for item in items
+    )
+    with WorkQueue(args.queue) as queue:
+        added = queue.enqueue_many(tasks)
+        print(f"Enqueued {added} new generation tasks in {args.queue}")
+
+
+def cmd_work(args, root: Path) -> None:
+    scenario_set = load_scenarios(args.scenarios_path, cache=True)
+    scenario_by_id = scenario_set.by_id
+    registry = ModelRegistry.from_file(args.config)
+    if args.worker:
+        registry = registry.with_hf_worker(args.worker)
+
+    kinds = [GENERATE, JUDGE] if args.kind == "all" else [args.kind]
+    # A worker stays while upstream tasks may still produce work for it.
+    wait_kinds = kinds + [k for kind in kinds for k in UPSTREAM.get(kind, []) if k not in kinds]
+    worker_id = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    judge = None
+    num_done = 0
+
+    with WorkQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts) as queue:
+        while True:
+            tasks = queue.lease(kinds, worker_id, limit=args.batch)
+            if not tasks:
+                if queue.outstanding(wait_kinds) == 0:
+                    break
+                # Other workers still hold leases (or upstream tasks are still
+                # pending); wait for results, follow-up tasks or expiries.
+                time.sleep(args.poll_seconds)
+                continue
+
+            for task in tasks:
+                # Renew the lease before starting; skip tasks we already lost.
+                if not queue.heartbeat(task.id, worker_id):
+                    continue
+
+                if task.kind == GENERATE:
+                    p = task.payload
+                    model = registry.get(p["model_name"])
+                    if model is None:
+                        queue.fail(task.id, worker_id, "model unavailable", retry=False)
+                        continue
+                    item = WorkItem(
+                        scenario=scenario_by_id[p["scenario_id"]],
+                        variant=PromptVariant(p["prompt_variant"]),
+                        model_name=p["model_name"],
+                    )
+                    print(f"[{worker_id}] generate {task.key}")
+                    with queue.keep_leased(task.id, worker_id):
+                        record = run_work_item(item, model)
+                    follow_up = []
+                    if "error" not in record:
+                        follow_up.append((JUDGE, task.key, {"response": record}))
+
+                else:
+                    if judge is None:
+                        judge = JudgeModel(model_id=args.judge_model, worker_address=args.worker)
+
+                    print(f"[{worker_id}] judge {task.key}")
+                    with queue.keep_leased(task.id, worker_id):
+                        record = score_record(judge, task.payload["response"], scenario_by_id)
+                    follow_up = []
+
+                error = _record_error(task.kind, record)
+                if error is not None and task.attempts < args.max_attempts:
+                    # Transient failures (OOM, timeouts, API 5xx) go back to the queue;
+                    # the last attempt's error record is kept as the result.
+                    print(f"[{worker_id}] {task.kind} {task.key} failed (attempt {task.attempts}): {error}")
+                    queue.fail(task.id, worker_id, error, retry=True)
+                    continue
+                queue.complete(task.id, worker_id, record, follow_up=follow_up)
+
+                num_done += 1
+
+    print(f"[{worker_id}] No work left. Processed {num_done} tasks.")
+
+
+def cmd_status(args, root: Path) -> None:
+    with WorkQueue(args.queue) as queue:
+        stats = queue.stats(window_seconds=args.window)
+    for kind, by_status in sorted(stats["depth"].items()):
+        counts = ", ".join(f"{status}={n}" for status, n in sorted(by_status.items()))
+        print(f"{kind}: {counts}")
+    print(
+        f"Throughput: {stats['done_last_window']} tasks in the last {args.window:.0f}s "
+        f"({stats['throughput_per_s']:.2f}/s)"
+    )
+
+
+def cmd_export(args, root: Path) -> None:
+    out_path = Path(args.out)
+    num_written = 0
+    with WorkQueue(args.queue) as queue, RecordWriter(out_path) as writer:
+        for record in queue.iter_results(args.kind):
+            writer.write(record)
+            num_written += 1
+    print(f"Exported {num_written} {args.kind} results to {out_path}")
+
+
+def main() -> None:
+    load_dotenv()
+
+    root = Path(__file__).resolve().parents[1]
+    default_queue = root / "data" / "queue" / "normsense_queue.sqlite"
+
+    parser = argparse.ArgumentParser(
+        description="Durable SQLite work queue for elastic generation / judging workers."
+    )
+    parser.add_argument("--queue", default=str(default_queue), help="queue SQLite file")
+    parser.add_argument(
+        "--scenarios-path",
+        default=str(root / "data" / "raw" / "normsense_scenarios_v0.3.json"),
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_init = sub.add_parser("init", help="enqueue generation tasks for a sweep")
+    p_init.add_argument("--config", default=str(root / "configs" / "models_hf_local.json"))
+    add_work_filter_args(p_init)
+
+    p_work = sub.add_parser("work", help="lease and run tasks until the queue is drained")
+    p_work.add_argument("--config", default=str(root / "configs" / "models_hf_local.json"))
+    p_work.add_argument("--kind", choices=[GENERATE, JUDGE, "all"], default="all")
+    p_work.add_argument("--judge-model", default="TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+    p_work.add_argument("--worker", default=None, help="host:port of a running HF worker")
+    p_work.add_argument("--worker-id", default=None)
+    p_work.add_argument("--batch", type=int, default=1, help="tasks leased per round trip")
+    p_work.add_argument("--lease-seconds", type=float, default=600.0)
+    p_work.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="attempts per task before its error record (or lease expiry) is final",
+    )
+    p_work.add_argument("--poll-seconds", type=float, default=5.0)
+
+    p_status = sub.add_parser("status", help="print queue depth and throughput")
+    p_status.add_argument("--window", type=float, default=60.0, help="throughput window in seconds")
+
+    p_export = sub.add_parser("export", help="write finished results to JSONL (.gz / .zst by suffix)")
+    p_export.add_argument("--kind", choices=[GENERATE, JUDGE], required=True)
+    p_export.add_argument("--out", required=True)
+
+    args = parser.parse_args()
+    commands = {
+        "init": cmd_init,
+        "work": cmd_work,
+        "status": cmd_status,
+        "export": cmd_export,
+    }
+    commands[args.command](args, root)
+
+
+if __name__ == "__main__":
+    main()
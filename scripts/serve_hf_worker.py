@@ -0,0 +1,36 @@
+from __future__ import annotations
+import argparse
+
+from dotenv import load_dotenv
+
+from normsense.models.hf_worker import DEFAULT_WORKER_ADDRESS, HFWorker
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(
+        description="Keep local HF models loaded and serve generation to the runner scripts."
+    )
+    parser.add_argument(
+        "model_ids",
+        nargs="*",
+        default=["TinyLlama/TinyLlama-1.1B-Chat-v1.0"],
+        help="Models to preload before accepting connections.",
+    )
+    parser.add_argument(
+        "--address",
+        default=DEFAULT_WORKER_ADDRESS,
+        help="host:port to listen on (loopback by default; other hosts need NORMSENSE_HF_WORKER_AUTHKEY)",
+    )
+    args = parser.parse_args()
+
+    worker = HFWorker(address=args.address)
+    for model_id in args.model_ids:
+        worker.get_model(model_id)
+
+    worker.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from normsense.scenarios import load_scenarios
+from normsense.scoring.distilled import (
+    DEFAULT_ALPHAS,
+    DEFAULT_N_FEATURES,
+    SCORE_DIMENSIONS,
+    load_training_pairs,
+    train_distilled_judge,
+)
+from normsense.storage.files import find_artifact
+
+
+def main() -> None:
+    load_dotenv()
+
+    root = Path(__file__).resolve().parents[1]
+
+    parser = argparse.ArgumentParser(
+        description="Train the distilled (hashed-feature ridge) judge on LLM judge scores."
+    )
+    parser.add_argument(
+        "--scores",
+        default=str(root / "data" / "processed" / "model_scores_v0.3.jsonl"),
+        help="Phase 3 output with the LLM judge scores to learn from",
+    )
+    parser.add_argument(
+        "--responses",
+        default=str(root / "data" / "processed" / "model_responses_hf_local.jsonl"),
+        help="Phase 2 output the scores were computed on (for the response texts)",
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=str(root / "data" / "raw" / "normsense_scenarios_v0.3.json"),
+    )
+    parser.add_argument("--out", default=str(root / "data" / "processed" / "distilled_judge.npz"))
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES, help="hash buckets per text (response, scenario)")
+    parser.add_argument(
+        "--alphas",
+        default=",".join(str(a) for a in DEFAULT_ALPHAS),
+        help="comma-separated ridge penalties to choose from on validation scenarios",
+    )
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="share of scenarios held out")
+    args = parser.parse_args()
+    t_start = time.perf_counter()
+
+    scenario_text_by_id = {s.id: s.text for s in load_scenarios(args.scenarios, cache=True).scenarios}
+    pairs = load_training_pairs(find_artifact(args.scores), find_artifact(args.responses), scenario_text_by_id)
+    print(f"Loaded {len(pairs)} judged responses in {time.perf_counter() - t_start:.2f}s.")
+    if pairs.empty:
+        raise SystemExit("No scored responses to train on.")
+
+    result = train_distilled_judge(
+        pairs["scenario_id"],
+        pairs["scenario_text"],
+        pairs["response_text"],
+        pairs[SCORE_DIMENSIONS].to_numpy(dtype="float64"),
+        n_features=args.n_features,
+        alphas=[float(a) for a in args.alphas.split(",")],
+        test_fraction=args.test_fraction,
+    )
+    result.judge.save(args.out)
+
+    agreement_csv = Path(args.out).with_name(Path(args.out).stem + "_agreement.csv")
+    result.agreement.to_csv(agreement_csv, index=False)
+    print(f"alpha={result.alpha:g}, {result.num_train} training / {result.num_test} held-out responses")
+    print("Agreement with the LLM judge on held-out scenarios:")
+    print(result.agreement.to_string(index=False, float_format="%.3f"))
+    print(f"Saved distilled judge to {args.out} and agreement to {agreement_csv}")
+    print(f"Total: {time.perf_counter() - t_start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from normsense.pipeline import STAGES, PipelineConfig, PipelineRunner, stage_dependencies
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(prog="python -m normsense", description="NormSense pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run pipeline stages that are out of date")
+    run.add_argument(
+        "targets",
+        nargs="*",
+        help="stages to bring up to date, with their dependencies (default: "
+        + ", ".join(s.name for s in STAGES if s.default) + ")",
+    )
+    run.add_argument(
+        "--root",
+        default=str(Path(__file__).resolve().parents[2]),
+        help="repository root holding data/, configs/ and reports/",
+    )
+    run.add_argument("--jobs", type=int, default=2, help="stages to run at the same time")
+    run.add_argument(
+        "--force",
+        action="append",
+        default=[],
+        help="re-run this stage even if up to date (repeatable; 'all' for every stage)",
+    )
+    run.add_argument(
+        "--mark-done",
+        action="append",
+        default=[],
+        help="accept this stage's existing outputs as current without running it (repeatable)",
+    )
+    run.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    run.add_argument("--judge-model", default=None)
+    run.add_argument("--judges", default=None, help="model registry config of LLM judges (score stage)")
+    run.add_argument("--worker", default=None, help="host:port of a running HF worker")
+    run.add_argument("--bootstrap", type=int, default=None)
+    run.add_argument("--permutations", type=int, default=None)
+    run.add_argument("--plot-workers", type=int, default=None)
+    run.add_argument("--clusters", type=int, default=None, help="rationale clusters (clusters stage)")
+
+    sub.add_parser("stages", help="list stages and their dependencies")
+    args = parser.parse_args()
+
+    if args.command == "stages":
+        deps = stage_dependencies()
+        for stage in STAGES:
+            after = ", ".join(sorted(deps[stage.name])) or "-"
+            flag = "" if stage.default else "  (only when named)"
+            print(f"{stage.name:<12} after: {after}{flag}")
+        return
+
+    cfg = PipelineConfig(root=args.root, worker=args.worker, plot_workers=args.plot_workers)
+    for name in ("judge_model", "judges", "bootstrap", "permutations", "clusters"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(cfg, name, value)
+
+    results = PipelineRunner(
+        cfg, jobs=args.jobs, force=args.force, mark_done=args.mark_done, dry_run=args.dry_run
+    ).run(args.targets)
+    print("Summary: " + ", ".join(f"{name}={status}" for name, status in results.items()))
+    if any(status in ("failed", "blocked") for status in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Optional, Sequence
 
-import json
 import pandas as pd
 
+from .loading import load_scores_frame
 
-def load_scores(jsonl_path: str | Path) -> pd.DataFrame:
+
+def load_scores(
+    jsonl_path: str | Path,
+    columns: List[str] | None = None,
+    facets: bool = False,
+) -> pd.DataFrame:
     """
-    Load model score records from a JSONL file into a tidy DataFrame.
+    Load model score records from a JSONL file (or a Parquet dataset written
+    by ParquetRecordWriter) into a tidy DataFrame.
     Assumes each line is:
       {
         "scenario_id": ...,
@@ -24,50 +30,10 @@ def load_scores(jsonl_path: str | Path) -> pd.DataFrame:
         },
         ...
       }
+    Error rows are kept with is_error=True and the error as rationale.
+    facets=True adds the scenario facet columns carried on the records.
     """
-    jsonl_path = Path(jsonl_path)
-
-    records: List[Dict[str, Any]] = []
-    with jsonl_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            rec = json.loads(line)
-
-            scores = rec.get("scores", {})
-            if "error" in scores:
-                # Keep error info but no numeric scores
-                records.append(
-                    {
-                        "scenario_id": rec.get("scenario_id"),
-                        "model_name": rec.get("model_name"),
-                        "prompt_variant": rec.get("prompt_variant"),
-                        "politeness": None,
-                        "empathy": None,
-                        "contextual_fit": None,
-                        "overall": None,
-                        "rationale": scores.get("error"),
-                        "is_error": True,
-                    }
-                )
-                continue
-
-            records.append(
-                {
-                    "scenario_id": rec.get("scenario_id"),
-                    "model_name": rec.get("model_name"),
-                    "prompt_variant": rec.get("prompt_variant"),
-                    "politeness": scores.get("politeness"),
-                    "empathy": scores.get("empathy"),
-                    "contextual_fit": scores.get("contextual_fit"),
-                    "overall": scores.get("overall"),
-                    "rationale": scores.get("rationale"),
-                    "is_error": False,
-                }
-            )
-
-    df = pd.DataFrame.from_records(records)
-    return df
+    return load_scores_frame(jsonl_path, include_errors=True, columns=columns, facets=facets)
 
 
 def summarize_by_model_variant(df: pd.DataFrame) -> pd.DataFrame:
@@ -80,7 +46,7 @@ def summarize_by_model_variant(df: pd.DataFrame) -> pd.DataFrame:
     group_cols = ["model_name", "prompt_variant"]
     agg = (
         df_ok
-        .groupby(group_cols)
+        .groupby(group_cols, observed=True)
         .agg(
             n=("scenario_id", "count"),
             politeness_mean=("politeness", "mean"),
@@ -91,3 +57,38 @@ def summarize_by_model_variant(df: pd.DataFrame) -> pd.DataFrame:
         .reset_index()
     )
     return agg
+
+
+def summarize_with_cis(
+    df: pd.DataFrame,
+    n_boot: int = 10_000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    summarize_by_model_variant plus scenario-level bootstrap confidence
+    intervals ({dim}_ci_low/high, {dim}_bca_low/high) for every mean column.
+    """
+    from .bootstrap import bootstrap_cis
+
+    summary = summarize_by_model_variant(df)
+    df_ok = df[~df["is_error"].astype(bool)]
+    cis = bootstrap_cis(df_ok, n_boot=n_boot, confidence=confidence, seed=seed)
+    return summary.merge(cis, on=["model_name", "prompt_variant"], how="left")
+
+
+def summarize_from_store(
+    store_path: str | Path,
+    runs: Optional[Sequence[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    group_by: Sequence[str] = ("model_name", "prompt_variant"),
+) -> pd.DataFrame:
+    """
+    Same summary as summarize_by_model_variant, computed inside a
+    ResultsStore over the selected runs (add "run_id" to group_by to compare
+    runs side by side) and facet filters, e.g. where={"domain": "workplace"}.
+    """
+    from normsense.storage.results_store import ResultsStore
+
+    with ResultsStore(store_path) as store:
+        return store.aggregate(group_by=group_by, runs=runs, where=where)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from statistics import NormalDist
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .loading import SCORE_DIMENSIONS
+
+# Scenario-level (cluster) bootstrap for the Phase 4 summary.
+#
+# Every cell (e.g. model x variant) is reduced to per-scenario score sums and
+# counts, a (cells x scenarios) matrix per dimension. One resample is a vector
+# of scenario multiplicities drawn from a multinomial, so a batch of resamples
+# is a (B x scenarios) count matrix W and the resampled means of all cells are
+#
+#     (W @ sums.T) / (W @ counts.T)
+#
+# i.e. a couple of matrix products per batch instead of a loop over cells.
+# All cells share the same draws, which keeps comparisons between cells
+# paired on scenario_id.
+
+DEFAULT_N_BOOT = 10_000
+# Upper bound on resample-matrix entries per batch (memory, not accuracy).
+_BATCH_ENTRIES = 1 << 23
+
+_NORMAL = NormalDist()
+_norm_cdf = np.frompyfunc(_NORMAL.cdf, 1, 1)
+_norm_ppf = np.frompyfunc(_NORMAL.inv_cdf, 1, 1)
+
+
+def _cluster_matrices(
+    df: pd.DataFrame,
+    group_cols: Sequence[str],
+    value_cols: Sequence[str],
+    cluster_col: str,
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Returns (group keys, sums, counts); sums / counts are (dims, cells, clusters).
+    """
+    grouped = df.groupby(list(group_cols), observed=True, sort=True)
+    keys = grouped.size().index.to_frame(index=False)
+    cell_codes = grouped.ngroup().to_numpy()
+    # Rows with a missing group key get code -1 and are left out.
+    df, cell_codes = df[cell_codes >= 0], cell_codes[cell_codes >= 0]
+    cluster_codes, clusters = pd.factorize(df[cluster_col], sort=False)
+    num_cells, num_clusters = len(keys), len(clusters)
+
+    flat = cell_codes * num_clusters + cluster_codes
+    size = num_cells * num_clusters
+    sums = np.empty((len(value_cols), num_cells, num_clusters))
+    counts = np.empty_like(sums)
+    for d, col in enumerate(value_cols):
+        values = df[col].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(values)
+        sums[d] = np.bincount(flat[ok], weights=values[ok], minlength=size).reshape(num_cells, num_clusters)
+        counts[d] = np.bincount(flat[ok], minlength=size).reshape(num_cells, num_clusters)
+    return keys, sums, counts
+
+
+def _bootstrap_means(sums: np.ndarray, counts: np.ndarray, n_boot: int, seed: int) -> np.ndarray:
+    """
+    (dims, n_boot, cells) resampled means; NaN where a resample drew none of
+    a cell's scenarios.
+    """
+    num_dims, num_cells, num_clusters = sums.shape
+    rng = np.random.default_rng(seed)
+    pvals = np.full(num_clusters, 1.0 / num_clusters)
+    batch = max(1, min(n_boot, _BATCH_ENTRIES // max(num_clusters, 1)))
+
+    # (clusters, dims * cells): one matmul per batch covers every dimension.
+    sums_t = sums.transpose(2, 0, 1).reshape(num_clusters, -1)
+    counts_t = counts.transpose(2, 0, 1).reshape(num_clusters, -1)
+    out = np.empty((n_boot, num_dims * num_cells), dtype=np.float32)
+    for start in range(0, n_boot, batch):
+        stop = min(start + batch, n_boot)
+        w = rng.multinomial(num_clusters, pvals, size=stop - start).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[start:stop] = (w @ sums_t) / (w @ counts_t)
+    return out.reshape(n_boot, num_dims, num_cells).transpose(1, 0, 2)
+
+
+def _column_quantiles(sorted_boot: np.ndarray, num_valid: np.ndarray, probs: np.ndarray) -> np.ndarray:
+    """
+    Linear-interpolated quantile `probs[j]` of column j of a column-sorted
+    (NaN-last) matrix with `num_valid[j]` finite entries.
+    """
+    pos = np.clip(probs, 0.0, 1.0) * np.maximum(num_valid - 1, 0)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(num_valid - 1, 0))
+    frac = pos - lo
+    lo_v = np.take_along_axis(sorted_boot, lo[None, :], axis=0)[0]
+    hi_v = np.take_along_axis(sorted_boot, hi[None, :], axis=0)[0]
+    out = lo_v + frac * (hi_v - lo_v)
+    return np.where(num_valid > 0, out, np.nan)
+
+
+def _jackknife_acceleration(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    BCa acceleration per cell from leave-one-scenario-out means.
+    sums / counts: (cells, clusters).
+    """
+    total, n = sums.sum(axis=1, keepdims=True), counts.sum(axis=1, keepdims=True)
+    present = (counts > 0) & (n - counts > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        jack = np.where(present, (total - sums) / (n - counts), 0.0)
+        num_present = present.sum(axis=1, keepdims=True)
+        jack_mean = jack.sum(axis=1, keepdims=True) / np.maximum(num_present, 1)
+        diff = np.where(present, jack_mean - jack, 0.0)
+        num = (diff ** 3).sum(axis=1)
+        den = 6.0 * (diff ** 2).sum(axis=1) ** 1.5
+        return np.where(den > 0, num / den, 0.0)
+
+
+def _bca_probs(
+    boot: np.ndarray,
+    theta: np.ndarray,
+    num_valid: np.ndarray,
+    accel: np.ndarray,
+    alpha: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BCa-adjusted lower / upper percentile levels per cell (Efron 1987).
+    """
+    below = np.nansum(boot < theta, axis=0) + 0.5 * np.nansum(boot == theta, axis=0)
+    prop = below / np.maximum(num_valid, 1)
+    # Keep z0 finite when theta lies outside every resample.
+    eps = 0.5 / np.maximum(num_valid, 1)
+    z0 = _norm_ppf(np.clip(prop, eps, 1.0 - eps)).astype(np.float64)
+
+    def adjusted(z_alpha: float) -> np.ndarray:
+        z = z0 + z_alpha
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return _norm_cdf(z0 + z / (1.0 - accel * z)).astype(np.float64)
+
+    z_lo = _NORMAL.inv_cdf(alpha / 2)
+    return adjusted(z_lo), adjusted(-z_lo)
+
+
+def bootstrap_cis(
+    df: pd.DataFrame,
+    group_cols: Sequence[str] = ("model_name", "prompt_variant"),
+    value_cols: Sequence[str] = SCORE_DIMENSIONS,
+    n_boot: int = DEFAULT_N_BOOT,
+    confidence: float = 0.95,
+    seed: int = 0,
+    cluster_col: str = "scenario_id",
+) -> pd.DataFrame:
+    """
+    Percentile and BCa bootstrap confidence intervals for the mean of every
+    value column in every group, resampling whole scenarios (`cluster_col`)
+    so repeated judgments of one scenario are not treated as independent.
+
+    Returns one row per group with the group columns and, per value column,
+    {col}_ci_low / {col}_ci_high (percentile) and {col}_bca_low /
+    {col}_bca_high. Rows of df must be valid judgments (no error rows).
+    """
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be in (0, 1), got {confidence}")
+    out_cols = [f"{col}_{kind}_{side}" for col in value_cols for kind in ("ci", "bca") for side in ("low", "high")]
+    if df.empty or n_boot <= 0:
+        return pd.DataFrame(columns=list(group_cols) + out_cols)
+
+    keys, sums, counts = _cluster_matrices(df, group_cols, value_cols, cluster_col)
+    boot = _bootstrap_means(sums, counts, n_boot, seed)
+    alpha = 1.0 - confidence
+
+    out = keys
+    for d, col in enumerate(value_cols):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            theta = sums[d].sum(axis=1) / counts[d].sum(axis=1)
+        b = boot[d]
+        num_valid = (~np.isnan(b)).sum(axis=0)
+        # NaN sorts last, so the first num_valid entries of a column are its resamples.
+        sorted_b = np.sort(b, axis=0)
+
+        cells = len(theta)
+        out[f"{col}_ci_low"] = _column_quantiles(sorted_b, num_valid, np.full(cells, alpha / 2))
+        out[f"{col}_ci_high"] = _column_quantiles(sorted_b, num_valid, np.full(cells, 1 - alpha / 2))
+
+        accel = _jackknife_acceleration(sums[d], counts[d])
+        p_lo, p_hi = _bca_probs(b, theta.astype(np.float32), num_valid, accel, alpha)
+        bca_lo = _column_quantiles(sorted_b, num_valid, np.nan_to_num(p_lo, nan=alpha / 2))
+        bca_hi = _column_quantiles(sorted_b, num_valid, np.nan_to_num(p_hi, nan=1 - alpha / 2))
+        no_data = np.isnan(theta)
+        out[f"{col}_bca_low"] = np.where(no_data, np.nan, bca_lo)
+        out[f"{col}_bca_high"] = np.where(no_data, np.nan, bca_hi)
+    return out
@@ -0,0 +1,400 @@
+from __future__ import annotations
+import heapq
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .loading import DEFAULT_CHUNKSIZE, SCORE_DIMENSIONS, iter_score_chunks
+
+# Failure-mode discovery: cluster judge rationales (optionally with the
+# response texts) of, typically, the low-scoring judgments.
+#
+# Texts are vectorized with a stateless HashingVectorizer (word 1-2 grams,
+# no vocabulary to hold in memory), weighted by TF-IDF and L2-normalized, so
+# k-means on the unit vectors is spherical (cosine) k-means. Work happens in
+# three passes with one batch of sparse rows in memory at a time:
+#   1. vectorize the scores file once, spilling the hashed counts to a
+#      temporary directory; document frequencies per hashed feature (and a
+#      token sample to name the features afterwards),
+#   2. MiniBatchKMeans on the TF-IDF rows (partial_fit per mini-batch when
+#      they do not fit in one chunk),
+#   3. re-read the scores file for cluster assignment, per cluster / model /
+#      variant counts and the examples closest to each centroid (bounded
+#      heaps).
+# scikit-learn is an optional dependency, imported on first use.
+
+DEFAULT_N_FEATURES = 1 << 18
+TEXT_SOURCES = ("rationale", "response", "both")
+# Documents whose tokens are hashed back to names for the top-terms column.
+_VOCAB_SAMPLE_DOCS = 20_000
+
+CLUSTER_COLUMNS = ["cluster", "n", "share"] + [f"{d}_mean" for d in SCORE_DIMENSIONS] + ["top_terms"]
+BREAKDOWN_COLUMNS = ["cluster", "model_name", "prompt_variant", "n", "share_of_group"]
+EXAMPLE_COLUMNS = (
+    ["cluster", "rank", "similarity", "scenario_id", "model_name", "prompt_variant"]
+    + SCORE_DIMENSIONS
+    + ["rationale", "response_text"]
+)
+
+
+def _sklearn():
+    """
+    Import the scikit-learn pieces on first use (only this stage needs them).
+    """
+    try:
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.preprocessing import normalize
+        from sklearn.utils import murmurhash3_32
+    except ImportError:
+        raise RuntimeError(
+            "scikit-learn is required for rationale clustering. Install it with `pip install scikit-learn`."
+        ) from None
+    return MiniBatchKMeans, HashingVectorizer, normalize, murmurhash3_32
+
+
+@dataclass
+class RationaleClusters:
+    """
+    Result of cluster_rationales(): one row per cluster in `clusters`, its
+    size per model x variant in `breakdown`, and the documents closest to
+    each centroid in `examples`.
+    """
+
+    clusters: pd.DataFrame
+    breakdown: pd.DataFrame
+    examples: pd.DataFrame
+    num_documents: int
+
+
+def _iter_batches(
+    scores_path: Path,
+    dimension: str,
+    max_score: Optional[float],
+    chunksize: int,
+) -> Iterator[pd.DataFrame]:
+    """
+    Valid score rows with a rationale (and score <= max_score), in chunks.
+    """
+    for chunk in iter_score_chunks(scores_path, chunksize=chunksize, include_errors=False):
+        keep = chunk["rationale"].notna() & (chunk["rationale"].astype(str).str.strip() != "")
+        if max_score is not None:
+            keep &= chunk[dimension] <= max_score
+        chunk = chunk[keep]
+        if not chunk.empty:
+            yield chunk.reset_index(drop=True)
+
+
+class _ResponseTexts:
+    """
+    Response texts for score rows, fetched per batch through the Phase 2
+    offset index.
+    """
+
+    def __init__(self, responses_path: str | Path) -> None:
+        from normsense.storage.index import load_index
+
+        self.index = load_index(responses_path, build_missing=True)
+
+    def __call__(self, batch: pd.DataFrame) -> List[str]:
+        keys = list(
+            zip(
+                batch["scenario_id"].astype(str),
+                batch["prompt_variant"].astype(str),
+                batch["model_name"].astype(str),
+            )
+        )
+        found = self.index.fetch_many(set(keys))
+        return [(found.get(key) or {}).get("response_text") or "" for key in keys]
+
+
+def _documents(batch: pd.DataFrame, text: str, responses: Optional[_ResponseTexts]) -> List[str]:
+    rationales = batch["rationale"].astype(str).tolist()
+    if text == "rationale":
+        return rationales
+    texts = responses(batch) if responses is not None else [""] * len(batch)
+    if text == "response":
+        return texts
+    return [f"{r}\n{t}" for r, t in zip(rationales, texts)]
+
+
+def _top_terms(
+    centers: np.ndarray,
+    names: Dict[int, str],
+    num_terms: int,
+) -> List[str]:
+    out = []
+    for center in centers:
+        terms = []
+        for feature in np.argsort(center)[::-1]:
+            if center[feature] <= 0 or len(terms) >= num_terms:
+                break
+            if feature in names:
+                terms.append(names[feature])
+        out.append(", ".join(terms))
+    return out
+
+
+def cluster_rationales(
+    scores_path: str | Path,
+    n_clusters: int = 20,
+    dimension: str = "overall",
+    max_score: Optional[float] = None,
+    text: str = "rationale",
+    responses_path: Optional[str | Path] = None,
+    n_features: int = DEFAULT_N_FEATURES,
+    n_examples: int = 5,
+    num_terms: int = 8,
+    batch_size: int = 4096,
+    epochs: int = 1,
+    seed: int = 0,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> RationaleClusters:
+    """
+    Cluster the rationales of a Phase 3 scores file (optionally only rows
+    with `dimension` <= max_score) into n_clusters recurring themes.
+
+    text="response" or "both" clusters the Phase 2 response texts (looked up
+    in responses_path through its offset index) instead of / together with
+    the rationales. Memory is bounded by one chunk of sparse rows plus the
+    n_clusters x n_features centroids; `epochs` is the number of streaming
+    passes of mini-batch updates for inputs larger than one chunk.
+    """
+    if text not in TEXT_SOURCES:
+        raise ValueError(f"text must be one of {TEXT_SOURCES}, got {text!r}")
+    if text != "rationale" and responses_path is None:
+        raise ValueError(f"text={text!r} needs responses_path")
+    HashingVectorizer = _sklearn()[1]
+
+    scores_path = Path(scores_path)
+    responses = _ResponseTexts(responses_path) if text != "rationale" else None
+    vectorizer = HashingVectorizer(
+        n_features=n_features,
+        ngram_range=(1, 2),
+        stop_words="english",
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float32,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="normsense-clusters-") as spill_dir:
+        return _cluster(
+            lambda: _iter_batches(scores_path, dimension, max_score, chunksize),
+            Path(spill_dir),
+            vectorizer,
+            text,
+            responses,
+            n_clusters=n_clusters,
+            n_features=n_features,
+            n_examples=n_examples,
+            num_terms=num_terms,
+            batch_size=batch_size,
+            epochs=epochs,
+            seed=seed,
+            in_memory=chunksize,
+        )
+
+
+def _cluster(
+    read_batches: Callable[[], Iterator[pd.DataFrame]],
+    spill_dir: Path,
+    vectorizer: Any,
+    text: str,
+    responses: Optional[_ResponseTexts],
+    n_clusters: int,
+    n_features: int,
+    n_examples: int,
+    num_terms: int,
+    batch_size: int,
+    epochs: int,
+    seed: int,
+    in_memory: int,
+) -> RationaleClusters:
+    MiniBatchKMeans, _, normalize, murmurhash3_32 = _sklearn()
+    import scipy.sparse as sp
+
+    # Pass 1: vectorize once, spilling the hashed counts to disk; document
+    # frequencies and a sample of feature names.
+    doc_freq = np.zeros(n_features, dtype=np.int64)
+    num_docs = 0
+    names: Dict[int, str] = {}
+    analyzer = vectorizer.build_analyzer()
+    spills: List[Path] = []
+    for batch in read_batches():
+        docs = _documents(batch, text, responses)
+        counts = vectorizer.transform(docs)
+        spills.append(spill_dir / f"{len(spills):06d}.npz")
+        sp.save_npz(spills[-1], counts, compressed=False)
+        doc_freq += np.bincount(counts.indices, minlength=n_features)
+        for doc in docs[: max(0, _VOCAB_SAMPLE_DOCS - num_docs)]:
+            for token in analyzer(doc):
+                names.setdefault(abs(murmurhash3_32(token, seed=0)) % n_features, token)
+        num_docs += counts.shape[0]
+    if num_docs == 0:
+        return RationaleClusters(
+            pd.DataFrame(columns=CLUSTER_COLUMNS),
+            pd.DataFrame(columns=BREAKDOWN_COLUMNS),
+            pd.DataFrame(columns=EXAMPLE_COLUMNS),
+            0,
+        )
+    idf = (np.log((1.0 + num_docs) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+    n_clusters = min(n_clusters, num_docs)
+
+    def tfidf(spill: Path) -> Any:
+        counts = sp.load_npz(spill).tocsr()
+        counts.data = (1.0 + np.log(counts.data)) * idf[counts.indices]
+        return normalize(counts, copy=False)
+
+    # Pass 2: fit; in memory when everything fits in one chunk, otherwise
+    # one partial_fit step per mini-batch of `batch_size` rows.
+    batch_size = max(batch_size, n_clusters)
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=seed, n_init=3)
+    if num_docs <= max(in_memory, batch_size):
+        kmeans.fit(_vstack([tfidf(spill) for spill in spills]))
+    else:
+        for _ in range(max(1, epochs)):
+            for block in _minibatches((tfidf(spill) for spill in spills), batch_size):
+                kmeans.partial_fit(block)
+    centers = normalize(kmeans.cluster_centers_)
+
+    # Pass 3: assign, count and keep the examples nearest to each centroid
+    # (the score rows are read again; the vectors come from the spill).
+    dims = list(SCORE_DIMENSIONS)
+    sizes = np.zeros(n_clusters, dtype=np.int64)
+    score_sums = np.zeros((n_clusters, len(dims)))
+    score_counts = np.zeros((n_clusters, len(dims)))
+    group_counts: Dict[Tuple[int, str, str], int] = {}
+    heaps: List[List[Tuple[float, int, Dict[str, Any]]]] = [[] for _ in range(n_clusters)]
+    example_cols = ["scenario_id", "model_name", "prompt_variant", *dims, "rationale"]
+    ordinal = 0
+    for batch, spill in zip(read_batches(), spills):
+        sims = np.asarray(tfidf(spill) @ centers.T)
+        labels = sims.argmax(axis=1)
+        best = sims[np.arange(len(labels)), labels]
+        sizes += np.bincount(labels, minlength=n_clusters)
+        values = batch[dims].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(values)
+        np.add.at(score_sums, labels, np.where(ok, values, 0.0))
+        np.add.at(score_counts, labels, ok)
+
+        grouped = pd.DataFrame(
+            {
+                "cluster": labels,
+                "model_name": batch["model_name"].astype(str),
+                "prompt_variant": batch["prompt_variant"].astype(str),
+            }
+        ).value_counts()
+        for key, n in grouped.items():
+            group_counts[key] = group_counts.get(key, 0) + int(n)
+
+        # Candidates: the n_examples most similar rows of each cluster in this batch.
+        order = np.lexsort((-best, labels))
+        first = np.searchsorted(labels[order], np.arange(n_clusters))
+        last = np.searchsorted(labels[order], np.arange(n_clusters), side="right")
+        texts = _documents(batch, "response", responses) if responses is not None else None
+        for c in range(n_clusters):
+            for i in order[first[c]:min(last[c], first[c] + n_examples)]:
+                row = batch.iloc[i]
+                entry = {col: row[col] for col in example_cols}
+                entry["response_text"] = texts[i] if texts is not None else None
+                item = (float(best[i]), -(ordinal + int(i)), entry)
+                if len(heaps[c]) < n_examples:
+                    heapq.heappush(heaps[c], item)
+                else:
+                    heapq.heappushpop(heaps[c], item)
+        ordinal += len(batch)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = score_sums / score_counts
+    clusters = pd.DataFrame({"cluster": np.arange(n_clusters), "n": sizes, "share": sizes / num_docs})
+    for j, dim in enumerate(dims):
+        clusters[f"{dim}_mean"] = means[:, j]
+    clusters["top_terms"] = _top_terms(centers, names, num_terms)
+    # k-means can leave clusters empty (e.g. many documents with no tokens).
+    clusters = clusters[clusters["n"] > 0]
+    clusters = clusters.sort_values(["n", "cluster"], ascending=[False, True]).reset_index(drop=True)
+
+    breakdown = pd.DataFrame(
+        [(c, m, v, n) for (c, m, v), n in group_counts.items()],
+        columns=["cluster", "model_name", "prompt_variant", "n"],
+    )
+    group_totals = breakdown.groupby(["model_name", "prompt_variant"])["n"].transform("sum")
+    breakdown["share_of_group"] = breakdown["n"] / group_totals
+    breakdown = breakdown.sort_values(["cluster", "model_name", "prompt_variant"]).reset_index(drop=True)
+
+    example_rows = []
+    for c, heap in enumerate(heaps):
+        ranked = sorted(heap, key=lambda item: (-item[0], -item[1]))
+        for rank, (similarity, _, entry) in enumerate(ranked, start=1):
+            example_rows.append({"cluster": c, "rank": rank, "similarity": similarity, **entry})
+    examples = pd.DataFrame(example_rows, columns=EXAMPLE_COLUMNS)
+    return RationaleClusters(clusters, breakdown[BREAKDOWN_COLUMNS], examples, num_docs)
+
+
+def _vstack(blocks: Sequence[Any]) -> Any:
+    import scipy.sparse as sp
+
+    return blocks[0] if len(blocks) == 1 else sp.vstack(blocks, format="csr")
+
+
+def _minibatches(chunks: Iterator[Any], size: int) -> Iterator[Any]:
+    """
+    Re-cut a stream of sparse row blocks into blocks of `size` rows (the
+    last one may be shorter).
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = _vstack([carry, chunk])
+        full = chunk.shape[0] - chunk.shape[0] % size
+        for start in range(0, full, size):
+            yield chunk[start:start + size]
+        carry = chunk[full:] if full < chunk.shape[0] else None
+    if carry is not None:
+        yield carry
+
+
+def write_clusters_markdown(
+    out_path: str | Path,
+    result: RationaleClusters,
+    title: str = "Rationale Clusters",
+) -> None:
+    """
+    Write a cluster report: per cluster its size, mean scores, top terms,
+    its share of every model x variant and the representative examples.
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        f.write(f"# {title}\n\n")
+        f.write(f"{result.num_documents} documents in {len(result.clusters)} clusters.\n\n")
+        for _, cluster in result.clusters.iterrows():
+            c = int(cluster["cluster"])
+            f.write(f"## Cluster {c} ({int(cluster['n'])} documents, {cluster['share']:.1%})\n\n")
+            f.write(f"Top terms: {cluster['top_terms'] or '-'}\n\n")
+            scores = ", ".join(f"{dim}: {cluster[f'{dim}_mean']:.2f}" for dim in SCORE_DIMENSIONS)
+            f.write(f"Mean scores: {scores}\n\n")
+
+            share = result.breakdown[result.breakdown["cluster"] == c]
+            if not share.empty:
+                f.write("| Model | Variant | n | Share of model x variant |\n|---|---|---|---|\n")
+                for _, row in share.iterrows():
+                    f.write(
+                        f"| {row['model_name']} | {row['prompt_variant']} | {int(row['n'])} "
+                        f"| {row['share_of_group']:.1%} |\n"
+                    )
+                f.write("\n")
+
+            for _, row in result.examples[result.examples["cluster"] == c].iterrows():
+                f.write(
+                    f"- **{row['model_name']}** ({row['prompt_variant']}), scenario {row['scenario_id']}, "
+                    f"overall {row['overall']} (similarity {row['similarity']:.2f})\n"
+                )
+                f.write(f"  - Rationale: {row['rationale']}\n")
+                if isinstance(row["response_text"], str) and row["response_text"]:
+                    f.write(f"  - Response: {row['response_text']}\n")
+            f.write("\n")
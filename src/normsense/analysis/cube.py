@@ -0,0 +1,158 @@
+from __future__ import annotations
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from normsense.scenarios import Scenario, ScenarioSet
+from .loading import FACET_COLUMNS, SCORE_DIMENSIONS
+
+# One-pass aggregation over several grouping sets (SQL GROUPING SETS).
+#
+# The scan of the score rows happens once, at the finest grain (the union of
+# all grouping columns), collecting per-cell counts, sums and sums of squares.
+# Every requested grouping set is then rolled up from that small table, so
+# adding breakdowns costs nothing proportional to the number of rows.
+
+GroupingSet = Tuple[str, ...]
+
+UNKNOWN = "unknown"
+
+DEFAULT_GROUPING_SETS: List[GroupingSet] = (
+    [("model_name", "prompt_variant")]
+    + [("model_name", "prompt_variant", facet) for facet in FACET_COLUMNS]
+    + [("model_name", facet) for facet in FACET_COLUMNS]
+    + [("prompt_variant", facet) for facet in FACET_COLUMNS]
+    + [("model_name",), ("prompt_variant",)]
+    + [(facet,) for facet in FACET_COLUMNS]
+)
+
+
+def attach_facets(
+    df: pd.DataFrame,
+    scenarios: ScenarioSet | Mapping[str, Scenario],
+) -> pd.DataFrame:
+    """
+    Fill the facet columns (domain, norm_type, cultural_tag, stakes_level)
+    of a scores frame from a ScenarioSet (or an id -> Scenario mapping).
+    Values already carried on the records are kept; scenario ids that are
+    not in the set get "unknown". The lookup runs once per distinct
+    scenario_id, not per row.
+    """
+    by_id = scenarios.by_id if isinstance(scenarios, ScenarioSet) else scenarios
+    codes, ids = pd.factorize(df["scenario_id"])
+    # Missing scenario ids (code -1) point at a trailing None entry.
+    codes = np.where(codes >= 0, codes, len(ids))
+    out = df.copy()
+    for facet in FACET_COLUMNS:
+        per_id = []
+        for sid in ids:
+            value = getattr(by_id.get(sid), facet, None)
+            per_id.append(getattr(value, "value", value))
+        per_id.append(None)
+        value_codes, categories = pd.factorize(pd.Series(per_id, dtype=object).fillna(UNKNOWN))
+        joined = pd.Series(pd.Categorical.from_codes(value_codes[codes], categories=categories), index=df.index)
+        if facet in out.columns and out[facet].notna().any():
+            carried = out[facet].astype(object)
+            joined = carried.where(carried.notna(), joined.astype(object)).astype("category")
+        out[facet] = joined
+    return out
+
+
+def _stats_columns(dimensions: Sequence[str], with_std: bool) -> List[str]:
+    cols = ["n"] + [f"{dim}_mean" for dim in dimensions]
+    if with_std:
+        cols += [f"{dim}_std" for dim in dimensions]
+    return cols
+
+
+def cube(
+    df: pd.DataFrame,
+    grouping_sets: Optional[Sequence[Sequence[str]]] = None,
+    dimensions: Sequence[str] = SCORE_DIMENSIONS,
+    with_std: bool = True,
+) -> pd.DataFrame:
+    """
+    Mean (and sample std) of every score dimension for every grouping set,
+    from a single groupby over the score rows.
+
+    Returns a long table with a `grouping` column ("model_name+domain"),
+    one column per grouping column used by any set (empty where a set does
+    not group by it), n and {dim}_mean / {dim}_std. Error rows are
+    excluded; missing facet values are grouped as "unknown".
+    """
+    sets = [tuple(s) for s in (grouping_sets if grouping_sets is not None else DEFAULT_GROUPING_SETS)]
+    group_cols: List[str] = []
+    for s in sets:
+        group_cols += [c for c in s if c not in group_cols]
+    missing = [c for c in group_cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"Grouping columns {missing} are not in the frame; see attach_facets().")
+
+    out_cols = ["grouping"] + group_cols + _stats_columns(dimensions, with_std)
+    if "is_error" in df.columns:
+        df = df[~df["is_error"].astype(bool)]
+    if df.empty:
+        return pd.DataFrame(columns=out_cols)
+
+    # Finest grain: one row per combination of all grouping columns.
+    data = {}
+    for col in group_cols:
+        keys = df[col]
+        if isinstance(keys.dtype, pd.CategoricalDtype) and UNKNOWN not in keys.cat.categories:
+            keys = keys.cat.add_categories([UNKNOWN])
+        data[col] = keys.fillna(UNKNOWN)
+    data["n"] = np.ones(len(df), dtype=np.int64)
+    for dim in dimensions:
+        values = df[dim].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(values)
+        data[f"{dim}__n"] = ok.astype(np.int64)
+        data[f"{dim}__sum"] = np.where(ok, values, 0.0)
+        data[f"{dim}__sq"] = np.where(ok, values * values, 0.0)
+    base = pd.DataFrame(data).groupby(group_cols, observed=True, sort=False).sum()
+
+    # Roll every grouping set up from the finest-grain table with NumPy.
+    base_keys = base.index.to_frame(index=False)
+    level_codes = {}
+    level_values = {}
+    for col in group_cols:
+        level_codes[col], level_values[col] = pd.factorize(base_keys[col].astype(object), sort=True)
+    stat_names = list(base.columns)
+    stats = base.to_numpy(dtype=np.float64)
+
+    parts = []
+    for s in sets:
+        cols = list(s)
+        flat = np.ravel_multi_index(
+            [level_codes[c] for c in cols], [len(level_values[c]) for c in cols]
+        )
+        cells, inverse = np.unique(flat, return_inverse=True)
+        rolled = np.zeros((len(cells), len(stat_names)))
+        np.add.at(rolled, inverse, stats)
+        r = dict(zip(stat_names, rolled.T))
+
+        part = {"grouping": "+".join(s)}
+        for col, col_codes in zip(cols, np.unravel_index(cells, [len(level_values[c]) for c in cols])):
+            part[col] = np.asarray(level_values[col], dtype=object)[col_codes]
+        part["n"] = r["n"].astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for dim in dimensions:
+                count = r[f"{dim}__n"]
+                mean = np.where(count > 0, r[f"{dim}__sum"] / count, np.nan)
+                part[f"{dim}_mean"] = mean
+                if with_std:
+                    m2 = np.maximum(r[f"{dim}__sq"] - count * mean * mean, 0.0)
+                    part[f"{dim}_std"] = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+        parts.append(pd.DataFrame(part))
+
+    result = pd.concat(parts, ignore_index=True)
+    return result[out_cols]
+
+
+def cube_slice(result: pd.DataFrame, grouping: Sequence[str]) -> pd.DataFrame:
+    """
+    The rows of one grouping set, with only its grouping columns.
+    """
+    rows = result[result["grouping"] == "+".join(grouping)]
+    stats = list(result.columns[result.columns.get_loc("n"):])
+    return rows[list(grouping) + stats].reset_index(drop=True)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cube import UNKNOWN
+from .loading import FACET_COLUMNS, SCORE_DIMENSIONS
+
+# Additive decomposition of judge scores (a linear IRT-style model):
+#
+#   score = intercept + ability[model] + effect[variant]
+#           + sum_f effect_f[facet_f(scenario)] + difficulty[scenario] + noise
+#
+# Model, variant and facet effects are fixed and sum to zero over their
+# levels. Scenario difficulty is a random effect (variance tau^2) around its
+# facet effects, so facets stay identifiable although every facet is a
+# property of the scenario; noise has variance sigma^2.
+#
+# Rows are first collapsed to (scenario, model, variant) cells. The fit is
+# backfitting (alternating least squares) over the cells, every update one
+# np.bincount for all dimensions at once: model and variant effects at cell
+# level, then facet effects at scenario level with the scenario effect
+# integrated out (weights n_j * lam / (n_j + lam), lam = sigma^2 / tau^2),
+# then the scenario BLUPs. sigma^2 and tau^2 are re-estimated after every
+# sweep. Cost per sweep is linear in the number of cells.
+
+EFFECT_COLUMNS = ["dimension", "term", "level", "estimate", "se", "n"]
+FIT_COLUMNS = [
+    "dimension",
+    "n",
+    "intercept",
+    "sigma",
+    "scenario_sd",
+    "r2",
+    "iterations",
+    "converged",
+]
+
+_FACET_SWEEPS = 25
+_TAU_STEPS = 10
+
+
+@dataclass
+class EffectsFit:
+    """
+    Result of fit_effects(): `effects` has one row per (dimension, term,
+    level) with its estimate, standard error and number of judgments;
+    `fit` has one row per dimension with the intercept, residual and
+    scenario standard deviations, R^2 and convergence information.
+    """
+
+    effects: pd.DataFrame
+    fit: pd.DataFrame
+
+    def term(self, term: str, dimension: str = "overall") -> pd.DataFrame:
+        """
+        Levels of one term for one dimension, sorted by estimate.
+        """
+        rows = self.effects[(self.effects["term"] == term) & (self.effects["dimension"] == dimension)]
+        return rows.sort_values("estimate", ascending=False).reset_index(drop=True)
+
+
+def _bincount2(codes: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """
+    Per-level sums of a (rows, dims) weight matrix in one np.bincount.
+    """
+    dims = weights.shape[1]
+    flat = (codes[:, None] * dims + np.arange(dims)).ravel()
+    return np.bincount(flat, weights=weights.ravel(), minlength=size * dims).reshape(size, dims)
+
+
+def _center(effect: np.ndarray, support: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum-to-zero over levels with data; returns (centered effect, shift).
+    """
+    has = support > 0
+    num = np.maximum(has.sum(axis=0), 1)
+    shift = np.where(has, effect, 0.0).sum(axis=0) / num
+    return np.where(has, effect - shift, 0.0), shift
+
+
+def _cells(
+    df: pd.DataFrame,
+    dimensions: Sequence[str],
+    facets: Sequence[str],
+) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Collapse rows to (scenario, model, variant) cells.
+
+    Returns ({term: (codes per cell, levels)} with facet codes per scenario,
+    per-cell judgment counts (cells x dims), per-cell means, within-cell
+    sums of squares, and per-dimension totals of squares about zero).
+    """
+    keys = ["scenario_id", "model_name", "prompt_variant"]
+    codes = {}
+    levels = {}
+    for col in keys:
+        codes[col], levels[col] = pd.factorize(df[col].astype(object), sort=True)
+
+    values = df[list(dimensions)].to_numpy(dtype=np.float64)
+    ok = ~np.isnan(values)
+    values = np.where(ok, values, 0.0)
+    frame = pd.DataFrame({col: codes[col] for col in keys})
+    for i in range(len(dimensions)):
+        frame[f"n{i}"] = ok[:, i].astype(np.int64)
+        frame[f"s{i}"] = values[:, i]
+        frame[f"q{i}"] = values[:, i] * values[:, i]
+    grouped = frame.groupby(keys, sort=False).sum()
+    cell_keys = grouped.index.to_frame(index=False)
+
+    dims = range(len(dimensions))
+    counts = grouped[[f"n{i}" for i in dims]].to_numpy(dtype=np.float64)
+    sums = grouped[[f"s{i}" for i in dims]].to_numpy()
+    squares = grouped[[f"q{i}" for i in dims]].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, 0.0)
+    within = np.maximum(squares - counts * means * means, 0.0).sum(axis=0)
+
+    terms = {col: (cell_keys[col].to_numpy(), np.asarray(levels[col], dtype=object)) for col in keys}
+    num_scenarios = len(levels["scenario_id"])
+    for facet in facets:
+        raw = df[facet].astype(object)
+        facet_codes, facet_levels = pd.factorize(raw.where(raw.notna(), UNKNOWN), sort=True)
+        per_scenario = np.zeros(num_scenarios, dtype=np.int64)
+        per_scenario[codes["scenario_id"]] = facet_codes
+        terms[facet] = (per_scenario, np.asarray(facet_levels, dtype=object))
+    return terms, counts, means, within, squares.sum(axis=0)
+
+
+def fit_effects(
+    df: pd.DataFrame,
+    dimensions: Sequence[str] = SCORE_DIMENSIONS,
+    facets: Sequence[str] = FACET_COLUMNS,
+    max_iter: int = 200,
+    tol: float = 1e-6,
+) -> EffectsFit:
+    """
+    Fit model ability, prompt-variant, facet and scenario-difficulty effects
+    to every score dimension (see the module comment for the model).
+
+    Facets missing from the frame are left out (see attach_facets()); a
+    facet that varies within a scenario takes the value of the scenario's
+    last row. Standard errors are conditional on the other effects: sigma /
+    sqrt(n) for models and variants, the scenario-level GLS error for
+    facets and the posterior sd for scenarios. Error rows are excluded.
+    """
+    if "is_error" in df.columns:
+        df = df[~df["is_error"].astype(bool)]
+    dimensions = list(dimensions)
+    facets = [f for f in facets if f in df.columns]
+    if df.empty:
+        return EffectsFit(pd.DataFrame(columns=EFFECT_COLUMNS), pd.DataFrame(columns=FIT_COLUMNS))
+
+    terms, counts, ybar, within, total_sq = _cells(df, dimensions, facets)
+    num_dims = len(dimensions)
+    scen_codes, scen_levels = terms["scenario_id"]
+    num_scen = len(scen_levels)
+    n_total = counts.sum(axis=0)
+    cell_sum = counts * ybar
+
+    fixed = ["model_name", "prompt_variant"]
+    effects = {t: np.zeros((len(terms[t][1]), num_dims)) for t in fixed + facets}
+    effects["scenario_id"] = np.zeros((num_scen, num_dims))
+    support = {t: _bincount2(terms[t][0], counts, len(terms[t][1])) for t in fixed}
+    scen_n = _bincount2(scen_codes, counts, num_scen)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        intercept = np.where(n_total > 0, cell_sum.sum(axis=0) / n_total, np.nan)
+        sst = total_sq - n_total * intercept * intercept
+        sigma2 = np.where(n_total > 0, sst / n_total, 0.0)
+    tau2 = sigma2 / 2
+    intercept = np.nan_to_num(intercept)
+
+    def cell_effect(term: str) -> np.ndarray:
+        return effects[term][terms[term][0]]
+
+    def facet_fit() -> np.ndarray:
+        fit = np.zeros((num_scen, num_dims))
+        for facet in facets:
+            fit += effects[facet][terms[facet][0]]
+        return fit
+
+    converged = False
+    iterations = 0
+    scen_w = scen_n
+    for iterations in range(1, max_iter + 1):
+        previous = {t: e.copy() for t, e in effects.items()}
+        prev_intercept = intercept.copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            lam = np.where(tau2 > 0, sigma2 / tau2, np.inf)
+            # Model and variant effects given everything else, facets included:
+            # without them, model ability absorbs facet effects whenever a model
+            # covers the facet levels unevenly.
+            scen_fit = effects["scenario_id"] + facet_fit()
+            for term in fixed:
+                offset = intercept + scen_fit[scen_codes] + sum(
+                    cell_effect(t) for t in fixed if t != term
+                )
+                num = _bincount2(terms[term][0], counts * (ybar - offset), len(terms[term][1]))
+                raw = np.where(support[term] > 0, num / support[term], 0.0)
+                effects[term], shift = _center(raw, support[term])
+                intercept = intercept + shift
+
+            # Facets on scenario means with the scenario effect integrated out.
+            resid = ybar - intercept - sum(cell_effect(t) for t in fixed)
+            scen_sum = _bincount2(scen_codes, counts * resid, num_scen)
+            scen_mean = np.where(scen_n > 0, scen_sum / scen_n, 0.0)
+            scen_w = np.where(np.isinf(lam), scen_n, scen_n * lam / (scen_n + lam))
+            scen_w = np.where(scen_n > 0, scen_w, 0.0)
+            for _ in range(_FACET_SWEEPS if len(facets) > 1 else 1):
+                for facet in facets:
+                    codes, levels = terms[facet]
+                    fit = facet_fit() - effects[facet][codes]
+                    num = _bincount2(codes, scen_w * (scen_mean - fit), len(levels))
+                    den = _bincount2(codes, scen_w, len(levels))
+                    raw = np.where(den > 0, num / den, 0.0)
+                    effects[facet], shift = _center(raw, den)
+                    intercept = intercept + shift
+                    scen_mean = scen_mean - shift
+
+            # Scenario BLUPs (shrunk towards their facet effects).
+            shrink = np.where(np.isinf(lam), 0.0, scen_n / (scen_n + lam))
+            effects["scenario_id"] = np.where(scen_n > 0, shrink * (scen_mean - facet_fit()), 0.0)
+
+            # Variance components: EM for sigma^2; tau^2 by the scoring
+            # fixed point of the scenario-level marginal likelihood, which
+            # (unlike EM) converges quickly when tau^2 is near zero.
+            fitted = intercept + sum(cell_effect(t) for t in fixed) + cell_effect("scenario_id")
+            fitted = fitted + facet_fit()[scen_codes]
+            sse = within + (counts * (ybar - fitted) ** 2).sum(axis=0)
+            post_var = np.where(scen_n > 0, sigma2 / (scen_n + lam), 0.0)
+            scen_e2 = np.where(scen_n > 0, (scen_mean - facet_fit()) ** 2, 0.0)
+            scen_var = np.where(scen_n > 0, sigma2 / scen_n, np.inf)
+            excess = scen_e2 - np.where(scen_n > 0, scen_var, 0.0)
+            for _ in range(_TAU_STEPS):
+                w2 = 1.0 / (tau2 + scen_var) ** 2
+                tau2 = np.maximum((w2 * excess).sum(axis=0) / w2.sum(axis=0), 0.0)
+            sigma2 = np.where(
+                n_total > 0, (sse + (scen_n * post_var).sum(axis=0)) / np.maximum(n_total, 1), 0.0
+            )
+
+        change = max(
+            float(np.max(np.abs(effects[t] - previous[t]), initial=0.0)) for t in effects
+        )
+        change = max(change, float(np.max(np.abs(intercept - prev_intercept))))
+        if change < tol:
+            converged = True
+            break
+
+    sigma = np.sqrt(sigma2)
+    rows: List[pd.DataFrame] = []
+
+    def add(term: str, estimate: np.ndarray, se: np.ndarray, n: np.ndarray) -> None:
+        levels = terms[term][1]
+        keep = n > 0
+        for d, dim in enumerate(dimensions):
+            k = keep[:, d]
+            rows.append(
+                pd.DataFrame(
+                    {
+                        "dimension": dim,
+                        "term": term,
+                        "level": levels[k],
+                        "estimate": estimate[k, d],
+                        "se": se[k, d],
+                        "n": n[k, d].astype(np.int64),
+                    }
+                )
+            )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for term in fixed:
+            add(term, effects[term], sigma / np.sqrt(support[term]), support[term])
+        for facet in facets:
+            codes, levels = terms[facet]
+            den = _bincount2(codes, scen_w, len(levels))
+            add(facet, effects[facet], sigma / np.sqrt(den), _bincount2(codes, scen_n, len(levels)))
+        lam = np.where(tau2 > 0, sigma2 / tau2, np.inf)
+        add("scenario_id", effects["scenario_id"], sigma / np.sqrt(scen_n + lam), scen_n)
+        r2 = np.where(sst > 0, 1.0 - sse / sst, np.nan)
+
+    fit = pd.DataFrame(
+        {
+            "dimension": dimensions,
+            "n": n_total.astype(np.int64),
+            "intercept": np.where(n_total > 0, intercept, np.nan),
+            "sigma": sigma,
+            "scenario_sd": np.sqrt(tau2),
+            "r2": r2,
+            "iterations": iterations,
+            "converged": converged,
+        }
+    )
+    return EffectsFit(pd.concat(rows, ignore_index=True)[EFFECT_COLUMNS], fit[FIT_COLUMNS])
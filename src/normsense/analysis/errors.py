@@ -1,43 +1,18 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List
-import json
+from typing import Dict, Sequence
 
 import pandas as pd
 
+from .loading import load_scores_frame
+
 
 def load_scores_df(scores_path: str | Path) -> pd.DataFrame:
     """
     Load scores file (Phase 3 output) into a DataFrame.
-    Expects each line to be a JSON object with a 'scores' dict.
+    Items where the judge failed are skipped.
     """
-    scores_path = Path(scores_path)
-    records: List[Dict[str, Any]] = []
-
-    with scores_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            rec = json.loads(line)
-            scores = rec.get("scores", {})
-            if "error" in scores:
-                # skip items where judge failed
-                continue
-
-            records.append(
-                {
-                    "scenario_id": rec["scenario_id"],
-                    "model_name": rec["model_name"],
-                    "prompt_variant": rec["prompt_variant"],
-                    "politeness": scores.get("politeness"),
-                    "empathy": scores.get("empathy"),
-                    "contextual_fit": scores.get("contextual_fit"),
-                    "overall": scores.get("overall"),
-                    "rationale": scores.get("rationale"),
-                }
-            )
-
-    return pd.DataFrame.from_records(records)
+    return load_scores_frame(scores_path, include_errors=False)
 
 
 def extract_worst_examples(df: pd.DataFrame, k: int = 10) -> Dict[str, pd.DataFrame]:
@@ -68,3 +43,53 @@ def extract_best_examples(df: pd.DataFrame, k: int = 10) -> Dict[str, pd.DataFra
     groups["contextual_fit_high"] = df.nlargest(k, "contextual_fit")
     groups["overall_high"] = df.nlargest(k, "overall")
     return groups
+
+
+def _write_examples(f, examples: Dict[str, pd.DataFrame], group_cols: Sequence[str]) -> None:
+    for key, subset in examples.items():
+        f.write(f"### {key}\n\n")
+        if subset.empty:
+            f.write("_No scored examples._\n\n")
+            continue
+        groups = subset.groupby(list(group_cols), sort=False) if group_cols else [((), subset)]
+        for group, rows in groups:
+            if group_cols:
+                f.write(f"#### {' / '.join(map(str, group if isinstance(group, tuple) else (group,)))}\n\n")
+            for _, row in rows.iterrows():
+                f.write(f"- **Model**: {row['model_name']} ({row['prompt_variant']}), scenario {row['scenario_id']}\n")
+                f.write(f"  - Politeness: {row['politeness']}, "
+                        f"Empathy: {row['empathy']}, "
+                        f"Contextual Fit: {row['contextual_fit']}, "
+                        f"Overall: {row['overall']}\n")
+                f.write(f"  - Rationale: {row['rationale']}\n")
+                if row.get("response_text"):
+                    response = " ".join(str(row["response_text"]).split())
+                    f.write(f"  - Response: {response}\n")
+                f.write("\n")
+
+
+def write_examples_markdown(
+    out_path: str | Path,
+    examples: Dict[str, pd.DataFrame],
+    group_cols: Sequence[str] = ("model_name", "prompt_variant"),
+) -> None:
+    """
+    Write the Phase 6 report from stream_top_k() output ("<dim>_low" /
+    "<dim>_high" tables), grouped by `group_cols` within each table.
+    """
+    out_path = Path(out_path)
+    worst = {key: df for key, df in examples.items() if key.endswith("_low")}
+    best = {key: df for key, df in examples.items() if key.endswith("_high")}
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with out_path.open("w", encoding="utf-8") as f:
+        f.write("# Qualitative Error Analysis\n\n")
+
+        f.write("This file contains representative examples of model performance.\n\n")
+
+        f.write("## Worst-scoring examples\n\n")
+        _write_examples(f, worst, group_cols)
+
+        f.write("\n## Best-scoring examples\n\n")
+        _write_examples(f, best, group_cols)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .loading import FACET_COLUMNS
+
+# Figure rendering engine for Phase 5.
+#
+# A FigureSpec is a small picklable description of one grouped bar chart
+# (its data plus labels). render_figures() hashes every spec, skips the ones
+# whose hash matches the manifest from the previous run, and draws the rest
+# in a process pool with the object-oriented API (matplotlib.figure.Figure,
+# no pyplot global state). Figure.savefig picks a canvas from the file
+# format, so no backend is selected and the caller's backend (e.g. a
+# notebook's) is left alone. Matplotlib is only imported when drawing.
+
+MANIFEST_NAME = ".figures_manifest.json"
+# Bump when the drawing code changes, to invalidate the manifest.
+RENDER_VERSION = 1
+
+DIMENSION_LABELS = {
+    "politeness": "Politeness",
+    "empathy": "Empathy",
+    "contextual_fit": "Contextual Fit",
+    "overall": "Overall",
+}
+
+
+@dataclass
+class FigureSpec:
+    """
+    One grouped bar chart: `y` per `x`, one bar per `hue` value, with
+    optional error bars from the `err_low` / `err_high` columns.
+    `name` is the output path relative to the figures directory.
+    """
+
+    name: str
+    data: pd.DataFrame
+    x: str
+    y: str
+    hue: str
+    title: str
+    ylabel: str
+    err_low: Optional[str] = None
+    err_high: Optional[str] = None
+    figsize: Tuple[float, float] = (10, 6)
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the plotted data and every drawing parameter.
+        """
+        cols = [c for c in (self.x, self.hue, self.y, self.err_low, self.err_high) if c]
+        data = self.data[cols].reset_index(drop=True)
+        h = hashlib.sha256()
+        h.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+        params = {k: v for k, v in asdict(self).items() if k != "data"}
+        h.update(json.dumps([RENDER_VERSION, cols, params], sort_keys=True, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+
+def _draw(spec: FigureSpec, out_path: Path) -> None:
+    from matplotlib.figure import Figure
+    import numpy as np
+
+    data = spec.data
+    xs = list(dict.fromkeys(data[spec.x]))
+    hues = sorted(dict.fromkeys(data[spec.hue]), key=str)
+    table = data.set_index([spec.x, spec.hue])
+
+    fig = Figure(figsize=spec.figsize)
+    ax = fig.subplots()
+    width = 0.8 / max(len(hues), 1)
+    positions = np.arange(len(xs))
+    for i, hue in enumerate(hues):
+        values, lows, highs = [], [], []
+        for x in xs:
+            row = table.loc[(x, hue)] if (x, hue) in table.index else None
+            value = float(row[spec.y]) if row is not None else np.nan
+            values.append(value)
+            if spec.err_low and spec.err_high:
+                lows.append(value - float(row[spec.err_low]) if row is not None else 0.0)
+                highs.append(float(row[spec.err_high]) - value if row is not None else 0.0)
+        yerr = np.nan_to_num(np.array([lows, highs]), nan=0.0) if lows else None
+        ax.bar(
+            positions - 0.4 + width * (i + 0.5),
+            values,
+            width,
+            label=str(hue),
+            yerr=yerr,
+            capsize=3 if yerr is not None else 0,
+        )
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(x) for x in xs], rotation=30, ha="right")
+    ax.set_xlabel(spec.x)
+    ax.set_ylabel(spec.ylabel)
+    ax.set_title(spec.title)
+    ax.legend(title=spec.hue)
+    fig.tight_layout()
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(f".tmp-{out_path.name}")
+    fig.savefig(tmp, format=out_path.suffix.lstrip(".") or "png")
+    os.replace(tmp, out_path)
+
+
+def _render_one(args: Tuple[FigureSpec, str]) -> str:
+    spec, out_dir = args
+    _draw(spec, Path(out_dir) / spec.name)
+    return spec.name
+
+
+def _load_manifest(out_dir: Path) -> Dict[str, str]:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        print(f"[WARN] Ignoring unreadable figure manifest {path}")
+        return {}
+
+
+def _save_manifest(out_dir: Path, manifest: Dict[str, str]) -> None:
+    path = out_dir / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def render_figures(
+    specs: Sequence[FigureSpec],
+    out_dir: str | Path,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Tuple[List[str], List[str]]:
+    """
+    Render the specs whose data or parameters changed since the last run
+    (or all with force=True) into `out_dir`, in a process pool of `workers`
+    processes (default: CPU count; 1 renders in this process).
+    Returns (rendered names, skipped names).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+
+    todo: List[FigureSpec] = []
+    skipped: List[str] = []
+    fingerprints: Dict[str, str] = {}
+    for spec in specs:
+        fingerprints[spec.name] = spec.fingerprint()
+        if not force and manifest.get(spec.name) == fingerprints[spec.name] and (out_dir / spec.name).exists():
+            skipped.append(spec.name)
+        else:
+            todo.append(spec)
+
+    workers = workers or os.cpu_count() or 1
+    rendered: List[str] = []
+    try:
+        if workers <= 1 or len(todo) <= 1:
+            for spec in todo:
+                rendered.append(_render_one((spec, str(out_dir))))
+                manifest[spec.name] = fingerprints[spec.name]
+        else:
+            # Spawned, not forked: the pipeline renders from a runner thread while
+            # other stage threads (and their locks) are live.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo)), mp_context=context) as pool:
+                jobs = [(spec, str(out_dir)) for spec in todo]
+                for name in pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (workers * 4))):
+                    rendered.append(name)
+                    manifest[name] = fingerprints[name]
+    finally:
+        # Keep what was drawn even if a later figure failed.
+        _save_manifest(out_dir, manifest)
+    return rendered, skipped
+
+
+def summary_figure_specs(summary: pd.DataFrame) -> List[FigureSpec]:
+    """
+    Overall and per-dimension means by model and prompt variant (the Phase 5
+    figures), with bootstrap CI error bars when the summary has them.
+    """
+    specs = []
+    for dim, label in DIMENSION_LABELS.items():
+        col = f"{dim}_mean"
+        if col not in summary.columns:
+            continue
+        has_ci = f"{dim}_ci_low" in summary.columns and f"{dim}_ci_high" in summary.columns
+        name = "overall_by_model_variant.png" if dim == "overall" else f"{col}_by_model_variant.png"
+        specs.append(
+            FigureSpec(
+                name=name,
+                data=summary,
+                x="model_name",
+                y=col,
+                hue="prompt_variant",
+                title=f"{label} Mean Score by Model and Prompt Variant",
+                ylabel=f"{label} Mean Score",
+                err_low=f"{dim}_ci_low" if has_ci else None,
+                err_high=f"{dim}_ci_high" if has_ci else None,
+            )
+        )
+    return specs
+
+
+def facet_figure_specs(
+    cube_df: pd.DataFrame,
+    facets: Sequence[str] = FACET_COLUMNS,
+    dimensions: Sequence[str] = tuple(DIMENSION_LABELS),
+) -> List[FigureSpec]:
+    """
+    One figure per facet value and dimension (e.g. facets/domain/workplace/
+    overall.png: model x variant within the workplace domain), from the
+    "model_name+prompt_variant+<facet>" groupings of a cube() result.
+    """
+    specs = []
+    for facet in facets:
+        rows = cube_df[cube_df["grouping"] == f"model_name+prompt_variant+{facet}"]
+        for value, data in rows.groupby(facet, sort=True):
+            data = data[["model_name", "prompt_variant"] + [f"{d}_mean" for d in dimensions]]
+            safe_value = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value))
+            for dim in dimensions:
+                label = DIMENSION_LABELS.get(dim, dim)
+                specs.append(
+                    FigureSpec(
+                        name=f"facets/{facet}/{safe_value}/{dim}.png",
+                        data=data.reset_index(drop=True),
+                        x="model_name",
+                        y=f"{dim}_mean",
+                        hue="prompt_variant",
+                        title=f"{label} Mean Score by Model and Prompt Variant ({facet} = {value})",
+                        ylabel=f"{label} Mean Score",
+                    )
+                )
+    return specs
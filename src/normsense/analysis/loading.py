@@ -0,0 +1,352 @@
+from __future__ import annotations
+import gc
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from normsense.storage.files import open_binary
+from normsense.storage.parquet import (
+    is_parquet_path,
+    iter_parquet_frames,
+    parquet_column_names,
+    read_parquet_records,
+)
+
+try:  # orjson parses several times faster than json; optional
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depends on environment
+    _loads = json.loads
+
+
+SCORE_DIMENSIONS = ["politeness", "empathy", "contextual_fit", "overall"]
+KEY_COLUMNS = ["scenario_id", "model_name", "prompt_variant"]
+SCORE_COLUMNS = KEY_COLUMNS + SCORE_DIMENSIONS + ["rationale", "judge", "is_error"]
+CATEGORY_COLUMNS = ["scenario_id", "model_name", "prompt_variant", "judge"]
+# Which judge produced a score: scores["judge"] ("distilled"); LLM-judge records carry none.
+DEFAULT_JUDGE = "llm"
+# Scenario facets, carried on Phase 3 records as scenario_<facet>.
+FACET_COLUMNS = ["domain", "norm_type", "cultural_tag", "stakes_level"]
+
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def _resolve_jsonl(path: Path) -> Path:
+    # A normalized output directory keeps score rows in records.jsonl, with
+    # the scenario facets moved to its scenarios.jsonl (see _normalized_facets).
+    if path.suffix == ".normalized":
+        return path / "records.jsonl"
+    return path
+
+
+def _normalized_facets(path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Facet -> {scenario id: value} from the scenario table of a .normalized
+    directory; None for other formats.
+    """
+    if path.suffix != ".normalized":
+        return None
+    from normsense.storage.normalized import load_lookup_tables
+
+    _, scenarios = load_lookup_tables(path)
+    return {name: {sid: meta.get(name) for sid, meta in scenarios.items()} for name in FACET_COLUMNS}
+
+
+def _join_facets(df: pd.DataFrame, tables: Dict[str, Dict[str, Any]], categorize: bool) -> pd.DataFrame:
+    """
+    Fill facet columns the rows do not carry from the normalized scenario table.
+    """
+    scenario_ids = df["scenario_id"].astype(object)
+    for name in FACET_COLUMNS:
+        carried = df[name].astype(object)
+        values = carried.where(carried.notna(), scenario_ids.map(tables[name]))
+        df[name] = pd.Categorical(values) if categorize else values
+    return df
+
+
+def _read_block(f, size: int) -> tuple[bytes, bool]:
+    """
+    Read up to `size` bytes in decompression-sized steps, so a truncated
+    .gz stream still returns everything before the cut. Returns (data, truncated).
+    """
+    parts: List[bytes] = []
+    remaining = size
+    while remaining > 0:
+        try:
+            part = f.read1(remaining)
+        except EOFError:
+            return b"".join(parts), True
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts), False
+
+
+def _iter_line_chunks(path: Path, chunksize: int, block_bytes: int = 1 << 25) -> Iterator[List[bytes]]:
+    """
+    Yield lists of at most `chunksize` non-empty lines, reading the file in
+    large blocks instead of line by line. .gz / .zst files are decompressed
+    as they stream. A torn last line (writer crashed mid-record) is skipped.
+    """
+    chunk: List[bytes] = []
+    tail = b""
+    truncated = False
+    with open_binary(path) as f:
+        while not truncated:
+            block, truncated = _read_block(f, block_bytes)
+            if truncated:
+                print(f"[WARN] {path} is truncated; stopping at the last complete record")
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            chunk.extend(line for line in block[:cut].split(b"\n") if line.strip())
+            while len(chunk) >= chunksize:
+                yield chunk[:chunksize]
+                chunk = chunk[chunksize:]
+    if tail.strip():
+        try:
+            _loads(tail)
+            chunk.append(tail)
+        except ValueError:
+            print(f"[WARN] Skipping torn last line of {path}")
+    if chunk:
+        yield chunk
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Parsing allocates millions of small dicts that the cyclic GC would
+    otherwise rescan repeatedly; none of them form cycles.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _chunk_frame(lines: List[bytes], categorize: bool, facets: bool = False) -> pd.DataFrame:
+    with _gc_paused():
+        cols = _columns_from_records(_parse_lines(lines), facets=facets)
+    return _frame_from_columns(cols, categorize=categorize)
+
+
+def _parse_lines(lines: List[bytes]) -> List[Dict[str, Any]]:
+    """
+    Parse many JSONL lines with one parser call by wrapping them in an array.
+    """
+    try:
+        return _loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        # Fall back line by line to report which record is broken.
+        return [_loads(line) for line in lines]
+
+
+def _columns_from_records(records: List[Dict[str, Any]], facets: bool = False) -> Dict[str, Any]:
+    """
+    Pull each output column out of the parsed records in one pass per column.
+    """
+    scores = [rec.get("scores") or {} for rec in records]
+    errors = [sc.get("error") for sc in scores]
+    is_error = np.fromiter((e is not None for e in errors), dtype=bool, count=len(errors))
+
+    cols: Dict[str, Any] = {
+        name: [rec.get(name) for rec in records] for name in KEY_COLUMNS
+    }
+    for dim in SCORE_DIMENSIONS:
+        cols[dim] = [sc.get(dim) for sc in scores]
+    # Error rows keep no numeric scores and carry the error as rationale.
+    cols["rationale"] = [
+        err if err is not None else sc.get("rationale") for sc, err in zip(scores, errors)
+    ]
+    cols["judge"] = [sc.get("judge") or DEFAULT_JUDGE for sc in scores]
+    cols["is_error"] = is_error
+    if facets:
+        for name in FACET_COLUMNS:
+            cols[name] = [rec.get(f"scenario_{name}") for rec in records]
+    return cols
+
+
+def _frame_from_columns(cols: Dict[str, list], categorize: bool = True) -> pd.DataFrame:
+    data: Dict[str, Any] = {}
+    for name in SCORE_COLUMNS + [c for c in FACET_COLUMNS if c in cols]:
+        values = cols[name]
+        if name in SCORE_DIMENSIONS:
+            # Judges occasionally emit "4" or junk; coerce to float32 (NaN if invalid).
+            values = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype(np.float32)
+            data[name] = values.where(~np.asarray(cols["is_error"], dtype=bool))
+        elif name == "is_error":
+            data[name] = np.asarray(values, dtype=bool)
+        elif categorize and (name in CATEGORY_COLUMNS or name in FACET_COLUMNS):
+            data[name] = pd.Categorical(values)
+        else:
+            data[name] = pd.Series(values, dtype=object)
+    return pd.DataFrame(data)
+
+
+def _finalize(
+    df: pd.DataFrame,
+    include_errors: bool,
+    columns: Optional[Sequence[str]],
+) -> pd.DataFrame:
+    if not include_errors:
+        df = df[~df["is_error"]].drop(columns=["is_error"]).reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def _parquet_columns(
+    path: Path,
+    columns: Optional[Sequence[str]],
+    facets: bool,
+) -> tuple[List[str], List[str]]:
+    """
+    (output columns, stored columns to read) for a Parquet scores dataset.
+    """
+    wanted = list(columns) if columns is not None else list(SCORE_COLUMNS)
+    # rationale / is_error are derived from the stored rationale + error columns
+    read_cols = [c for c in wanted if c not in ("rationale", "judge", "is_error")]
+    if "rationale" in wanted:
+        read_cols.append("rationale")
+    read_cols.append("error")
+    # Datasets written before judge / facets were carried simply lack the columns.
+    available = set(parquet_column_names(path))
+    if "judge" in wanted and "judge" in available:
+        read_cols.append("judge")
+    if facets:
+        read_cols += [f"scenario_{c}" for c in FACET_COLUMNS if f"scenario_{c}" in available]
+        if columns is None:
+            wanted += FACET_COLUMNS
+    return wanted, read_cols
+
+
+def _parquet_frame(
+    df: pd.DataFrame,
+    wanted: List[str],
+    include_errors: bool,
+    facets: bool,
+) -> pd.DataFrame:
+    if facets:
+        df = df.rename(columns={f"scenario_{c}": c for c in FACET_COLUMNS})
+        for name in FACET_COLUMNS:
+            if name not in df.columns:
+                df[name] = pd.Categorical([None] * len(df))
+    if "judge" in wanted:
+        judge = df["judge"] if "judge" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        df["judge"] = pd.Categorical(judge.fillna(DEFAULT_JUDGE))
+    is_error = df["error"].notna().to_numpy()
+    if "rationale" in df.columns:
+        df["rationale"] = df["rationale"].where(~is_error, df["error"])
+    df["is_error"] = is_error
+    df = df.drop(columns=["error"])
+    if not include_errors:
+        df = df[~df["is_error"]].reset_index(drop=True)
+        wanted = [c for c in wanted if c != "is_error"]
+    return df[wanted]
+
+
+def _load_parquet(
+    path: Path,
+    include_errors: bool,
+    columns: Optional[Sequence[str]],
+    facets: bool = False,
+) -> pd.DataFrame:
+    wanted, read_cols = _parquet_columns(path, columns, facets)
+    df = read_parquet_records(path, columns=read_cols)
+    return _parquet_frame(df, wanted, include_errors, facets)
+
+
+def _iter_parquet_chunks(
+    path: Path,
+    chunksize: int,
+    include_errors: bool,
+    columns: Optional[Sequence[str]],
+    facets: bool = False,
+) -> Iterator[pd.DataFrame]:
+    wanted, read_cols = _parquet_columns(path, columns, facets)
+    for df in iter_parquet_frames(path, columns=read_cols, batch_size=chunksize):
+        df = _parquet_frame(df, wanted, include_errors, facets)
+        # Match the JSONL chunks: key and facet columns as categoricals.
+        for name in CATEGORY_COLUMNS + FACET_COLUMNS:
+            if name in df.columns and not isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype("category")
+        yield df
+
+
+def iter_score_chunks(
+    path: str | Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    include_errors: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    facets: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a Phase 3 scores file (JSONL, a .normalized directory or a
+    Parquet dataset) as DataFrames of at most `chunksize` rows, for files
+    that do not fit in memory.
+    """
+    path = Path(path)
+    if is_parquet_path(path):
+        yield from _iter_parquet_chunks(path, chunksize, include_errors, columns, facets=facets)
+        return
+
+    tables = _normalized_facets(path) if facets else None
+    path = _resolve_jsonl(path)
+    for lines in _iter_line_chunks(path, chunksize):
+        df = _chunk_frame(lines, categorize=True, facets=facets)
+        if tables is not None:
+            df = _join_facets(df, tables, categorize=True)
+        yield _finalize(df, include_errors, columns)
+
+
+def load_scores_frame(
+    path: str | Path,
+    include_errors: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    facets: bool = False,
+) -> pd.DataFrame:
+    """
+    Load Phase 3 scores (JSONL, optionally .gz / .zst compressed, a
+    .normalized directory or a Parquet dataset) into one compact DataFrame.
+
+    Columns: scenario_id / model_name / prompt_variant (category), the four
+    score dimensions (float32, NaN when missing), rationale, judge (category:
+    "distilled" for distilled-judge scores, "llm" otherwise) and is_error.
+    Judge failures have is_error=True and the error message as rationale;
+    include_errors=False drops them (and the is_error column).
+    facets=True adds the scenario facet columns carried on the records
+    (domain, norm_type, cultural_tag, stakes_level; None for older files),
+    joined back from the scenario table for a .normalized directory.
+    """
+    path = Path(path)
+    if is_parquet_path(path):
+        return _load_parquet(path, include_errors, columns, facets=facets)
+
+    tables = _normalized_facets(path) if facets else None
+    path = _resolve_jsonl(path)
+    parts = [
+        _chunk_frame(lines, categorize=False, facets=facets)
+        for lines in _iter_line_chunks(path, DEFAULT_CHUNKSIZE)
+    ]
+    if tables is not None:
+        parts = [_join_facets(df, tables, categorize=False) for df in parts]
+    if parts:
+        df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    else:
+        empty = SCORE_COLUMNS + (FACET_COLUMNS if facets else [])
+        df = _frame_from_columns({c: [] for c in empty}, categorize=False)
+    for name in CATEGORY_COLUMNS + (FACET_COLUMNS if facets else []):
+        df[name] = df[name].astype("category")
+    return _finalize(df, include_errors, columns)
@@ -2,8 +2,8 @@ from __future__ import annotations
 from pathlib import Path
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from .figures import render_figures, summary_figure_specs
 
 
 def load_summary(csv_path: str | Path) -> pd.DataFrame:
@@ -16,48 +16,14 @@ def plot_overall_by_model_variant(df: pd.DataFrame, out_path: str | Path) -> Non
     Simple barplot: overall_mean score for each (model_name, prompt_variant).
     """
     out_path = Path(out_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    plt.figure(figsize=(10, 6))
-    sns.barplot(
-        data=df,
-        x="model_name",
-        y="overall_mean",
-        hue="prompt_variant",
-    )
-    plt.xticks(rotation=30, ha="right")
-    plt.ylabel("Overall Mean Score")
-    plt.title("Overall Mean Score by Model and Prompt Variant")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    spec = next(s for s in summary_figure_specs(df) if s.y == "overall_mean")
+    spec.name = out_path.name
+    render_figures([spec], out_path.parent, workers=1)
 
 
 def plot_dimension_by_model(df: pd.DataFrame, out_dir: str | Path) -> None:
     """
     Create one plot per dimension (politeness, empathy, contextual_fit).
     """
-    out_dir = Path(out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    dims = [
-        ("politeness_mean", "Politeness"),
-        ("empathy_mean", "Empathy"),
-        ("contextual_fit_mean", "Contextual Fit"),
-    ]
-
-    for col, label in dims:
-        plt.figure(figsize=(10, 6))
-        sns.barplot(
-            data=df,
-            x="model_name",
-            y=col,
-            hue="prompt_variant",
-        )
-        plt.xticks(rotation=30, ha="right")
-        plt.ylabel(f"{label} Mean Score")
-        plt.title(f"{label} Mean Score by Model and Prompt Variant")
-        plt.tight_layout()
-        out_path = out_dir / f"{col}_by_model_variant.png"
-        plt.savefig(out_path)
-        plt.close()
+    specs = [s for s in summary_figure_specs(df) if s.y != "overall_mean"]
+    render_figures(specs, out_dir)
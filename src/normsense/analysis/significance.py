@@ -0,0 +1,232 @@
+from __future__ import annotations
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .bootstrap import _cluster_matrices
+from .loading import SCORE_DIMENSIONS
+
+# Paired tests between model x variant cells on shared scenario_ids.
+#
+# Each cell is reduced to its per-scenario mean score. A comparison between
+# cells a and b uses the scenarios both have, d_k = mean_a[k] - mean_b[k].
+# All comparisons (and dimensions) are stacked as rows of a (comparisons x
+# scenarios) difference matrix D with zeros for unshared scenarios, so a batch
+# of random sign flips S (perms x scenarios) gives every permuted statistic
+# with one product S @ D.T.
+
+DEFAULT_N_PERM = 10_000
+_BATCH_ENTRIES = 1 << 23
+
+_lgamma = np.frompyfunc(math.lgamma, 1, 1)
+
+COMPARISON_COLUMNS = [
+    "comparison",
+    "dimension",
+    "model_a",
+    "variant_a",
+    "model_b",
+    "variant_b",
+    "n_pairs",
+    "mean_a",
+    "mean_b",
+    "mean_diff",
+    "n_pos",
+    "n_neg",
+    "p_perm",
+    "p_sign",
+    "p_perm_holm",
+    "p_perm_bh",
+    "p_sign_holm",
+    "p_sign_bh",
+]
+
+
+def holm(p: np.ndarray) -> np.ndarray:
+    """
+    Holm-Bonferroni adjusted p-values (family-wise error rate).
+    """
+    p = np.asarray(p, dtype=np.float64)
+    m = len(p)
+    if m == 0:
+        return p
+    order = np.argsort(p, kind="stable")
+    adj = np.maximum.accumulate((m - np.arange(m)) * p[order])
+    out = np.empty(m)
+    out[order] = np.minimum(adj, 1.0)
+    return out
+
+
+def benjamini_hochberg(p: np.ndarray) -> np.ndarray:
+    """
+    Benjamini-Hochberg adjusted p-values (false discovery rate).
+    """
+    p = np.asarray(p, dtype=np.float64)
+    m = len(p)
+    if m == 0:
+        return p
+    order = np.argsort(p, kind="stable")
+    scaled = p[order] * m / np.arange(1, m + 1)
+    adj = np.minimum.accumulate(scaled[::-1])[::-1]
+    out = np.empty(m)
+    out[order] = np.minimum(adj, 1.0)
+    return out
+
+
+def _sign_test(n_pos: np.ndarray, n_neg: np.ndarray) -> np.ndarray:
+    """
+    Two-sided exact sign test (ties dropped). The binomial CDF is computed
+    in log space once per distinct number of non-tied pairs.
+    """
+    n = n_pos + n_neg
+    k = np.minimum(n_pos, n_neg)
+    out = np.ones(len(n))
+    for size in np.unique(n[n > 0]):
+        i = np.arange(size + 1)
+        log_pmf = (
+            _lgamma(size + 1) - _lgamma(i + 1) - _lgamma(size - i + 1)
+        ).astype(np.float64) - size * math.log(2.0)
+        log_cdf = np.logaddexp.accumulate(log_pmf)
+        rows = n == size
+        out[rows] = np.minimum(1.0, 2.0 * np.exp(log_cdf[k[rows]]))
+    return out
+
+
+def _ordered_pairs(values: Sequence[str], baseline: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Unordered pairs as (a, b), with the baseline (if present) always as b so
+    mean_diff reads "a minus baseline".
+    """
+    values = sorted(values)
+    pairs = []
+    for i, a in enumerate(values):
+        for b in values[i + 1:]:
+            pairs.append((b, a) if a == baseline else (a, b))
+    return pairs
+
+
+def _comparisons(
+    keys: pd.DataFrame,
+    baseline_variant: Optional[str],
+    baseline_model: Optional[str],
+) -> List[Tuple[str, int, int]]:
+    cell = {(m, v): i for i, (m, v) in enumerate(zip(keys["model_name"], keys["prompt_variant"]))}
+    out: List[Tuple[str, int, int]] = []
+    # Variant pairs within each model, then model pairs within each variant.
+    for model, group in keys.groupby("model_name", observed=True, sort=True):
+        for a, b in _ordered_pairs(list(group["prompt_variant"]), baseline_variant):
+            out.append(("variant", cell[(model, a)], cell[(model, b)]))
+    for variant, group in keys.groupby("prompt_variant", observed=True, sort=True):
+        for a, b in _ordered_pairs(list(group["model_name"]), baseline_model):
+            out.append(("model", cell[(a, variant)], cell[(b, variant)]))
+    return out
+
+
+def _permutation_pvalues(diffs: np.ndarray, n_perm: int, seed: int) -> np.ndarray:
+    """
+    Two-sided sign-flip permutation p-values for the mean of every row of
+    `diffs` (rows x scenarios, zeros where a pair is missing).
+    """
+    num_rows, num_clusters = diffs.shape
+    rng = np.random.default_rng(seed)
+    observed = np.abs(diffs.sum(axis=1))
+    # Float tolerance so permutations equal to the observed statistic count.
+    tol = 1e-9 * np.maximum(observed, 1.0)
+    exceed = np.zeros(num_rows, dtype=np.int64)
+    batch = max(1, min(n_perm, _BATCH_ENTRIES // max(num_clusters, num_rows, 1)))
+    diffs_t = diffs.T
+    for start in range(0, n_perm, batch):
+        size = min(batch, n_perm - start)
+        signs = rng.integers(0, 2, size=(size, num_clusters), dtype=np.int8) * 2.0 - 1.0
+        exceed += (np.abs(signs @ diffs_t) >= observed - tol).sum(axis=0)
+    return (exceed + 1) / (n_perm + 1)
+
+
+def paired_tests(
+    df: pd.DataFrame,
+    dimensions: Sequence[str] = SCORE_DIMENSIONS,
+    n_perm: int = DEFAULT_N_PERM,
+    seed: int = 0,
+    baseline_variant: Optional[str] = "neutral",
+    baseline_model: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Paired permutation and sign tests for every prompt-variant pair within
+    each model and every model pair within each variant, per score dimension.
+
+    Pairs are matched on scenario_id (repeated judgments of a scenario are
+    averaged first). Holm and Benjamini-Hochberg corrections are applied per
+    family of (comparison kind, dimension). Returns one tidy row per test
+    with the columns in COMPARISON_COLUMNS; error rows must already be
+    removed or flagged in is_error.
+    """
+    if n_perm < 1:
+        raise ValueError(f"n_perm must be positive, got {n_perm}")
+    if "is_error" in df.columns:
+        df = df[~df["is_error"].astype(bool)]
+    if df.empty:
+        return pd.DataFrame(columns=COMPARISON_COLUMNS)
+
+    keys, sums, counts = _cluster_matrices(df, ("model_name", "prompt_variant"), dimensions, "scenario_id")
+    comparisons = _comparisons(keys, baseline_variant, baseline_model)
+    if not comparisons:
+        return pd.DataFrame(columns=COMPARISON_COLUMNS)
+    kinds = np.array([kind for kind, _, _ in comparisons])
+    ia = np.array([a for _, a, _ in comparisons])
+    ib = np.array([b for _, _, b in comparisons])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    # (dims * comparisons, scenarios)
+    a_vals, b_vals = means[:, ia, :], means[:, ib, :]
+    shared = ~np.isnan(a_vals) & ~np.isnan(b_vals)
+    diffs = np.where(shared, a_vals - b_vals, 0.0).reshape(-1, means.shape[2])
+    shared = shared.reshape(diffs.shape)
+
+    n_pairs = shared.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a = np.where(shared, a_vals.reshape(diffs.shape), 0.0).sum(axis=1) / n_pairs
+        mean_b = np.where(shared, b_vals.reshape(diffs.shape), 0.0).sum(axis=1) / n_pairs
+    n_pos = ((diffs > 0) & shared).sum(axis=1)
+    n_neg = ((diffs < 0) & shared).sum(axis=1)
+
+    p_perm = np.where(n_pairs > 0, _permutation_pvalues(diffs, n_perm, seed), 1.0)
+    p_sign = _sign_test(n_pos, n_neg)
+
+    num_cmp = len(comparisons)
+    model_a = keys["model_name"].to_numpy()[ia]
+    variant_a = keys["prompt_variant"].to_numpy()[ia]
+    model_b = keys["model_name"].to_numpy()[ib]
+    variant_b = keys["prompt_variant"].to_numpy()[ib]
+    out = pd.DataFrame(
+        {
+            "comparison": np.tile(kinds, len(dimensions)),
+            "dimension": np.repeat(list(dimensions), num_cmp),
+            "model_a": np.tile(model_a, len(dimensions)),
+            "variant_a": np.tile(variant_a, len(dimensions)),
+            "model_b": np.tile(model_b, len(dimensions)),
+            "variant_b": np.tile(variant_b, len(dimensions)),
+            "n_pairs": n_pairs,
+            "mean_a": mean_a,
+            "mean_b": mean_b,
+            "mean_diff": mean_a - mean_b,
+            "n_pos": n_pos,
+            "n_neg": n_neg,
+            "p_perm": p_perm,
+            "p_sign": p_sign,
+        }
+    )
+
+    families = list(out.groupby(["comparison", "dimension"], sort=False).indices.values())
+    for col in ("p_perm", "p_sign"):
+        holm_adj = np.empty(len(out))
+        bh_adj = np.empty(len(out))
+        values = out[col].to_numpy()
+        for idx in families:
+            holm_adj[idx] = holm(values[idx])
+            bh_adj[idx] = benjamini_hochberg(values[idx])
+        out[f"{col}_holm"] = holm_adj
+        out[f"{col}_bh"] = bh_adj
+    return out[COMPARISON_COLUMNS]
@@ -0,0 +1,301 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from normsense.storage.files import compression_of, open_binary
+from normsense.storage.writer import partial_path
+from .loading import DEFAULT_CHUNKSIZE, FACET_COLUMNS, SCORE_DIMENSIONS, _chunk_frame, _read_block
+
+
+BASE_GROUPING: Tuple[str, ...] = ("model_name", "prompt_variant")
+
+STATE_VERSION = 1
+_HEAD_BYTES = 4096
+_BLOCK_BYTES = 1 << 25
+
+Grouping = Tuple[str, ...]
+
+
+def _stat_columns() -> List[str]:
+    cols = ["n"]
+    for dim in SCORE_DIMENSIONS:
+        cols += [f"{dim}__n", f"{dim}__mean", f"{dim}__m2"]
+    return cols
+
+
+def _chunk_stats(df: pd.DataFrame, grouping: Grouping) -> pd.DataFrame:
+    """
+    Per-group row count and (count, mean, M2) of every score dimension.
+    """
+    groups = df.groupby(list(grouping), observed=True, sort=False)
+    out = pd.DataFrame({"n": groups.size()})
+    for dim in SCORE_DIMENSIONS:
+        count = groups[dim].count()
+        out[f"{dim}__n"] = count
+        out[f"{dim}__mean"] = groups[dim].mean().fillna(0.0)
+        out[f"{dim}__m2"] = (groups[dim].var(ddof=0) * count).fillna(0.0)
+    return out.astype(np.float64)
+
+
+def _merge_stats(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combine two per-group moment tables (Chan et al. parallel Welford update).
+    """
+    if a.empty:
+        return b
+    index = a.index.union(b.index)
+    a = a.reindex(index, fill_value=0.0)
+    b = b.reindex(index, fill_value=0.0)
+    out = pd.DataFrame({"n": a["n"] + b["n"]}, index=index)
+    for dim in SCORE_DIMENSIONS:
+        n_a, n_b = a[f"{dim}__n"], b[f"{dim}__n"]
+        n = n_a + n_b
+        safe_n = n.where(n > 0, 1.0)
+        delta = b[f"{dim}__mean"] - a[f"{dim}__mean"]
+        out[f"{dim}__n"] = n
+        out[f"{dim}__mean"] = a[f"{dim}__mean"] + delta * n_b / safe_n
+        out[f"{dim}__m2"] = a[f"{dim}__m2"] + b[f"{dim}__m2"] + delta ** 2 * n_a * n_b / safe_n
+    return out
+
+
+def _file_head(path: Path, size: int) -> str:
+    with open_binary(path) as f:
+        return hashlib.sha256(_read_block(f, size)[0]).hexdigest()
+
+
+class StreamingAggregator:
+    """
+    Running per-group score moments over a growing Phase 3 JSONL file.
+
+    For every grouping (model x variant, and model x variant x facet) it
+    keeps the row count plus count, mean and M2 per score dimension, merged
+    chunk by chunk with the parallel Welford update. update() reads only the
+    complete lines appended since the last call and save() persists the
+    state with the byte offset, so a dashboard over a live sweep costs
+    O(new records).
+
+    Facets come from the scenario_<facet> fields of the records;
+    `scenario_facets` (scenario id -> {facet: value}) only fills them in for
+    older records that lack them.
+
+    While a Phase 3 run is still writing, its records live in the writer's
+    .partial-<name> file (see RecordWriter); update() follows that file and
+    carries on with the final path after the rename, which keeps the bytes.
+
+    If the scores file is replaced (it shrinks or its first bytes change),
+    the state is reset and rebuilt from the start.
+    """
+
+    def __init__(
+        self,
+        scores_path: str | Path,
+        scenario_facets: Optional[Mapping[str, Mapping[str, str]]] = None,
+        facets: Sequence[str] = FACET_COLUMNS,
+    ) -> None:
+        self.scores_path = Path(scores_path)
+        self.scenario_facets = scenario_facets
+        self.facets = list(facets)
+        self.groupings: List[Grouping] = [BASE_GROUPING] + [BASE_GROUPING + (f,) for f in self.facets]
+        self.reset()
+
+    def reset(self) -> None:
+        self.offset = 0
+        # Hash of the first head_size bytes, which were already aggregated.
+        self.head: Optional[str] = None
+        self.head_size = 0
+        self.num_records = 0
+        self.stats: Dict[Grouping, pd.DataFrame] = {g: pd.DataFrame() for g in self.groupings}
+
+    # --- reading -------------------------------------------------------------
+
+    def live_path(self) -> Path:
+        """
+        The file to read: the writer's partial file while a run is writing
+        it (newer than any finished output), else the scores path itself.
+        """
+        partial = partial_path(self.scores_path)
+        if partial.exists() and (
+            not self.scores_path.exists() or partial.stat().st_mtime >= self.scores_path.stat().st_mtime
+        ):
+            return partial
+        return self.scores_path
+
+    def _iter_new_lines(self, path: Path) -> Iterator[List[bytes]]:
+        """
+        Complete lines after self.offset, in chunks; advances self.offset.
+        """
+        with open_binary(path) as f:
+            if compression_of(path) is None:
+                f.seek(self.offset)
+            else:
+                # Compressed streams cannot seek; skip decompressed bytes.
+                remaining = self.offset
+                while remaining > 0:
+                    skipped, _ = _read_block(f, min(remaining, _BLOCK_BYTES))
+                    if not skipped:
+                        break
+                    remaining -= len(skipped)
+
+            chunk: List[bytes] = []
+            tail = b""
+            truncated = False
+            while not truncated:
+                # An unfinished compressed stream (writer still running / died)
+                # still yields everything up to its last flush.
+                block, truncated = _read_block(f, _BLOCK_BYTES)
+                if not block:
+                    break
+                block = tail + block
+                cut = block.rfind(b"\n") + 1
+                tail = block[cut:]
+                chunk.extend(line for line in block[:cut].split(b"\n") if line.strip())
+                # Torn last lines stay unread until the writer completes them.
+                self.offset += cut
+                if len(chunk) >= DEFAULT_CHUNKSIZE:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def _add_facets(self, df: pd.DataFrame) -> pd.DataFrame:
+        for facet in self.facets:
+            carried = df[facet]
+            if self.scenario_facets is not None and carried.isna().any():
+                values = {sid: meta.get(facet) for sid, meta in self.scenario_facets.items()}
+                carried = carried.where(carried.notna(), df["scenario_id"].map(values))
+            df[facet] = carried.fillna("unknown")
+        return df
+
+    def update(self) -> int:
+        """
+        Fold records appended since the last update into the state.
+        Returns the number of new records (including judge errors, which
+        are counted as read but not aggregated).
+        """
+        path = self.live_path()
+        if not path.exists():
+            return 0
+        shrunk = compression_of(path) is None and path.stat().st_size < self.offset
+        if self.head is not None and (shrunk or _file_head(path, self.head_size) != self.head):
+            print(f"[WARN] {self.scores_path} was replaced; re-aggregating from the start")
+            self.reset()
+
+        num_new = 0
+        for lines in self._iter_new_lines(path):
+            df = _chunk_frame(lines, categorize=False, facets=True)
+            num_new += len(df)
+            df = self._add_facets(df[~df["is_error"]])
+            for grouping in self.groupings:
+                self.stats[grouping] = _merge_stats(self.stats[grouping], _chunk_stats(df, grouping))
+        self.num_records += num_new
+        if self.head_size < min(self.offset, _HEAD_BYTES) or self.head is None:
+            self.head_size = min(self.offset, _HEAD_BYTES)
+            self.head = _file_head(path, self.head_size)
+        return num_new
+
+    # --- results -------------------------------------------------------------
+
+    def summary(self, grouping: Grouping = BASE_GROUPING, with_std: bool = False) -> pd.DataFrame:
+        """
+        Summary table for one grouping, with the columns of
+        summarize_by_model_variant (n and {dim}_mean), optionally {dim}_std.
+        """
+        grouping = tuple(grouping)
+        if grouping not in self.stats:
+            raise ValueError(f"Unknown grouping {grouping}. Available: {self.groupings}")
+        stats = self.stats[grouping]
+        if stats.empty:
+            cols = list(grouping) + ["n"] + [f"{dim}_mean" for dim in SCORE_DIMENSIONS]
+            return pd.DataFrame(columns=cols)
+
+        stats = stats.sort_index()
+        out = pd.DataFrame(index=stats.index)
+        out["n"] = stats["n"].astype(np.int64)
+        for dim in SCORE_DIMENSIONS:
+            count = stats[f"{dim}__n"]
+            out[f"{dim}_mean"] = stats[f"{dim}__mean"].where(count > 0)
+        if with_std:
+            for dim in SCORE_DIMENSIONS:
+                count = stats[f"{dim}__n"]
+                # Sample standard deviation, as pandas' .std()
+                out[f"{dim}_std"] = np.sqrt(stats[f"{dim}__m2"] / (count - 1)).where(count > 1)
+        return out.reset_index()
+
+    def breakdown(self, with_std: bool = True) -> pd.DataFrame:
+        """
+        All groupings in one long table, laid out like cube(): a `grouping`
+        column ("model_name+prompt_variant+domain"), the grouping columns
+        (empty where a grouping does not use them), n and the statistics.
+        """
+        parts = []
+        for grouping in self.groupings:
+            part = self.summary(grouping, with_std=with_std)
+            part.insert(0, "grouping", "+".join(grouping))
+            parts.append(part)
+        cols = ["grouping"] + list(BASE_GROUPING) + self.facets
+        out = pd.concat(parts, ignore_index=True)
+        return out[cols + [c for c in out.columns if c not in cols]]
+
+    # --- persistence ---------------------------------------------------------
+
+    def save(self, state_path: str | Path) -> None:
+        state_path = Path(state_path)
+        state = {
+            "version": STATE_VERSION,
+            "scores_path": str(self.scores_path),
+            "offset": self.offset,
+            "head": self.head,
+            "head_size": self.head_size,
+            "num_records": self.num_records,
+            "facets": self.facets,
+            "stats": {
+                "|".join(grouping): stats.reset_index().to_dict(orient="split", index=False)
+                for grouping, stats in self.stats.items()
+                if not stats.empty
+            },
+        }
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = state_path.with_name(state_path.name + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, state_path)
+
+    @classmethod
+    def load(
+        cls,
+        state_path: str | Path,
+        scores_path: str | Path,
+        scenario_facets: Optional[Mapping[str, Mapping[str, str]]] = None,
+        facets: Sequence[str] = FACET_COLUMNS,
+    ) -> "StreamingAggregator":
+        """
+        Restore a saved aggregator, or start a fresh one if there is no
+        compatible state for `scores_path` with the same facets.
+        """
+        agg = cls(scores_path, scenario_facets=scenario_facets, facets=facets)
+        state_path = Path(state_path)
+        if not state_path.exists():
+            return agg
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        if (
+            state.get("version") != STATE_VERSION
+            or Path(state["scores_path"]) != agg.scores_path
+            or state["facets"] != agg.facets
+        ):
+            print(f"[WARN] Ignoring incompatible aggregation state in {state_path}")
+            return agg
+
+        agg.offset = state["offset"]
+        agg.head = state["head"]
+        agg.head_size = state.get("head_size", _HEAD_BYTES)
+        agg.num_records = state["num_records"]
+        for key, table in state["stats"].items():
+            grouping = tuple(key.split("|"))
+            df = pd.DataFrame(table["data"], columns=table["columns"])
+            agg.stats[grouping] = df.set_index(list(grouping))[_stat_columns()].astype(np.float64)
+        return agg
@@ -0,0 +1,225 @@
+from __future__ import annotations
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .scenarios import Scenario
+from .prompts import PromptVariant, build_system_prompt, build_user_prompt
+from .models.base import ModelResponse
+from .models.registry import ModelRegistry
+from .sharding import in_shard
+
+
+DEFAULT_VARIANTS = [
+    PromptVariant.NEUTRAL,
+    PromptVariant.ROLE_PRIMED,
+    PromptVariant.EMPATHY_PRIMED,
+]
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    """
+    One unit of Phase 2 work: a scenario rendered with a prompt variant
+    and sent to one model.
+    """
+    scenario: Scenario
+    variant: PromptVariant
+    model_name: str
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return (self.scenario.id, self.variant.value, self.model_name)
+
+
+def add_work_filter_args(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the --models / --variants / --scenarios / --limit filters to a runner.
+    """
+    parser.add_argument("--models", default=None, help="comma-separated model names from the config")
+    parser.add_argument("--variants", default=None, help="comma-separated prompt variants")
+    parser.add_argument("--scenarios", default=None, help="comma-separated scenario ids")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N scenarios")
+    parser.add_argument(
+        "--shard",
+        default=None,
+        help="i/N: only run the i-th (0-based) of N deterministic partitions of the work list",
+    )
+
+
+def _split(value: str | None) -> Optional[List[str]]:
+    if value is None:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def select_scenarios(
+    scenarios: List[Scenario],
+    ids: str | Iterable[str] | None = None,
+    limit: int | None = None,
+) -> List[Scenario]:
+    if isinstance(ids, str) or ids is None:
+        ids = _split(ids)
+    if ids is not None:
+        wanted = set(ids)
+        missing = wanted - {s.id for s in scenarios}
+        if missing:
+            raise ValueError(f"Unknown scenario id(s): {sorted(missing)}")
+        scenarios = [s for s in scenarios if s.id in wanted]
+    if limit is not None:
+        scenarios = scenarios[:limit]
+    return list(scenarios)
+
+
+def select_variants(names: str | Iterable[str] | None = None) -> List[PromptVariant]:
+    if isinstance(names, str) or names is None:
+        names = _split(names)
+    if names is None:
+        return list(DEFAULT_VARIANTS)
+    return [PromptVariant(n) for n in names]
+
+
+def select_models(registry: ModelRegistry, names: str | Iterable[str] | None = None) -> ModelRegistry:
+    if isinstance(names, str):
+        names = _split(names)
+    return registry.select(names)
+
+
+def build_work_items(
+    scenarios: Iterable[Scenario],
+    variants: Iterable[PromptVariant],
+    model_names: Iterable[str],
+) -> Iterator[WorkItem]:
+    """
+    Enumerate the scenario x variant x model cross product (in that order).
+    """
+    variants = list(variants)
+    model_names = list(model_names)
+    for scenario in scenarios:
+        for variant in variants:
+            for model_name in model_names:
+                yield WorkItem(scenario=scenario, variant=variant, model_name=model_name)
+
+
+def shard_work_items(items: Iterable[WorkItem], index: int, count: int) -> Iterator[WorkItem]:
+    """
+    Keep the work items whose (scenario_id, prompt_variant, model_name)
+    hashes into shard `index` of `count`.
+    """
+    for item in items:
+        if in_shard(item.key, index, count):
+            yield item
+
+
+def response_record(item: WorkItem, resp: ModelResponse) -> Dict[str, Any]:
+    scenario = item.scenario
+    return {
+        "scenario_id": resp.scenario_id,
+        "scenario_domain": scenario.domain.value,
+        "scenario_norm_type": scenario.norm_type.value,
+        "scenario_cultural_tag": scenario.cultural_tag,
+        "scenario_stakes_level": scenario.stakes_level,
+        "scenario_prompt_source": scenario.prompt_source,
+        # Registry name rather than resp.model_name, so that success and
+        # error records (and shard keys) agree on the model identifier.
+        "model_name": item.model_name,
+        "prompt_variant": resp.prompt_variant,
+        "system_prompt": resp.system_prompt,
+        "user_prompt": resp.user_prompt,
+        "response_text": resp.response_text,
+        "raw": resp.raw,
+        "timestamp": time.time(),
+    }
+
+
+def error_record(item: WorkItem, error: Exception) -> Dict[str, Any]:
+    return {
+        "scenario_id": item.scenario.id,
+        "model_name": item.model_name,
+        "prompt_variant": item.variant.value,
+        "error": str(error),
+        "timestamp": time.time(),
+    }
+
+
+def run_work_item(item: WorkItem, model) -> Dict[str, Any]:
+    """
+    Generate one response and turn it into an output record
+    (or an error record if the model call fails).
+    """
+    try:
+        resp = model.generate(
+            system_prompt=build_system_prompt(item.variant),
+            user_prompt=build_user_prompt(item.scenario),
+            scenario_id=item.scenario.id,
+            prompt_variant=item.variant.value,
+        )
+        return response_record(item, resp)
+    except Exception as e:
+        print(f"[ERROR] {item.model_name} failed: {e}")
+        return error_record(item, e)
+
+
+def run_generation(
+    items: Iterable[WorkItem],
+    registry: ModelRegistry,
+    write: Callable[[Dict[str, Any]], None],
+    label: str = "model",
+    max_pending: int = 10000,
+) -> int:
+    """
+    Run all work items and pass each output record to `write`.
+
+    Models are built lazily the first time a work item needs them, and each
+    model runs at most `max_concurrency` requests at a time on its own
+    thread pool, so a saturated model never holds up the others. At most
+    `max_pending` items are queued or running at once.
+    Returns the number of records written.
+    """
+    pools: Dict[str, ThreadPoolExecutor] = {}
+    pending = threading.BoundedSemaphore(max(1, max_pending))
+    write_lock = threading.Lock()
+    write_errors: List[BaseException] = []
+    num_written = 0
+
+    def task(item: WorkItem, model) -> None:
+        nonlocal num_written
+        try:
+            record = run_work_item(item, model)
+            with write_lock:
+                write(record)
+                num_written += 1
+        except BaseException as e:
+            write_errors.append(e)
+        finally:
+            pending.release()
+
+    try:
+        for item in items:
+            model = registry.get(item.model_name)
+            if model is None:
+                continue
+            pool = pools.get(item.model_name)
+            if pool is None:
+                pool = pools[item.model_name] = ThreadPoolExecutor(
+                    max_workers=max(1, registry.specs[item.model_name].max_concurrency),
+                    thread_name_prefix=f"gen-{item.model_name}",
+                )
+            print(
+                f"Running {label}={item.model_name}, "
+                f"variant={item.variant.value}, scenario={item.scenario.id}"
+            )
+            # Bounds the backlog across all models; a per-model limit here
+            # would stall submission for every model behind the slowest one.
+            pending.acquire()
+            pool.submit(task, item, model)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+
+    if write_errors:
+        raise write_errors[0]
+    return num_written
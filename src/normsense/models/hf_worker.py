@@ -0,0 +1,227 @@
+from __future__ import annotations
+import ipaddress
+import os
+import secrets
+import socket
+import threading
+import time
+from dataclasses import asdict
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from .base import ModelResponse
+
+
+DEFAULT_WORKER_ADDRESS = "127.0.0.1:6001"
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Parse 'host:port' into a (host, port) tuple.
+    """
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid worker address {address!r}, expected 'host:port'.")
+    return host, int(port)
+
+
+# The connection unpickles requests, so the authkey is all that stands between
+# a client and code execution in the worker. There is no built-in default: the
+# key comes from NORMSENSE_HF_WORKER_AUTHKEY, or the worker generates a random
+# one at startup and writes it to a 0600 key file that local clients read.
+AUTHKEY_ENV = "NORMSENSE_HF_WORKER_AUTHKEY"
+
+
+def key_file(address: str) -> Path:
+    """
+    Where a worker listening on `address` keeps its generated authkey.
+    """
+    _, port = parse_address(address)
+    base = os.getenv("NORMSENSE_HF_WORKER_KEY_DIR") or Path.home() / ".cache" / "normsense"
+    return Path(base) / f"hf_worker-{port}.key"
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def _server_authkey(address: str) -> bytes:
+    key = os.getenv(AUTHKEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    host, _ = parse_address(address)
+    if not _is_loopback(host):
+        raise RuntimeError(
+            f"Refusing to serve on {address} without {AUTHKEY_ENV}: a generated key only "
+            "reaches clients on this machine. Set a long random key on the worker and its clients."
+        )
+    path = key_file(address)
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    key = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(key)
+    os.chmod(path, 0o600)  # O_CREAT does not change the mode of an existing file
+    print(f"[HFWorker] Wrote a generated authkey to {path}")
+    return key.encode("utf-8")
+
+
+def _client_authkey(address: str) -> bytes:
+    key = os.getenv(AUTHKEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    path = key_file(address)
+    try:
+        return path.read_text(encoding="utf-8").strip().encode("utf-8")
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"No authkey for the HF worker on {address}: set {AUTHKEY_ENV} "
+            f"or run the worker on this machine (it writes {path})."
+        ) from None
+
+
+class HFWorker:
+    """
+    Long-lived process that keeps local HF models loaded and serves
+    generation requests to scripts over a multiprocessing connection.
+
+    Models are loaded once (preload) or on first request; wrappers for the
+    same model_id with different sampling settings share one pipeline.
+    """
+
+    def __init__(self, address: str = DEFAULT_WORKER_ADDRESS) -> None:
+        self.address = address
+        self._models: Dict[Tuple[str, int, float, float], Any] = {}
+        self._startup: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_model(
+        self,
+        model_id: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+    ):
+        from .huggingface_local import HFLocalCausalLM
+
+        key = (model_id, max_new_tokens, temperature, top_p)
+        model = self._models.get(key)
+        if model is None:
+            model = HFLocalCausalLM(
+                model_id=model_id,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+            )
+            self._models[key] = model
+            self._startup.setdefault(model_id, model.startup_timings)
+        return model
+
+    def _handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "models": sorted(self._startup), "startup": self._startup}
+        if op == "load":
+            with self._lock:
+                self.get_model(**request["model"])
+            return {"ok": True, "startup": self._startup[request["model"]["model_id"]]}
+        if op == "generate":
+            with self._lock:
+                model = self.get_model(**request["model"])
+                resp = model.generate(**request["kwargs"])
+            return {"ok": True, "response": asdict(resp)}
+        return {"ok": False, "error": f"Unknown op: {op!r}"}
+
+    def _serve_connection(self, conn) -> None:
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    return
+                try:
+                    reply = self._handle(request)
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                conn.send(reply)
+
+    def serve_forever(self) -> None:
+        host, port = parse_address(self.address)
+        with Listener((host, port), authkey=_server_authkey(self.address)) as listener:
+            print(f"[HFWorker] Serving {sorted(self._startup)} on {self.address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), daemon=True
+                ).start()
+
+
+class HFWorkerClient:
+    """
+    LLMModel implementation that forwards generation to a running HFWorker.
+    Constructor arguments mirror HFLocalCausalLM.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        address: str = DEFAULT_WORKER_ADDRESS,
+        max_new_tokens: int = 256,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+    ) -> None:
+        self.model_id = model_id
+        self.name = model_id
+        self.address = address
+        self._model_spec = {
+            "model_id": model_id,
+            "max_new_tokens": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+        }
+
+        t_start = time.perf_counter()
+        host, port = parse_address(address)
+        self._conn = Client((host, port), authkey=_client_authkey(address))
+        self._lock = threading.Lock()
+        reply = self._call({"op": "load", "model": self._model_spec})
+        self.startup_timings = {"attach": time.perf_counter() - t_start}
+        print(
+            f"[HFWorkerClient] Attached to {model_id} on {address} in "
+            f"{self.startup_timings['attach']:.2f}s "
+            f"(worker load took {reply['startup'].get('total', 0.0):.2f}s)."
+        )
+
+    def _call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.send(request)
+            reply = self._conn.recv()
+        if not reply.get("ok"):
+            raise RuntimeError(f"HF worker error: {reply.get('error')}")
+        return reply
+
+    def generate(
+        self,
+        *,
+        system_prompt: str,
+        user_prompt: str,
+        scenario_id: str,
+        prompt_variant: str,
+    ) -> ModelResponse:
+        reply = self._call(
+            {
+                "op": "generate",
+                "model": self._model_spec,
+                "kwargs": {
+                    "system_prompt": system_prompt,
+                    "user_prompt": user_prompt,
+                    "scenario_id": scenario_id,
+                    "prompt_variant": prompt_variant,
+                },
+            }
+        )
+        return ModelResponse(**reply["response"])
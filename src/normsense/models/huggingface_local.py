@@ -1,18 +1,71 @@
 from __future__ import annotations
 import os
-from typing import Any, Dict
-
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
 
 from .base import ModelResponse
 
 
+# Process-wide caches so that several wrappers (e.g. a generator and a judge
+# using the same checkpoint) share one tokenizer / one set of weights.
+_TOKENIZER_CACHE: Dict[str, Any] = {}
+_PIPELINE_CACHE: Dict[Tuple[str, int], Any] = {}
+
+
+def resolve_model_path(model_id: str, token: str | None = None) -> Tuple[str, bool]:
+    """
+    Resolve a model id to a local directory, offline-first.
+
+    Returns (path, downloaded). A local directory is used as-is; otherwise the
+    local Hugging Face cache is consulted without any hub lookups, and only on a
+    cache miss is the snapshot downloaded (unless HF_HUB_OFFLINE is set).
+    """
+    if Path(model_id).is_dir():
+        return model_id, False
+
+    from huggingface_hub import snapshot_download
+
+    try:
+        return snapshot_download(model_id, local_files_only=True), False
+    except Exception:
+        if os.getenv("HF_HUB_OFFLINE"):
+            raise RuntimeError(
+                f"Model {model_id} is not in the local Hugging Face cache "
+                "and HF_HUB_OFFLINE is set."
+            )
+
+    if not token:
+        raise RuntimeError(
+            f"Model {model_id} is not cached locally and HUGGINGFACE_API_TOKEN "
+            "is not set. Add it to your .env or environment."
+        )
+    return snapshot_download(model_id, token=token), True
+
+
+def load_tokenizer(model_path: str) -> Any:
+    """
+    Load (or reuse) the tokenizer for a resolved local model path.
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = _TOKENIZER_CACHE.get(model_path)
+    if tokenizer is None:
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        _TOKENIZER_CACHE[model_path] = tokenizer
+    return tokenizer
+
+
 class HFLocalCausalLM:
     """
     Local Hugging Face causal LM wrapper.
     Uses a chat/instruct model from Hugging Face and runs it locally on CPU/GPU.
 
+    Weights are resolved from the local HF cache first and loaded memory-mapped
+    (safetensors + low_cpu_mem_usage). Loaded pipelines are cached per process,
+    so constructing a second wrapper for the same model is free.
+    Startup cost is recorded in `startup_timings` (seconds per step).
+
     Example models (free, open-weight):
       - TinyLlama/TinyLlama-1.1B-Chat-v1.0   (small, best for laptops)
       - mistralai/Mistral-7B-Instruct-v0.2   (larger, may require more RAM/GPU)
@@ -30,26 +83,66 @@ class HFLocalCausalLM:
         self.max_new_tokens = max_new_tokens
         self.temperature = temperature
         self.top_p = top_p
+        self.startup_timings: Dict[str, float] = {}
 
-        hf_token = os.getenv("HUGGINGFACE_API_TOKEN")
-        if not hf_token:
-            raise RuntimeError(
-                "HUGGINGFACE_API_TOKEN not set. Add it to your .env or environment."
-            )
+        # torch / transformers are only imported once a local model is built
+        import torch
+        from transformers import AutoModelForCausalLM, pipeline
 
         # Choose device
         device = 0 if torch.cuda.is_available() else -1  # -1 = CPU
 
+        cached = _PIPELINE_CACHE.get((model_id, device))
+        if cached is not None:
+            self.generator = cached
+            self.startup_timings = {"total": 0.0}
+            return
+
+        t_start = time.perf_counter()
+        hf_token = os.getenv("HUGGINGFACE_API_TOKEN")
+
         print(f"[HFLocalCausalLM] Loading model {model_id} on device={device} ...")
+        model_path, downloaded = resolve_model_path(model_id, token=hf_token)
+        t_resolved = time.perf_counter()
+
+        tokenizer = load_tokenizer(model_path)
+        t_tokenizer = time.perf_counter()
+
+        has_safetensors = any(Path(model_path).glob("*.safetensors"))
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            low_cpu_mem_usage=True,
+            use_safetensors=has_safetensors,
+            local_files_only=True,
+        )
+        t_weights = time.perf_counter()
+
         self.generator = pipeline(
             "text-generation",
-            model=model_id,
-            tokenizer=model_id,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            model=model,
+            tokenizer=tokenizer,
             device=device,
-            token=hf_token,
         )
-        print(f"[HFLocalCausalLM] Loaded model {model_id}.")
+        t_pipeline = time.perf_counter()
+        _PIPELINE_CACHE[(model_id, device)] = self.generator
+
+        self.startup_timings = {
+            "resolve": t_resolved - t_start,
+            "tokenizer": t_tokenizer - t_resolved,
+            "weights": t_weights - t_tokenizer,
+            "pipeline": t_pipeline - t_weights,
+            "total": t_pipeline - t_start,
+        }
+        source = "downloaded" if downloaded else "local cache"
+        print(
+            f"[HFLocalCausalLM] Loaded model {model_id} from {source} in "
+            f"{self.startup_timings['total']:.2f}s "
+            f"(resolve={self.startup_timings['resolve']:.2f}s, "
+            f"tokenizer={self.startup_timings['tokenizer']:.2f}s, "
+            f"weights={self.startup_timings['weights']:.2f}s, "
+            f"pipeline={self.startup_timings['pipeline']:.2f}s)."
+        )
 
     def _build_prompt(self, system_prompt: str, user_prompt: str) -> str:
         # Simple chat-style formatting
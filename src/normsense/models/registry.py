@@ -0,0 +1,174 @@
+from __future__ import annotations
+import importlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .base import LLMModel
+
+
+# Backend name -> "module:attribute". Modules are imported on first use only,
+# so importing the registry never pulls in torch, transformers or API SDKs.
+BACKENDS: Dict[str, str] = {
+    "openai": "normsense.models.openai_wrapper:OpenAIChatModel",
+    "anthropic": "normsense.models.anthropic_wrapper:AnthropicChatModel",
+    "http": "normsense.models.open_weight_http:HTTPJSONGenerationModel",
+    "http_llama3_70b": "normsense.models.open_weight_http:make_llama3_70b_instruct_http",
+    "http_mistral_7b": "normsense.models.open_weight_http:make_mistral_7b_instruct_http",
+    "hf_local": "normsense.models.huggingface_local:HFLocalCausalLM",
+    "hf_worker": "normsense.models.hf_worker:HFWorkerClient",
+}
+
+_LOADED: Dict[str, Any] = {}
+
+
+def register_backend(name: str, target: str) -> None:
+    """
+    Register (or override) a backend as "module:attribute".
+    """
+    if ":" not in target:
+        raise ValueError(f"Backend target must look like 'module:attribute', got {target!r}")
+    BACKENDS[name] = target
+    _LOADED.pop(name, None)
+
+
+def get_backend(name: str) -> Any:
+    """
+    Return the factory (class or function) for a backend, importing it lazily.
+    """
+    factory = _LOADED.get(name)
+    if factory is not None:
+        return factory
+
+    try:
+        target = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown model backend {name!r}. Known backends: {sorted(BACKENDS)}"
+        ) from None
+
+    module_name, attr = target.split(":", 1)
+    factory = getattr(importlib.import_module(module_name), attr)
+    _LOADED[name] = factory
+    return factory
+
+
+def create_model(backend: str, **params: Any) -> LLMModel:
+    """
+    Build a model wrapper from its backend name and constructor parameters.
+    """
+    return get_backend(backend)(**params)
+
+
+@dataclass
+class ModelSpec:
+    """
+    Declarative description of one model entry in a registry config.
+    """
+    name: str
+    backend: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    max_concurrency: int = 1
+    optional: bool = False
+    # Provider rate limit for API backends (None = only max_concurrency applies).
+    requests_per_minute: Optional[float] = None
+
+
+def _read_config(path: Path) -> Dict[str, Any]:
+    if path.suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with path.open("rb") as f:
+            return tomllib.load(f)
+
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ModelRegistry:
+    """
+    Config-driven set of models. Wrappers are only built (and clients /
+    weights only set up) the first time `get` is called for a name.
+
+    Config format (JSON or TOML):
+      {"models": [{"name": ..., "backend": ..., "params": {...},
+                   "max_concurrency": 1, "optional": false,
+                   "requests_per_minute": null}, ...]}
+    Optional models that fail to build are skipped with a warning.
+    """
+
+    def __init__(self, specs: Iterable[ModelSpec]) -> None:
+        self.specs: Dict[str, ModelSpec] = {}
+        for spec in specs:
+            if spec.name in self.specs:
+                raise ValueError(f"Duplicate model name in registry: {spec.name}")
+            self.specs[spec.name] = spec
+        self._models: Dict[str, Optional[LLMModel]] = {}
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "ModelRegistry":
+        data = _read_config(Path(path))
+        return cls(ModelSpec(**entry) for entry in data.get("models", []))
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    def select(self, names: Iterable[str] | None) -> "ModelRegistry":
+        """
+        Return a registry restricted to `names` (all models if None).
+        """
+        if names is None:
+            return self
+        names = list(names)
+        unknown = [n for n in names if n not in self.specs]
+        if unknown:
+            raise ValueError(f"Unknown model(s) {unknown}. Known models: {self.names}")
+        return ModelRegistry(self.specs[n] for n in names)
+
+    def with_hf_worker(self, address: str) -> "ModelRegistry":
+        """
+        Return a registry where local HF models attach to a running HF worker.
+        """
+        specs = []
+        for spec in self.specs.values():
+            if spec.backend == "hf_local":
+                spec = ModelSpec(
+                    name=spec.name,
+                    backend="hf_worker",
+                    params={**spec.params, "address": address},
+                    max_concurrency=spec.max_concurrency,
+                    optional=spec.optional,
+                    requests_per_minute=spec.requests_per_minute,
+                )
+            specs.append(spec)
+        return ModelRegistry(specs)
+
+    def loaded_models(self) -> Dict[str, LLMModel]:
+        """
+        Models that have been built so far (skipped optional models excluded).
+        """
+        return {name: m for name, m in self._models.items() if m is not None}
+
+    def get(self, name: str) -> Optional[LLMModel]:
+        """
+        Build (once) and return the model called `name`.
+        Returns None for an optional model that could not be built.
+        """
+        if name in self._models:
+            return self._models[name]
+
+        spec = self.specs[name]
+        try:
+            model = create_model(spec.backend, **spec.params)
+        except Exception as e:
+            if not spec.optional:
+                raise
+            print(f"[WARN] Skipping {name}: {e}")
+            model = None
+
+        self._models[name] = model
+        return model
@@ -0,0 +1,550 @@
+from __future__ import annotations
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+# Phase DAG runner behind `python -m normsense run`.
+#
+# Every phase is a Stage with declared input and output artifacts (names of
+# PipelineConfig paths) and the source files it depends on. A stage's
+# fingerprint hashes its input contents, its code and its parameters; the
+# stage is skipped when the fingerprint matches the last successful run and
+# its outputs are still in place. Stages depend on the stages that produce
+# their inputs, and independent stages run concurrently in one process.
+#
+# Code is tracked per stage: the modules it lists and the source of its own
+# run function here (plus the pipeline helpers that calls), so editing
+# analysis code, or how run_aggregate calls it, re-runs only the analysis
+# stages and never judging or generation.
+
+STATE_VERSION = 1
+PACKAGE_DIR = Path(__file__).resolve().parent
+_HASH_BLOCK = 1 << 22
+
+
+@dataclass
+class PipelineConfig:
+    """
+    Artifact paths and stage parameters; defaults mirror the phase scripts.
+    """
+
+    root: Path
+    judge_model: str = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+    # Model registry config of LLM judges replacing judge_model (a panel if several).
+    judges: Optional[str] = None
+    worker: Optional[str] = None
+    bootstrap: int = 10_000
+    permutations: int = 10_000
+    top_k: int = 10
+    clusters: int = 20
+    plot_workers: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        self.root = Path(self.root)
+        processed = self.root / "data" / "processed"
+        self.paths: Dict[str, Path] = {
+            "scenarios": self.root / "data" / "raw" / "normsense_scenarios_v0.3.json",
+            "hf_config": self.root / "configs" / "models_hf_local.json",
+            "api_config": self.root / "configs" / "models_phase2.json",
+            "hf_responses": processed / "model_responses_hf_local.jsonl",
+            "api_responses": processed / "model_responses_v0.3.jsonl",
+            "scores": processed / "model_scores_v0.3.jsonl",
+            "summary": processed / "model_score_summary_by_model_variant.csv",
+            "paired_tests": processed / "model_score_paired_tests.csv",
+            "cube": processed / "model_score_cube.csv",
+            "effects": processed / "model_score_effects.csv",
+            "effects_fit": processed / "model_score_effects_fit.csv",
+            "figures": self.root / "reports" / "figures" / ".figures_manifest.json",
+            "examples": self.root / "reports" / "error_analysis" / "qualitative_examples.md",
+            "rationale_clusters": processed / "rationale_clusters.csv",
+            "distilled_judge": processed / "distilled_judge.npz",
+            "distilled_agreement": processed / "distilled_judge_agreement.csv",
+            "clusters_report": self.root / "reports" / "error_analysis" / "rationale_clusters.md",
+        }
+        self.state_path = self.root / "data" / ".pipeline_state.json"
+
+    def path(self, name: str) -> Path:
+        return self.paths[name]
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[PipelineConfig], None]
+    inputs: Sequence[str]
+    outputs: Sequence[str]
+    # Source files / directories under src/normsense the stage's behaviour depends on.
+    code: Sequence[str]
+    # PipelineConfig fields that change the stage's results.
+    params: Sequence[str] = ()
+    # PipelineConfig fields naming optional input files, hashed by content when set.
+    input_params: Sequence[str] = ()
+    # Part of `normsense run` without explicit targets.
+    default: bool = True
+
+
+# --- stages ------------------------------------------------------------------
+
+
+def _run_generate(cfg: PipelineConfig, config_key: str, out_key: str, label: str) -> None:
+    from normsense.generation import build_work_items, run_generation, select_variants
+    from normsense.models.registry import ModelRegistry
+    from normsense.scenarios import load_scenarios
+    from normsense.storage.records import record_sink
+
+    scenario_set = load_scenarios(cfg.path("scenarios"), cache=True)
+    registry = ModelRegistry.from_file(cfg.path(config_key))
+    if cfg.worker and config_key == "hf_config":
+        registry = registry.with_hf_worker(cfg.worker)
+    items = build_work_items(scenario_set.scenarios, select_variants(None), registry.names)
+    with record_sink(cfg.path(out_key), "jsonl", kind="responses", index=True) as write:
+        num_written = run_generation(items, registry, write=write, label=label)
+    print(f"Wrote {num_written} records to {cfg.path(out_key)}")
+
+
+def run_generate_hf(cfg: PipelineConfig) -> None:
+    _run_generate(cfg, "hf_config", "hf_responses", "HF model")
+
+
+def run_generate_api(cfg: PipelineConfig) -> None:
+    _run_generate(cfg, "api_config", "api_responses", "model")
+
+
+def run_score(cfg: PipelineConfig) -> None:
+    from normsense.scenarios import load_scenarios
+    from normsense.models.registry import ModelRegistry
+    from normsense.scoring.judge_model import JudgeModel
+    from normsense.scoring.panel import JudgePanel, PanelJudge
+    from normsense.storage.records import iter_records, record_sink
+
+    scenario_by_id = load_scenarios(cfg.path("scenarios"), cache=True).by_id
+    if cfg.judges:
+        panel = JudgePanel.from_registry(ModelRegistry.from_file(cfg.judges))
+    else:
+        judge = JudgeModel(model_id=cfg.judge_model, worker_address=cfg.worker)
+        panel = JudgePanel([PanelJudge(judge)], max_retries=0)
+    num_scored = 0
+    batch: List[Dict] = []
+
+    def flush(write) -> None:
+        nonlocal num_scored
+        panel.score_records(batch, scenario_by_id, write=write)
+        num_scored += len(batch)
+        batch.clear()
+
+    with record_sink(cfg.path("scores"), "jsonl", kind="scores") as write:
+        for record in iter_records(cfg.path("hf_responses")):
+            if "error" in record:
+                continue
+            batch.append(record)
+            if len(batch) >= 4096:
+                flush(write)
+        if batch:
+            flush(write)
+    panel.close()
+    print(f"Wrote {num_scored} records to {cfg.path('scores')}")
+
+
+def run_aggregate(cfg: PipelineConfig) -> None:
+    from normsense.analysis.aggregate import load_scores, summarize_with_cis
+    from normsense.analysis.cube import attach_facets, cube
+    from normsense.analysis.effects import fit_effects
+    from normsense.analysis.significance import paired_tests
+    from normsense.scenarios import load_scenarios
+
+    df = load_scores(cfg.path("scores"), facets=True)
+    summary = summarize_with_cis(df, n_boot=cfg.bootstrap)
+    tests = paired_tests(df, n_perm=cfg.permutations)
+    df = attach_facets(df, load_scenarios(cfg.path("scenarios"), cache=True))
+    breakdown = cube(df)
+    effects = fit_effects(df)
+
+    cfg.path("summary").parent.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(cfg.path("summary"), index=False)
+    tests.to_csv(cfg.path("paired_tests"), index=False)
+    breakdown.to_csv(cfg.path("cube"), index=False)
+    effects.effects.to_csv(cfg.path("effects"), index=False)
+    effects.fit.to_csv(cfg.path("effects_fit"), index=False)
+    print(f"Wrote summary of {len(summary)} cells, {len(tests)} paired tests and {len(breakdown)} cube rows")
+
+
+def run_plots(cfg: PipelineConfig) -> None:
+    from normsense.analysis.figures import facet_figure_specs, render_figures, summary_figure_specs
+    from normsense.analysis.plots import load_summary
+
+    specs = summary_figure_specs(load_summary(cfg.path("summary")))
+    specs += facet_figure_specs(load_summary(cfg.path("cube")))
+    rendered, skipped = render_figures(specs, cfg.path("figures").parent, workers=cfg.plot_workers)
+    print(f"Rendered {len(rendered)} figures ({len(skipped)} up to date)")
+
+
+def run_errors(cfg: PipelineConfig) -> None:
+    from normsense.analysis.errors import write_examples_markdown
+    from normsense.analysis.topk import attach_responses, stream_top_k
+
+    examples = stream_top_k(cfg.path("scores"), k=cfg.top_k)
+    examples = attach_responses(examples, cfg.path("hf_responses"))
+    write_examples_markdown(cfg.path("examples"), examples)
+    print(f"Wrote {cfg.path('examples')}")
+
+
+def run_clusters(cfg: PipelineConfig) -> None:
+    from normsense.analysis.clusters import cluster_rationales, write_clusters_markdown
+
+    result = cluster_rationales(cfg.path("scores"), n_clusters=cfg.clusters, max_score=2.0)
+    result.clusters.to_csv(cfg.path("rationale_clusters"), index=False)
+    processed = cfg.path("rationale_clusters").parent
+    result.breakdown.to_csv(processed / "rationale_cluster_breakdown.csv", index=False)
+    result.examples.to_csv(processed / "rationale_cluster_examples.csv", index=False)
+    write_clusters_markdown(cfg.path("clusters_report"), result, title="Rationale Clusters (overall <= 2)")
+    print(f"Clustered {result.num_documents} low-scoring rationales into {len(result.clusters)} clusters")
+
+
+def run_distill(cfg: PipelineConfig) -> None:
+    from normsense.scenarios import load_scenarios
+    from normsense.scoring.distilled import SCORE_DIMENSIONS, load_training_pairs, train_distilled_judge
+
+    scenarios = load_scenarios(cfg.path("scenarios"), cache=True).scenarios
+    pairs = load_training_pairs(cfg.path("scores"), cfg.path("hf_responses"), {s.id: s.text for s in scenarios})
+    result = train_distilled_judge(
+        pairs["scenario_id"],
+        pairs["scenario_text"],
+        pairs["response_text"],
+        pairs[SCORE_DIMENSIONS].to_numpy(dtype="float64"),
+    )
+    result.judge.save(cfg.path("distilled_judge"))
+    result.agreement.to_csv(cfg.path("distilled_agreement"), index=False)
+    print(f"Trained distilled judge on {len(pairs)} responses (alpha={result.alpha:g})")
+
+
+# Modules each stage imports, listed file by file: a directory would make, say,
+# a Parquet or distilled-judge edit re-run generation and LLM judging.
+_WRITE = ["storage/files.py", "storage/writer.py", "storage/records.py", "storage/index.py"]
+_SCENARIOS = ["scenarios.py", "storage/files.py", "storage/writer.py"]
+_MODELS_BASE = ["models/base.py", "models/registry.py"]
+_HF_MODELS = ["models/huggingface_local.py", "models/hf_worker.py"]
+_API_MODELS = ["models/openai_wrapper.py", "models/anthropic_wrapper.py", "models/open_weight_http.py"]
+_GENERATION = ["generation.py", "prompts.py", "sharding.py", *_SCENARIOS, *_MODELS_BASE, *_WRITE]
+_JUDGING = [
+    "scoring/judge_model.py", "scoring/judge_prompt.py", "scoring/rubric.py", "scoring/runner.py",
+    "scoring/panel.py",
+]
+_ANALYSIS_BASE = ["analysis/loading.py", "storage/files.py", "storage/parquet.py"]
+
+STAGES: List[Stage] = [
+    Stage(
+        "generate_hf",
+        run_generate_hf,
+        inputs=["scenarios", "hf_config"],
+        outputs=["hf_responses"],
+        code=[*_GENERATION, *_HF_MODELS],
+    ),
+    Stage(
+        "generate_api",
+        run_generate_api,
+        inputs=["scenarios", "api_config"],
+        outputs=["api_responses"],
+        code=[*_GENERATION, *_API_MODELS],
+        default=False,
+    ),
+    Stage(
+        "score",
+        run_score,
+        inputs=["scenarios", "hf_responses"],
+        outputs=["scores"],
+        # --judges configs may use any backend.
+        code=[*_JUDGING, *_SCENARIOS, *_MODELS_BASE, *_HF_MODELS, *_API_MODELS, *_WRITE],
+        params=["judge_model"],
+        input_params=["judges"],
+    ),
+    Stage(
+        "aggregate",
+        run_aggregate,
+        inputs=["scenarios", "scores"],
+        outputs=["summary", "paired_tests", "cube", "effects", "effects_fit"],
+        code=[
+            "analysis/aggregate.py", "analysis/bootstrap.py", "analysis/significance.py",
+            "analysis/cube.py", "analysis/effects.py", *_SCENARIOS, *_ANALYSIS_BASE,
+        ],
+        params=["bootstrap", "permutations"],
+    ),
+    Stage(
+        "plots",
+        run_plots,
+        inputs=["summary", "cube"],
+        outputs=["figures"],
+        code=["analysis/figures.py", "analysis/plots.py", "analysis/loading.py"],
+    ),
+    Stage(
+        "errors",
+        run_errors,
+        inputs=["scores", "hf_responses"],
+        outputs=["examples"],
+        code=["analysis/topk.py", "analysis/errors.py", "storage/index.py", *_ANALYSIS_BASE],
+        params=["top_k"],
+    ),
+    Stage(
+        "clusters",
+        run_clusters,
+        inputs=["scores"],
+        outputs=["rationale_clusters", "clusters_report"],
+        code=["analysis/clusters.py", "storage/index.py", *_ANALYSIS_BASE],
+        params=["clusters"],
+        # Needs scikit-learn, which is optional.
+        default=False,
+    ),
+    Stage(
+        "distill",
+        run_distill,
+        inputs=["scenarios", "scores", "hf_responses"],
+        outputs=["distilled_judge", "distilled_agreement"],
+        code=["scoring/distilled.py", "storage/records.py", *_SCENARIOS, *_ANALYSIS_BASE],
+        default=False,
+    ),
+]
+
+
+# --- fingerprints --------------------------------------------------------------
+
+
+def _stamp(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+class _HashCache:
+    """
+    Content hashes of files, reused while a file's size and mtime are unchanged
+    so multi-GB artifacts are only hashed after they change.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict]] = None) -> None:
+        self.entries: Dict[str, Dict] = dict(entries or {})
+        self._lock = threading.Lock()
+
+    def file_hash(self, path: Path) -> str:
+        key = str(path.resolve())
+        stamp = _stamp(path)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["stamp"] == stamp:
+                return entry["sha256"]
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.entries[key] = {"stamp": stamp, "sha256": digest}
+        return digest
+
+    def tree_hash(self, path: Path) -> str:
+        if path.is_file():
+            return self.file_hash(path)
+        h = hashlib.sha256()
+        for child in sorted(p for p in path.rglob("*") if p.is_file() and "__pycache__" not in p.parts):
+            h.update(str(child.relative_to(path)).encode("utf-8"))
+            h.update(self.file_hash(child).encode("ascii"))
+        return h.hexdigest()
+
+
+def _artifact_hash(cache: _HashCache, path: Path) -> str:
+    # JSONL outputs may exist only in a compressed form.
+    from normsense.storage.files import find_artifact
+
+    path = find_artifact(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Missing pipeline input {path}")
+    return cache.tree_hash(path)
+
+
+def _stage_source(run: Callable) -> str:
+    """
+    Source of a stage's run function and of the functions of this module it
+    calls (e.g. run_generate_hf -> _run_generate), not the whole file.
+    """
+    sources: List[str] = []
+    seen: Set[Callable] = set()
+    todo = [run]
+    while todo:
+        fn = todo.pop()
+        if fn in seen:
+            continue
+        seen.add(fn)
+        sources.append(inspect.getsource(fn))
+        for name in fn.__code__.co_names:
+            obj = globals().get(name)
+            if inspect.isfunction(obj) and obj.__module__ == __name__:
+                todo.append(obj)
+    return "\n".join(sources)
+
+
+def stage_fingerprint(stage: Stage, cfg: PipelineConfig, cache: _HashCache) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps([STATE_VERSION, stage.name]).encode("utf-8"))
+    for name in stage.inputs:
+        h.update(f"in:{name}:{_artifact_hash(cache, cfg.path(name))}".encode("utf-8"))
+    for name in stage.input_params:
+        value = getattr(cfg, name)
+        digest = _artifact_hash(cache, Path(value)) if value else "-"
+        h.update(f"in:{name}:{digest}".encode("utf-8"))
+    for rel in dict.fromkeys(stage.code):
+        h.update(f"code:{rel}:{cache.tree_hash(PACKAGE_DIR / rel)}".encode("utf-8"))
+    h.update(_stage_source(stage.run).encode("utf-8"))
+    params = {p: getattr(cfg, p) for p in stage.params}
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+# --- runner -------------------------------------------------------------------
+
+
+def _stage_map() -> Dict[str, Stage]:
+    return {stage.name: stage for stage in STAGES}
+
+
+def stage_dependencies(stages: Sequence[Stage] = STAGES) -> Dict[str, Set[str]]:
+    producers = {out: stage.name for stage in stages for out in stage.outputs}
+    return {
+        stage.name: {producers[i] for i in stage.inputs if i in producers} for stage in stages
+    }
+
+
+def _with_dependencies(targets: Iterable[str]) -> List[str]:
+    deps = stage_dependencies()
+    order = [stage.name for stage in STAGES]
+    wanted: Set[str] = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in deps:
+            raise ValueError(f"Unknown stage {name!r}. Stages: {order}")
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return [name for name in order if name in wanted]
+
+
+@dataclass
+class PipelineRunner:
+    """
+    Runs the selected stages in dependency order, `jobs` at a time, and
+    records fingerprints of successful stages in data/.pipeline_state.json.
+    """
+
+    cfg: PipelineConfig
+    jobs: int = 2
+    force: Sequence[str] = ()
+    # Stages whose existing outputs are accepted as current without running
+    # them (e.g. artifacts produced earlier by the phase scripts).
+    mark_done: Sequence[str] = ()
+    dry_run: bool = False
+    state: Dict = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        path = self.cfg.state_path
+        if path.exists():
+            state = json.loads(path.read_text(encoding="utf-8"))
+            if state.get("version") == STATE_VERSION:
+                self.state = state
+        self.state.setdefault("version", STATE_VERSION)
+        self.state.setdefault("stages", {})
+        self.cache = _HashCache(self.state.get("hashes"))
+        self._lock = threading.Lock()
+
+    def _save(self) -> None:
+        with self._lock:
+            self.state["hashes"] = self.cache.entries
+            path = self.cfg.state_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(self.state, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, path)
+
+    def _up_to_date(self, stage: Stage, fingerprint: str) -> bool:
+        if stage.name in self.force or "all" in self.force:
+            return False
+        recorded = self.state["stages"].get(stage.name, {})
+        if recorded.get("fingerprint") != fingerprint:
+            return False
+        from normsense.storage.files import find_artifact
+
+        return all(find_artifact(self.cfg.path(out)).exists() for out in stage.outputs)
+
+    def _run_stage(self, stage: Stage) -> str:
+        """
+        Returns "ran", "skipped" or "would run" (dry run).
+        """
+        fingerprint = stage_fingerprint(stage, self.cfg, self.cache)
+        if self._up_to_date(stage, fingerprint):
+            print(f"[{stage.name}] up to date")
+            return "skipped"
+        if stage.name in self.mark_done and not self.dry_run:
+            self._record(stage, fingerprint, elapsed=0.0)
+            print(f"[{stage.name}] marked up to date")
+            return "skipped"
+        if self.dry_run:
+            print(f"[{stage.name}] would run")
+            return "would run"
+        print(f"[{stage.name}] running ...")
+        t0 = time.perf_counter()
+        stage.run(self.cfg)
+        elapsed = time.perf_counter() - t0
+        self._record(stage, fingerprint, elapsed)
+        print(f"[{stage.name}] done in {elapsed:.2f}s")
+        return "ran"
+
+    def _record(self, stage: Stage, fingerprint: str, elapsed: float) -> None:
+        with self._lock:
+            self.state["stages"][stage.name] = {
+                "fingerprint": fingerprint,
+                "finished_at": time.time(),
+                "seconds": round(elapsed, 3),
+            }
+        self._save()
+
+    def run(self, targets: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """
+        Run `targets` (default: every default stage) and what they depend on.
+        Returns stage -> "ran" / "skipped" / "would run" / "failed" / "blocked".
+        """
+        if not targets:
+            targets = [stage.name for stage in STAGES if stage.default]
+        names = _with_dependencies(targets)
+        stages = _stage_map()
+        deps = {name: d & set(names) for name, d in stage_dependencies().items() if name in names}
+
+        results: Dict[str, str] = {}
+        pending = list(names)
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    if any(results.get(d) in ("failed", "blocked") for d in deps[name]):
+                        results[name] = "blocked"
+                        pending.remove(name)
+                    elif self.dry_run and any(results.get(d) == "would run" for d in deps[name]):
+                        print(f"[{name}] would run (after {', '.join(sorted(deps[name]))})")
+                        results[name] = "would run"
+                        pending.remove(name)
+                    elif all(d in results for d in deps[name]):
+                        running[pool.submit(self._run_stage, stages[name])] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"[{name}] failed: {e!r}")
+                        results[name] = "failed"
+        return results
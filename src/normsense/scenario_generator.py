@@ -0,0 +1,176 @@
+from __future__ import annotations
+import bisect
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .scenarios import Domain, NormType, Scenario
+from .sharding import in_shard
+
+
+@dataclass
+class ScenarioGrid:
+    """
+    Lazy combinatorial scenario generator.
+
+    Base axes: domain x norm_type x context (contexts are per domain).
+    Each base item gets a stable id, SC001, SC002, ..., in that order,
+    exactly as the v0.3 generator numbered them.
+
+    Growth axes multiply every base item:
+      cultures        all cultures of the domain (expand_cultures=True), or
+                      only the derived one (contexts cycle through the list)
+      stakes_levels   all stakes levels (expand_stakes=True), or the derived one
+      norm_tails[n]   paraphrases of the norm question; index 0 is the original
+      templates       framings of "{context} {tail}"; index 0 is the original
+
+    The derived culture / stakes and paraphrase 0 keep the bare base id;
+    every other combination adds suffixes (SC001-Japan-high-t2-f1). Turning
+    on an axis or appending paraphrases therefore adds scenarios without
+    renaming existing ones. Adding contexts renumbers later base ids.
+
+    Scenarios are built on demand: iteration, random access (scenario_at),
+    deterministic sampling and sharding never materialize the full grid.
+    """
+
+    contexts: Dict[str, List[str]]
+    norm_tails: Dict[NormType, List[str]]
+    cultures: Dict[str, List[str]]
+    stakes_levels: List[str] = field(default_factory=lambda: ["low", "moderate", "high"])
+    templates: List[str] = field(default_factory=lambda: ["{context} {tail}"])
+    expand_cultures: bool = False
+    expand_stakes: bool = False
+    id_prefix: str = "SC"
+    id_width: int = 3
+    prompt_source: str = "original"
+
+    def __post_init__(self) -> None:
+        self._domains = [d for d in Domain if d.value in self.contexts]
+        self._norm_types = [n for n in NormType if n in self.norm_tails]
+        self._num_tails = max(len(tails) for tails in self.norm_tails.values())
+        for norm_type, tails in self.norm_tails.items():
+            if len(tails) != self._num_tails:
+                raise ValueError(
+                    f"Every norm type needs {self._num_tails} tail paraphrases; "
+                    f"{norm_type.value} has {len(tails)}."
+                )
+
+        # One block per domain: (domain, first base ordinal, first item index,
+        # contexts, items per base scenario). Domains differ in context and
+        # culture counts, so positions are resolved block by block.
+        self._blocks: List[Tuple[Domain, int, int, int, int]] = []
+        base = item = 0
+        for domain in self._domains:
+            n_ctx = len(self.contexts[domain.value])
+            per_base = self._num_cultures(domain.value) * self._num_stakes * self._num_tails * len(self.templates)
+            self._blocks.append((domain, base, item, n_ctx, per_base))
+            base += len(self._norm_types) * n_ctx
+            item += len(self._norm_types) * n_ctx * per_base
+        self._item_offsets = [block[2] for block in self._blocks]
+        self._num_base = base
+        self._len = item
+
+    def _num_cultures(self, domain_key: str) -> int:
+        return len(self.cultures[domain_key]) if self.expand_cultures else 1
+
+    @property
+    def _num_stakes(self) -> int:
+        return len(self.stakes_levels) if self.expand_stakes else 1
+
+    @property
+    def num_base(self) -> int:
+        return self._num_base
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _build(
+        self,
+        base: int,
+        domain: Domain,
+        norm_type: NormType,
+        idx: int,
+        culture_i: Optional[int],
+        stakes_i: Optional[int],
+        tail_i: int,
+        template_i: int,
+    ) -> Scenario:
+        domain_key = domain.value
+        culture_list = self.cultures[domain_key]
+        derived_culture = idx % len(culture_list)
+        derived_stakes = idx % len(self.stakes_levels)
+        culture_i = derived_culture if culture_i is None else culture_i
+        stakes_i = derived_stakes if stakes_i is None else stakes_i
+
+        cultural_tag = culture_list[culture_i]
+        stakes = self.stakes_levels[stakes_i]
+        tail = self.norm_tails[norm_type][tail_i]
+        text = self.templates[template_i].format(context=self.contexts[domain_key][idx], tail=tail)
+
+        suffix: List[str] = []
+        if culture_i != derived_culture:
+            suffix.append(cultural_tag)
+        if stakes_i != derived_stakes:
+            suffix.append(stakes)
+        if tail_i:
+            suffix.append(f"t{tail_i}")
+        if template_i:
+            suffix.append(f"f{template_i}")
+
+        notes = f"{domain_key}, {norm_type.value}, example {idx + 1}"
+        if suffix:
+            notes += f"; variant {'-'.join(suffix)}"
+        return Scenario(
+            id="-".join([f"{self.id_prefix}{base + 1:0{self.id_width}d}", *suffix]),
+            text=text,
+            domain=domain,
+            norm_type=norm_type,
+            cultural_tag=cultural_tag,
+            stakes_level=stakes,
+            prompt_source=self.prompt_source if not (tail_i or template_i) else "paraphrase",
+            notes=notes,
+        )
+
+    def scenario_at(self, i: int) -> Scenario:
+        """
+        The i-th scenario in iteration order, without building the others.
+        """
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        domain, base_offset, item_offset, n_ctx, per_base = self._blocks[
+            bisect.bisect_right(self._item_offsets, i) - 1
+        ]
+        rest, g = divmod(i - item_offset, per_base)
+        g, template_i = divmod(g, len(self.templates))
+        g, tail_i = divmod(g, self._num_tails)
+        culture_i, stakes_i = divmod(g, self._num_stakes)
+        return self._build(
+            base_offset + rest,
+            domain,
+            self._norm_types[rest // n_ctx],
+            rest % n_ctx,
+            culture_i if self.expand_cultures else None,
+            stakes_i if self.expand_stakes else None,
+            tail_i,
+            template_i,
+        )
+
+    def __iter__(self) -> Iterator[Scenario]:
+        for i in range(self._len):
+            yield self.scenario_at(i)
+
+    def sample(self, n: int, seed: int = 0) -> List[Scenario]:
+        """
+        n distinct scenarios chosen deterministically by `seed`, in grid order.
+        """
+        picked = sorted(random.Random(seed).sample(range(self._len), min(n, self._len)))
+        return [self.scenario_at(i) for i in picked]
+
+    def shard(self, index: int, count: int) -> Iterator[Scenario]:
+        """
+        Scenarios whose id hashes into shard `index` of `count` (same stable
+        hash as the work-item sharding).
+        """
+        for scenario in self:
+            if in_shard((scenario.id,), index, count):
+                yield scenario
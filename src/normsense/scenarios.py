@@ -1,9 +1,13 @@
 from __future__ import annotations
 from enum import Enum
-from typing import Literal, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+import gc
+import hashlib
 import json
+import os
+import pickle
 
 
 class Domain(str, Enum):
@@ -25,8 +29,11 @@ StakesLevel = Literal["low", "moderate", "high"]
 
 class Scenario(BaseModel):
     """
-    One NormSense evaluation scenario (single-turn).
+    One NormSense evaluation scenario (single-turn). Immutable, so the
+    indexes of a ScenarioSet holding it cannot go stale.
     """
+    model_config = ConfigDict(frozen=True)
+
     id: str = Field(..., description="Unique scenario ID, e.g. 'SC001'")
     text: str = Field(..., description="Scenario prompt shown to the model.")
     domain: Domain
@@ -37,23 +44,283 @@ class Scenario(BaseModel):
     notes: Optional[str] = None
 
 
+FACETS = ("domain", "norm_type", "cultural_tag", "stakes_level")
+
+
+def _facet_value(value: Any) -> str:
+    return getattr(value, "value", value)
+
+
+class ScenarioView:
+    """
+    Read-only selection of scenarios from a ScenarioSet (positions into the
+    parent set, in set order). Returned by ScenarioSet.query.
+    """
+
+    def __init__(self, parent: "ScenarioSet", positions: Sequence[int]) -> None:
+        self._parent = parent
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[Scenario]:
+        scenarios = self._parent.scenarios
+        return (scenarios[i] for i in self._positions)
+
+    def __getitem__(self, i: int) -> Scenario:
+        return self._parent.scenarios[self._positions[i]]
+
+    def __repr__(self) -> str:
+        return f"ScenarioView({len(self)} of {len(self._parent.scenarios)} scenarios)"
+
+    @property
+    def ids(self) -> List[str]:
+        return [s.id for s in self]
+
+    def query(self, **facets: Any) -> "ScenarioView":
+        """
+        Narrow this view further; same arguments as ScenarioSet.query.
+        """
+        keep = set(self._parent._match(facets))
+        return ScenarioView(self._parent, [i for i in self._positions if i in keep])
+
+    def to_list(self) -> List[Scenario]:
+        return list(self)
+
+
 class ScenarioSet(BaseModel):
     """
     Container for the full NormSense scenario set.
+
+    Keeps an id index and per-facet indexes (domain, norm_type,
+    cultural_tag, stakes_level), built on first use. The set is immutable
+    (scenarios is a tuple of frozen Scenarios), so the indexes always match
+    it; build a new ScenarioSet to change the scenarios.
     """
+    model_config = ConfigDict(frozen=True)
+
     version: str = "v0.3"
-    scenarios: list[Scenario]
+    scenarios: Tuple[Scenario, ...]
+
+    _by_id: Optional[Dict[str, Scenario]] = PrivateAttr(default=None)
+    _facet_index: Optional[Dict[str, Dict[str, List[int]]]] = PrivateAttr(default=None)
+
+    def reindex(self) -> None:
+        by_id: Dict[str, Scenario] = {}
+        facet_index: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+        for i, scenario in enumerate(self.scenarios):
+            if scenario.id in by_id:
+                raise ValueError(f"Duplicate scenario id {scenario.id!r}")
+            by_id[scenario.id] = scenario
+            for facet in FACETS:
+                facet_index[facet].setdefault(_facet_value(getattr(scenario, facet)), []).append(i)
+        self._by_id = by_id
+        self._facet_index = facet_index
+
+    def _ensure_index(self) -> None:
+        if self._by_id is None:
+            self.reindex()
+
+    @property
+    def by_id(self) -> Dict[str, Scenario]:
+        """
+        Scenario id -> Scenario.
+        """
+        self._ensure_index()
+        return self._by_id
+
+    def get(self, scenario_id: str) -> Optional[Scenario]:
+        return self.by_id.get(scenario_id)
+
+    def facet_values(self, facet: str) -> List[str]:
+        """
+        Distinct values of a facet, e.g. facet_values("domain").
+        """
+        self._ensure_index()
+        if facet not in FACETS:
+            raise ValueError(f"Unknown facet {facet!r}. Expected one of {list(FACETS)}")
+        return sorted(self._facet_index[facet])
+
+    def _match(self, facets: Dict[str, Any]) -> List[int]:
+        self._ensure_index()
+        positions: Optional[set] = None
+        for facet, wanted in facets.items():
+            if wanted is None:
+                continue
+            if facet not in FACETS:
+                raise ValueError(f"Unknown facet {facet!r}. Expected one of {list(FACETS)}")
+            if isinstance(wanted, (str, Enum)):
+                wanted = [wanted]
+            index = self._facet_index[facet]
+            hits = {i for value in wanted for i in index.get(_facet_value(value), ())}
+            positions = hits if positions is None else positions & hits
+        if positions is None:
+            return list(range(len(self.scenarios)))
+        return sorted(positions)
+
+    def query(self, **facets: Any) -> ScenarioView:
+        """
+        Scenarios matching every given facet; each value may be a single
+        value or a list of accepted values, e.g.
+            scenario_set.query(domain="workplace", stakes_level=["moderate", "high"])
+        """
+        return ScenarioView(self, self._match(facets))
+
+    def __len__(self) -> int:
+        return len(self.scenarios)
+
+    def __eq__(self, other: Any) -> bool:
+        # The cached indexes are derived state and do not affect equality.
+        if not isinstance(other, ScenarioSet):
+            return NotImplemented
+        return self.version == other.version and self.scenarios == other.scenarios
+
+
+def _is_jsonl(path: Path) -> bool:
+    from .storage.files import base_name
+
+    return base_name(path).endswith(".jsonl")
 
 
-def load_scenarios(path: str | Path) -> ScenarioSet:
+def iter_scenarios(path: str | Path) -> Iterator[Scenario]:
+    """
+    Stream scenarios from a JSONL scenario file (.jsonl, .jsonl.gz or
+    .jsonl.zst), validating one line at a time. A {"version": ...} header
+    line is skipped.
+    """
+    from .storage.files import open_text
+
+    with open_text(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if line.startswith('{"version"'):
+                continue
+            yield Scenario.model_validate_json(line)
+
+
+def _jsonl_version(path: Path) -> Optional[str]:
+    from .storage.files import open_text
+
+    with open_text(path) as f:
+        first = f.readline()
+    if first.startswith('{"version"'):
+        return json.loads(first)["version"]
+    return None
+
+
+def write_scenarios_jsonl(
+    scenarios: Iterable[Scenario],
+    path: str | Path,
+    version: str = "v0.3",
+) -> int:
+    """
+    Stream scenarios to JSONL (compressed by suffix): a {"version": ...}
+    header line, then one scenario per line. Returns the number written.
+    """
+    from .storage.writer import RecordWriter
+
+    with RecordWriter(path) as writer:
+        writer.write_line(json.dumps({"version": version}))
+        for scenario in scenarios:
+            writer.write_line(scenario.model_dump_json())
+    return writer.num_written - 1
+
+
+CACHE_SUFFIX = ".cache.pkl"
+CACHE_DIR_ENV = "NORMSENSE_CACHE_DIR"
+_CACHE_FORMAT = 2
+
+
+def scenario_cache_dir() -> Path:
+    """
+    Per-user directory for scenario caches: $NORMSENSE_CACHE_DIR/scenarios,
+    default ~/.cache/normsense/scenarios.
+    """
+    base = os.getenv(CACHE_DIR_ENV) or Path.home() / ".cache" / "normsense"
+    return Path(base) / "scenarios"
+
+
+def _cache_path(path: Path) -> Path:
+    # Keyed by the absolute source path, so same-named files in different
+    # directories get separate caches.
+    key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return scenario_cache_dir() / f"{path.name}-{key}{CACHE_SUFFIX}"
+
+
+def _source_stamp(path: Path) -> tuple:
+    stat = path.stat()
+    return (_CACHE_FORMAT, stat.st_size, stat.st_mtime_ns)
+
+
+def _read_cache(path: Path) -> Optional[ScenarioSet]:
+    cache = _cache_path(path)
+    if not cache.exists():
+        return None
+    try:
+        with cache.open("rb") as f:
+            stamp, scenario_set = pickle.load(f)
+    except Exception:
+        return None
+    if stamp != _source_stamp(path):
+        return None
+    return scenario_set
+
+
+def _write_cache(path: Path, scenario_set: ScenarioSet) -> None:
+    cache = _cache_path(path)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    scenario_set.reindex()
+    with tmp.open("wb") as f:
+        pickle.dump((_source_stamp(path), scenario_set), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache)
+
+
+def load_scenarios(path: str | Path, cache: bool = False) -> ScenarioSet:
+    """
+    Load and validate a scenario set from JSON, or from JSONL written by
+    write_scenarios_jsonl.
+
+    With cache=True the validated set (including its indexes) is pickled
+    to the per-user scenario_cache_dir() and reused, without validation,
+    while the source file is unchanged. The cache is never written next to
+    the dataset.
+    """
     path = Path(path)
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    return ScenarioSet(**data)
+    # Loading creates one object graph per scenario and no cycles; keep the
+    # cyclic GC from rescanning them over and over.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        scenario_set = _read_cache(path) if cache else None
+        if scenario_set is not None:
+            return scenario_set
+        if _is_jsonl(path):
+            scenario_set = ScenarioSet.model_construct(
+                version=_jsonl_version(path) or "v0.3",
+                scenarios=tuple(iter_scenarios(path)),
+            )
+        else:
+            scenario_set = ScenarioSet.model_validate_json(path.read_bytes())
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if cache:
+        try:
+            _write_cache(path, scenario_set)
+        except OSError as e:
+            print(f"[WARN] Could not write scenario cache for {path}: {e}")
+    return scenario_set
 
 
 def save_scenarios(scenario_set: ScenarioSet, path: str | Path) -> None:
     path = Path(path)
+    if _is_jsonl(path):
+        write_scenarios_jsonl(scenario_set.scenarios, path, version=scenario_set.version)
+        return
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", encoding="utf-8") as f:
         json.dump(scenario_set.model_dump(), f, ensure_ascii=False, indent=2)
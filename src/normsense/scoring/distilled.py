@@ -0,0 +1,384 @@
+from __future__ import annotations
+import json
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Distilled judge: a linear model on hashed lexical features, trained on the
+# scores the LLM judge (JudgeModel) already produced, to score responses on
+# CPU in milliseconds instead of one LLM call each.
+#
+# Features of a (scenario, response) pair: lowercased word unigrams and
+# bigrams of the response and unigrams of the scenario text, each hashed into
+# its own block of n_features columns (scikit-learn HashingVectorizer),
+# log(1 + count) weighted and L2-normalized per row, plus the log response
+# length. Scenario texts repeat across models and variants and are hashed
+# once each.
+#
+# The model is multi-output ridge regression over the score dimensions with
+# an intercept (sklearn Ridge, sparse conjugate-gradient solver); alpha is
+# picked on held-out scenarios.
+
+SCORE_DIMENSIONS = ["politeness", "empathy", "contextual_fit", "overall"]
+SCORE_RANGE = (0.0, 5.0)
+DEFAULT_N_FEATURES = 1 << 18
+DEFAULT_ALPHAS = (0.3, 1.0, 3.0, 10.0)
+FORMAT_VERSION = 2
+RATIONALE = ""
+
+_TOKEN_PATTERN = r"[a-z0-9']+"
+_NUM_DENSE = 1  # log response length
+
+AGREEMENT_COLUMNS = [
+    "dimension",
+    "n",
+    "mae",
+    "rmse",
+    "pearson",
+    "spearman",
+    "exact",
+    "within_1",
+    "qwk",
+    "baseline_mae",
+]
+
+
+def _sklearn():
+    """
+    Import the scikit-learn pieces on first use (only the distilled judge needs them).
+    """
+    try:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import Ridge
+        from sklearn.preprocessing import normalize
+    except ImportError:
+        raise RuntimeError(
+            "scikit-learn is required for the distilled judge. Install it with `pip install scikit-learn`."
+        ) from None
+    return HashingVectorizer, Ridge, normalize
+
+
+# --- features ------------------------------------------------------------------
+
+
+def num_columns(n_features: int) -> int:
+    """
+    Width of the feature matrix: response and scenario hash blocks plus dense features.
+    """
+    return 2 * n_features + _NUM_DENSE
+
+
+def featurize(
+    scenario_texts: Sequence[str],
+    response_texts: Sequence[str],
+    n_features: int = DEFAULT_N_FEATURES,
+):
+    """
+    Hashed feature matrix (scipy CSR, rows x num_columns(n_features)) of
+    (scenario, response) pairs; see the module comment.
+    """
+    import scipy.sparse as sp
+
+    HashingVectorizer, _, normalize = _sklearn()
+    params = dict(
+        n_features=n_features,
+        token_pattern=_TOKEN_PATTERN,
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float64,
+    )
+    responses = pd.Series(list(response_texts), dtype=object).fillna("")
+    resp = HashingVectorizer(ngram_range=(1, 2), **params).transform(responses)
+
+    # Scenario texts repeat across models and variants: featurize each once.
+    scen_codes, scen_unique = pd.factorize(pd.Series(list(scenario_texts), dtype=object).fillna(""))
+    scen = HashingVectorizer(ngram_range=(1, 1), **params).transform(list(scen_unique))[scen_codes]
+
+    x = sp.hstack([resp, scen], format="csr")
+    x.data = np.log1p(x.data)
+    x = normalize(x)
+
+    num_tokens = responses.str.lower().str.count(_TOKEN_PATTERN).to_numpy(dtype=np.float64)
+    length = sp.csr_matrix(np.log1p(num_tokens)[:, None] / 5.0)
+    return sp.hstack([x, length], format="csr")
+
+
+# --- fitting -------------------------------------------------------------------
+
+
+def _fit(x, y: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ridge fit of y (rows x dimensions, NaN for missing) on x; returns
+    (weights (columns x dimensions), intercept) with predictions x @ W + b.
+    """
+    Ridge = _sklearn()[1]
+    ok = ~np.isnan(y)
+    if ok.all():
+        model = Ridge(alpha=alpha, solver="sparse_cg").fit(x, y)
+        return model.coef_.T, model.intercept_
+    # A judge occasionally omits a dimension: fit each one on the rows that have it.
+    weights = np.zeros((x.shape[1], y.shape[1]))
+    intercept = np.zeros(y.shape[1])
+    for j in range(y.shape[1]):
+        if ok[:, j].any():
+            model = Ridge(alpha=alpha, solver="sparse_cg").fit(x[ok[:, j]], y[ok[:, j], j])
+            weights[:, j], intercept[j] = model.coef_, model.intercept_
+    return weights, intercept
+
+
+def _scenario_fold(scenario_ids: Sequence[Any], salt: str) -> np.ndarray:
+    """
+    Deterministic value in [0, 1) per scenario id, for scenario-disjoint splits.
+    """
+    codes, unique = pd.factorize(pd.Series(list(scenario_ids), dtype=object).astype(str))
+    per_id = np.array([zlib.crc32(f"{salt}:{sid}".encode("utf-8")) / 2**32 for sid in unique])
+    return per_id[codes]
+
+
+def agreement_report(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    baseline: Optional[np.ndarray] = None,
+    dimensions: Sequence[str] = SCORE_DIMENSIONS,
+) -> pd.DataFrame:
+    """
+    Agreement of predicted with judge scores per dimension: MAE, RMSE,
+    Pearson and Spearman correlation, exact and within-one agreement of the
+    rounded scores, quadratic weighted kappa, and the MAE of always
+    predicting `baseline` (e.g. the training means).
+    """
+    rows = []
+    lo, hi = SCORE_RANGE
+    for j, dim in enumerate(dimensions):
+        t, p = y_true[:, j], y_pred[:, j]
+        ok = ~np.isnan(t)
+        t, p = t[ok], p[ok]
+        row: Dict[str, Any] = {"dimension": dim, "n": int(ok.sum())}
+        if len(t) == 0:
+            rows.append(row)
+            continue
+        err = p - t
+        t_int = np.clip(np.rint(t), lo, hi).astype(int)
+        p_int = np.clip(np.rint(p), lo, hi).astype(int)
+        row.update(
+            mae=float(np.abs(err).mean()),
+            rmse=float(np.sqrt((err * err).mean())),
+            pearson=float(pd.Series(t).corr(pd.Series(p))) if len(t) > 1 else np.nan,
+            spearman=float(pd.Series(t).corr(pd.Series(p), method="spearman")) if len(t) > 1 else np.nan,
+            exact=float((t_int == p_int).mean()),
+            within_1=float((np.abs(t_int - p_int) <= 1).mean()),
+            qwk=_quadratic_kappa(t_int, p_int, int(lo), int(hi)),
+            baseline_mae=float(np.abs(t - baseline[j]).mean()) if baseline is not None else np.nan,
+        )
+        rows.append(row)
+    return pd.DataFrame(rows, columns=AGREEMENT_COLUMNS)
+
+
+def _quadratic_kappa(a: np.ndarray, b: np.ndarray, lo: int, hi: int) -> float:
+    k = hi - lo + 1
+    observed = np.bincount((a - lo) * k + (b - lo), minlength=k * k).reshape(k, k).astype(np.float64)
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / max(observed.sum(), 1.0)
+    levels = np.arange(k)
+    weights = (levels[:, None] - levels[None, :]) ** 2 / max((k - 1) ** 2, 1)
+    denom = (weights * expected).sum()
+    return float(1.0 - (weights * observed).sum() / denom) if denom > 0 else np.nan
+
+
+# --- model ---------------------------------------------------------------------
+
+
+class DistilledJudge:
+    """
+    Fast CPU stand-in for JudgeModel. score() has the same signature and
+    output shape as JudgeModel.score(); score_many() scores a batch.
+
+        judge = DistilledJudge.load("data/processed/distilled_judge.npz")
+        scores = judge.score(scenario_text, response_text)
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        intercept: np.ndarray,
+        n_features: int = DEFAULT_N_FEATURES,
+        dimensions: Sequence[str] = SCORE_DIMENSIONS,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.weights = weights
+        self.intercept = intercept
+        self.n_features = n_features
+        self.dimensions = list(dimensions)
+        self.info = dict(info or {})
+
+    def predict(self, scenario_texts: Sequence[str], response_texts: Sequence[str]) -> np.ndarray:
+        """
+        Unclipped predictions, (rows x dimensions).
+        """
+        x = featurize(scenario_texts, response_texts, self.n_features)
+        return x @ self.weights + self.intercept
+
+    def score_many(self, scenario_texts: Sequence[str], response_texts: Sequence[str]) -> np.ndarray:
+        """
+        Predicted scores clipped to the rubric range, (rows x dimensions).
+        """
+        return np.clip(self.predict(scenario_texts, response_texts), *SCORE_RANGE)
+
+    def score(self, scenario_text: str, response_text: str) -> Dict:
+        values = self.score_many([scenario_text], [response_text])[0]
+        return self.as_scores(values)
+
+    def as_scores(self, values: Iterable[float]) -> Dict:
+        """
+        A Phase 3 "scores" dict for one row of score_many() output.
+        """
+        out: Dict[str, Any] = {dim: round(float(v), 2) for dim, v in zip(self.dimensions, values)}
+        out["rationale"] = RATIONALE
+        out["judge"] = "distilled"
+        return out
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "version": FORMAT_VERSION,
+            "n_features": self.n_features,
+            "dimensions": self.dimensions,
+            "info": self.info,
+        }
+        # Only the non-zero rows of the (mostly empty) weight matrix.
+        used = np.flatnonzero(np.any(self.weights != 0, axis=1))
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            rows=used,
+            weights=self.weights[used].astype(np.float32),
+            intercept=self.intercept,
+            meta=np.array(json.dumps(meta)),
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "DistilledJudge":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported distilled judge format {meta.get('version')} in {path}")
+            n_features = meta["n_features"]
+            weights = np.zeros((num_columns(n_features), len(meta["dimensions"])))
+            weights[data["rows"]] = data["weights"]
+            intercept = data["intercept"]
+        return cls(weights, intercept, n_features, meta["dimensions"], meta.get("info"))
+
+
+@dataclass
+class DistillResult:
+    judge: DistilledJudge
+    # Held-out (scenario-disjoint) agreement of a model fit without the test scenarios.
+    agreement: pd.DataFrame
+    alpha: float
+    num_train: int
+    num_test: int
+
+
+def train_distilled_judge(
+    scenario_ids: Sequence[Any],
+    scenario_texts: Sequence[str],
+    response_texts: Sequence[str],
+    scores: np.ndarray,
+    n_features: int = DEFAULT_N_FEATURES,
+    alphas: Sequence[float] = DEFAULT_ALPHAS,
+    test_fraction: float = 0.2,
+    refit_all: bool = True,
+) -> DistillResult:
+    """
+    Fit a DistilledJudge to judge `scores` (rows x SCORE_DIMENSIONS, NaN for
+    missing). Scenarios are split into train and test sets; alpha is picked
+    on a scenario-disjoint validation part of train, and the agreement is
+    measured on test. With refit_all the returned judge is refit on all rows.
+    """
+    t0 = time.perf_counter()
+    scores = np.asarray(scores, dtype=np.float64)
+    x = featurize(scenario_texts, response_texts, n_features)
+    fold = _scenario_fold(scenario_ids, "distill")
+    test = fold < test_fraction
+    valid = (fold >= test_fraction) & (fold < test_fraction + (1 - test_fraction) * 0.15)
+    train = ~test & ~valid
+    if not train.any() or not valid.any():
+        # Too few scenarios to hold some out for alpha selection.
+        train, valid = ~test, ~test
+
+    best_alpha, best_mae = alphas[0], np.inf
+    if len(alphas) > 1:
+        x_train, x_valid = x[train], x[valid]
+        for alpha in alphas:
+            w, b = _fit(x_train, scores[train], alpha)
+            err = np.abs(np.clip(x_valid @ w + b, *SCORE_RANGE) - scores[valid])
+            mae = float(np.nanmean(err))
+            if mae < best_mae:
+                best_alpha, best_mae = alpha, mae
+
+    fit_rows = ~test if test.any() else np.ones(len(scores), dtype=bool)
+    w, b = _fit(x[fit_rows], scores[fit_rows], best_alpha)
+    if test.any():
+        predicted = np.clip(x[test] @ w + b, *SCORE_RANGE)
+        baseline = np.nanmean(scores[~test], axis=0)
+        agreement = agreement_report(scores[test], predicted, baseline=baseline)
+    else:
+        print("[WARN] No held-out scenarios; agreement not measured.")
+        agreement = pd.DataFrame(columns=AGREEMENT_COLUMNS)
+    if refit_all and test.any():
+        w, b = _fit(x, scores, best_alpha)
+
+    info = {
+        "alpha": best_alpha,
+        "num_rows": int(len(scores)),
+        "num_test": int(test.sum()),
+        "agreement": agreement.to_dict(orient="records"),
+        "trained_at": time.time(),
+        "train_seconds": round(time.perf_counter() - t0, 2),
+    }
+    judge = DistilledJudge(w, b, n_features, SCORE_DIMENSIONS, info)
+    return DistillResult(judge, agreement, best_alpha, int((~test).sum()), int(test.sum()))
+
+
+def load_training_pairs(
+    scores_path: str | Path,
+    responses_path: str | Path,
+    scenario_text_by_id: Mapping[str, str],
+) -> pd.DataFrame:
+    """
+    Join Phase 3 scores with the Phase 2 response texts on (scenario_id,
+    prompt_variant, model_name). Returns scenario_id, scenario_text,
+    response_text and the score dimensions; judge errors and scores from a
+    distilled judge (which would train the model on its own output) are dropped.
+    """
+    from normsense.analysis.loading import load_scores_frame
+    from normsense.storage.records import iter_records
+
+    scores = load_scores_frame(scores_path, include_errors=False)
+    distilled = scores["judge"] == "distilled"
+    if distilled.any():
+        print(f"[WARN] Ignoring {int(distilled.sum())} distilled-judge scores in {scores_path}")
+        scores = scores[~distilled]
+    key_cols = ["scenario_id", "prompt_variant", "model_name"]
+    scores = scores.astype({c: str for c in key_cols}).drop_duplicates(key_cols, keep="last")
+    wanted = set(zip(*(scores[c] for c in key_cols)))
+
+    texts: Dict[Tuple[str, str, str], str] = {}
+    for record in iter_records(responses_path):
+        if "error" in record:
+            continue
+        key = (str(record["scenario_id"]), str(record["prompt_variant"]), str(record["model_name"]))
+        if key in wanted:
+            texts[key] = record.get("response_text") or ""
+    response_text = [texts.get(key) for key in zip(*(scores[c] for c in key_cols))]
+    out = scores[key_cols + SCORE_DIMENSIONS].assign(response_text=response_text)
+    out = out[out["response_text"].notna()].reset_index(drop=True)
+    out["scenario_text"] = [scenario_text_by_id.get(sid, "") for sid in out["scenario_id"]]
+    return out
+
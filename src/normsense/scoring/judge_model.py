@@ -1,17 +1,41 @@
 from __future__ import annotations
-from typing import Dict
+from typing import Any, Dict
 
-from normsense.models.huggingface_local import HFLocalCausalLM
+from normsense.models.base import LLMModel
+from normsense.models.registry import create_model
 from .judge_prompt import build_judge_prompt, extract_json
 
 
 class JudgeModel:
     """
-    Wraps a local HF model for evaluation.
+    Wraps any LLMModel for evaluation.
+    By default the judge is a local HF model (model_id); if worker_address is
+    given, it attaches to a preloaded HF worker instead. Pass `model` to use an
+    already-built wrapper, or `backend` (plus its constructor params) to build
+    one from the model registry, e.g. JudgeModel(backend="openai", model_name="gpt-4o").
     """
 
-    def __init__(self, model_id: str):
-        self.model = HFLocalCausalLM(model_id=model_id)
+    def __init__(
+        self,
+        model_id: str | None = None,
+        worker_address: str | None = None,
+        *,
+        model: LLMModel | None = None,
+        backend: str | None = None,
+        name: str | None = None,
+        **params: Any,
+    ):
+        if model is not None:
+            self.model = model
+        elif backend is not None:
+            self.model = create_model(backend, **params)
+        elif model_id is None:
+            raise ValueError("JudgeModel needs a model_id, a backend or a model")
+        elif worker_address:
+            self.model = create_model("hf_worker", model_id=model_id, address=worker_address)
+        else:
+            self.model = create_model("hf_local", model_id=model_id)
+        self.name = name or model_id or params.get("model_name") or backend or type(self.model).__name__
 
     def score(self, scenario_text: str, response_text: str) -> Dict:
         prompt = build_judge_prompt(scenario_text, response_text)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from normsense.models.registry import ModelRegistry
+from normsense.scenarios import Scenario
+from .judge_model import JudgeModel
+from .rubric import ScoreRubric
+from .runner import scenario_facets
+
+# Concurrent judging with one or more judges.
+#
+# The model wrappers are synchronous (SDK clients / requests), so each judge
+# call runs on a thread pool while an asyncio loop schedules them: every judge
+# gets its own asyncio.Semaphore (max_concurrency from the registry config) and,
+# for API backends, a RateLimiter that spaces request starts to stay under the
+# provider's requests-per-minute limit. Failed calls (rate-limit errors,
+# timeouts, unparseable judge output) are retried with exponential backoff.
+#
+# With several judges each response is sent to all of them at once. The
+# output record keeps every judge's scores under "panel", the mean per
+# dimension under "scores" (so downstream analysis is unchanged), and the
+# interval Krippendorff's alpha of the panel on that record under "panel_alpha".
+
+PANEL_DIMENSIONS = list(ScoreRubric.categories)
+
+
+def krippendorff_alpha(ratings: np.ndarray) -> np.ndarray:
+    """
+    Interval-metric Krippendorff's alpha over the last two axes of `ratings`
+    (units x raters, NaN = missing). Leading axes are batched, so a
+    (records, dimensions, judges) array gives one alpha per record.
+    Alpha is 1.0 when all pairable values agree and NaN with fewer than two.
+    """
+    x = np.asarray(ratings, dtype=np.float64)
+    ok = ~np.isnan(x)
+    m = ok.sum(axis=-1)
+    # Units with a single value carry no pairs and drop out entirely.
+    pairable = m >= 2
+    v = np.where(ok & pairable[..., None], x, 0.0)
+    m = np.where(pairable, m, 0)
+    s1 = v.sum(axis=-1)
+    s2 = (v * v).sum(axis=-1)
+
+    # Sum of (v_i - v_j)^2 over ordered pairs of n values is 2 (n s2 - s1^2).
+    within = 2.0 * (m * s2 - s1 * s1) / np.maximum(m - 1, 1)
+    n = m.sum(axis=-1)
+    t1 = s1.sum(axis=-1)
+    t2 = s2.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed = within.sum(axis=-1) / n
+        expected = 2.0 * (n * t2 - t1 * t1) / (n * (n - 1.0))
+        alpha = 1.0 - observed / expected
+    alpha = np.where(expected <= 1e-12, np.where(observed <= 1e-12, 1.0, np.nan), alpha)
+    return np.where(n >= 2, alpha, np.nan)
+
+
+def panel_agreement(ratings: np.ndarray, names: List[str]) -> List[Dict[str, Any]]:
+    """
+    Agreement of a panel over many records: per dimension, Krippendorff's
+    alpha with records as units and judges as raters, and the mean absolute
+    difference between each pair of judges. `ratings` is records x dimensions x judges.
+    """
+    rows = []
+    for d, dim in enumerate(PANEL_DIMENSIONS):
+        r = ratings[:, d, :]
+        row: Dict[str, Any] = {
+            "dimension": dim,
+            "n": int((np.sum(~np.isnan(r), axis=1) >= 2).sum()),
+            "alpha": float(krippendorff_alpha(r)),
+        }
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                diff = np.abs(r[:, i] - r[:, j])
+                seen = ~np.isnan(diff)
+                row[f"mad:{names[i]}|{names[j]}"] = float(diff[seen].mean()) if seen.any() else np.nan
+        rows.append(row)
+    return rows
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class RateLimiter:
+    """
+    Spaces request starts at least 60 / requests_per_minute seconds apart.
+    State is plain timestamps, so one limiter can be shared across event loops.
+    """
+
+    def __init__(self, requests_per_minute: float) -> None:
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.interval = 60.0 / requests_per_minute
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        # No await between reading and moving the slot, so this is race-free
+        # within the (single-threaded) event loop.
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+@dataclass
+class PanelJudge:
+    """
+    One judge of a panel with its concurrency and rate limit.
+    """
+    judge: JudgeModel
+    max_concurrency: int = 1
+    requests_per_minute: Optional[float] = None
+
+
+class JudgePanel:
+    """
+    Scores response records with one or more judges, concurrently.
+    A single-judge panel produces exactly the records `score_record` does.
+    """
+
+    def __init__(self, judges: Iterable[PanelJudge], max_retries: int = 3, retry_delay: float = 2.0) -> None:
+        self.judges = list(judges)
+        if not self.judges:
+            raise ValueError("A judge panel needs at least one judge")
+        self.names = [j.judge.name for j in self.judges]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Duplicate judge names in panel: {self.names}")
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._limiters = [
+            RateLimiter(j.requests_per_minute) if j.requests_per_minute else None for j in self.judges
+        ]
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_registry(cls, registry: ModelRegistry, **kwargs: Any) -> "JudgePanel":
+        """
+        Build a panel from every model in a registry config, using each entry's
+        max_concurrency and requests_per_minute. Optional models that fail to
+        build are left out.
+        """
+        judges = []
+        for name in registry.names:
+            model = registry.get(name)
+            if model is None:
+                continue
+            spec = registry.specs[name]
+            judges.append(
+                PanelJudge(
+                    JudgeModel(model=model, name=name),
+                    max_concurrency=spec.max_concurrency,
+                    requests_per_minute=spec.requests_per_minute,
+                )
+            )
+        return cls(judges, **kwargs)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def score_records(
+        self,
+        records: List[Dict[str, Any]],
+        scenario_by_id: Mapping[str, Scenario],
+        write: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """
+        Judge a batch of Phase 2 response records with every judge.
+        Returns the judges' scores (records x dimensions x judges, NaN where a
+        judge failed) and the Phase 3 output records, in input order.
+        With `write`, each output record is also passed to it as soon as all
+        judges have scored it (completion order), so an interrupted run only
+        loses the judge calls in flight.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=sum(max(1, j.max_concurrency) for j in self.judges),
+                thread_name_prefix="judge",
+            )
+        ratings = np.full((len(records), len(PANEL_DIMENSIONS), len(self.judges)), np.nan)
+        out: List[Dict[str, Any]] = [{} for _ in records]
+
+        def done(i: int, per_judge: List[Dict]) -> None:
+            ratings[i] = [[_to_float(score.get(dim)) for score in per_judge] for dim in PANEL_DIMENSIONS]
+            out[i] = self._output_record(records[i], scenario_by_id, per_judge, ratings[i])
+            if write is not None:
+                write(out[i])
+
+        self._run(self._score_all(records, scenario_by_id, done))
+        return ratings, out
+
+    def _run(self, coro) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(coro)
+            return
+        # Called from inside an event loop (e.g. a notebook cell): asyncio.run
+        # refuses to nest, so drive our loop from a worker thread instead.
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="judge-loop") as pool:
+            pool.submit(asyncio.run, coro).result()
+
+    def _output_record(
+        self,
+        record: Dict[str, Any],
+        scenario_by_id: Mapping[str, Scenario],
+        per_judge: List[Dict],
+        values: np.ndarray,
+    ) -> Dict[str, Any]:
+        scenario = scenario_by_id.get(record["scenario_id"])
+        out_record = {
+            "scenario_id": record["scenario_id"],
+            **scenario_facets(record, scenario),
+            "model_name": record["model_name"],
+            "prompt_variant": record["prompt_variant"],
+        }
+        if len(self.judges) == 1:
+            out_record["scores"] = per_judge[0]
+        else:
+            alpha = krippendorff_alpha(values)
+            out_record["scores"] = self._combine(per_judge, values)
+            out_record["panel"] = dict(zip(self.names, per_judge))
+            out_record["panel_alpha"] = None if np.isnan(alpha) else round(float(alpha), 4)
+        out_record["timestamp"] = time.time()
+        return out_record
+
+    def _combine(self, per_judge: List[Dict], values: np.ndarray) -> Dict[str, Any]:
+        """
+        Panel scores for one record: the mean over judges per dimension.
+        """
+        valid = [k for k, score in enumerate(per_judge) if "error" not in score]
+        if not valid:
+            return {"error": "; ".join(f"{n}: {s['error']}" for n, s in zip(self.names, per_judge))}
+        combined: Dict[str, Any] = {}
+        for d, dim in enumerate(PANEL_DIMENSIONS):
+            row = values[d, valid]
+            row = row[~np.isnan(row)]
+            combined[dim] = round(float(row.mean()), 3) if len(row) else None
+        combined["rationale"] = per_judge[valid[0]].get("rationale", "")
+        combined["num_judges"] = len(valid)
+        return combined
+
+    async def _score_all(
+        self,
+        records: List[Dict[str, Any]],
+        scenario_by_id: Mapping[str, Scenario],
+        done: Callable[[int, List[Dict]], None],
+    ) -> None:
+        # Semaphores are bound to the running loop, so they are made per batch.
+        semaphores = [asyncio.Semaphore(max(1, j.max_concurrency)) for j in self.judges]
+
+        async def score(i: int) -> None:
+            record = records[i]
+            scenario = scenario_by_id.get(record["scenario_id"])
+            scenario_text = scenario.text if scenario is not None else record.get("user_prompt", "")
+            per_judge = await asyncio.gather(*(
+                self._score_one(k, semaphores[k], scenario_text, record["response_text"])
+                for k in range(len(self.judges))
+            ))
+            done(i, list(per_judge))
+
+        await asyncio.gather(*(score(i) for i in range(len(records))))
+
+    async def _score_one(
+        self, k: int, semaphore: asyncio.Semaphore, scenario_text: str, response_text: str
+    ) -> Dict:
+        loop = asyncio.get_running_loop()
+        judge = self.judges[k].judge
+        limiter = self._limiters[k]
+        error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.wait()
+                try:
+                    return await loop.run_in_executor(
+                        self._executor, judge.score, scenario_text, response_text
+                    )
+                except Exception as e:
+                    error = e
+            if attempt < self.max_retries:
+                # Backoff outside the semaphore so other calls keep the slot busy.
+                await asyncio.sleep(self.retry_delay * 2 ** attempt * (0.5 + random.random()))
+        return {"error": str(error)}
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from normsense.scenarios import FACETS, Scenario
+
+
+def score_record(
+    judge,
+    record: Dict[str, Any],
+    scenario_by_id: Mapping[str, Scenario],
+) -> Dict[str, Any]:
+    """
+    Judge one Phase 2 response record and build the Phase 3 output record.
+    Judge failures are recorded as {"scores": {"error": ...}}.
+    """
+    scenario_id = record["scenario_id"]
+    model_response = record["response_text"]
+
+    scenario = scenario_by_id.get(scenario_id)
+    if scenario is None:
+        # Should not happen, but be safe
+        scenario_text = record.get("user_prompt", "")
+    else:
+        scenario_text = scenario.text
+
+    try:
+        score = judge.score(scenario_text, model_response)
+    except Exception as e:
+        score = {"error": str(e)}
+
+    return {
+        "scenario_id": scenario_id,
+        **scenario_facets(record, scenario),
+        "model_name": record["model_name"],
+        "prompt_variant": record["prompt_variant"],
+        "scores": score,
+        "timestamp": time.time(),
+    }
+
+
+def distilled_score_records(
+    judge,
+    records: List[Dict[str, Any]],
+    scenario_by_id: Mapping[str, Scenario],
+) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Score a batch of Phase 2 response records with a DistilledJudge in one
+    call. Returns the predicted scores (records x dimensions) and the
+    Phase 3 output records.
+    """
+    scenarios = [scenario_by_id.get(record["scenario_id"]) for record in records]
+    scenario_texts = [
+        scenario.text if scenario is not None else record.get("user_prompt", "")
+        for record, scenario in zip(records, scenarios)
+    ]
+    values = judge.score_many(scenario_texts, [record.get("response_text") or "" for record in records])
+    now = time.time()
+    out = [
+        {
+            "scenario_id": record["scenario_id"],
+            **scenario_facets(record, scenario),
+            "model_name": record["model_name"],
+            "prompt_variant": record["prompt_variant"],
+            "scores": judge.as_scores(row),
+            "timestamp": now,
+        }
+        for record, scenario, row in zip(records, scenarios, values)
+    ]
+    return values, out
+
+
+def scenario_facets(record: Dict[str, Any], scenario: Optional[Scenario]) -> Dict[str, Any]:
+    """
+    scenario_<facet> fields for a Phase 3 record, so scores can be grouped
+    by domain / norm_type / cultural_tag / stakes_level without a join.
+    Taken from the scenario when known, else from the Phase 2 record.
+    """
+    if scenario is None:
+        keys = [f"scenario_{facet}" for facet in FACETS]
+        return {key: record[key] for key in keys if key in record}
+    return {
+        "scenario_domain": scenario.domain.value,
+        "scenario_norm_type": scenario.norm_type.value,
+        "scenario_cultural_tag": scenario.cultural_tag,
+        "scenario_stakes_level": scenario.stakes_level,
+    }
@@ -0,0 +1,143 @@
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .storage.files import iter_jsonl
+from .storage.index import IndexedJsonlWriter
+from .storage.records import detect_format
+
+WorkKey = Tuple[str, str, str]  # (scenario_id, prompt_variant, model_name)
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard spec "i/N" (0-based index i, N shards) into (i, N).
+    """
+    index, sep, count = spec.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"Invalid shard spec {spec!r}, expected 'i/N' (e.g. '0/4').")
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard spec {spec!r}: need 0 <= i < N.")
+    return index, count
+
+
+def work_key(record: Dict[str, Any]) -> WorkKey:
+    """
+    Key of a response / score record.
+    """
+    return (record["scenario_id"], record["prompt_variant"], record["model_name"])
+
+
+def shard_of(key: WorkKey, count: int) -> int:
+    """
+    Stable shard assignment: independent of process, platform and
+    PYTHONHASHSEED, so every node computes the same partition.
+    """
+    digest = hashlib.blake2b("\x1f".join(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def in_shard(key: WorkKey, index: int, count: int) -> bool:
+    return count == 1 or shard_of(key, count) == index
+
+
+def shard_path(path: str | Path, index: int, count: int) -> Path:
+    """
+    Per-shard output path, e.g. scores.jsonl -> scores.shard-01-of-04.jsonl
+    (scores.jsonl.zst -> scores.shard-01-of-04.jsonl.zst).
+    """
+    path = Path(path)
+    name = path.name
+    stem, dot, ext = name.partition(".jsonl")
+    if not dot:
+        stem, ext = path.stem, path.suffix
+        dot = ""
+    return path.with_name(f"{stem}.shard-{index:02d}-of-{count:02d}{dot}{ext}")
+
+
+def _prefer(new: Dict[str, Any], old: Dict[str, Any]) -> bool:
+    """
+    Pick between two records for the same key: successful over failed,
+    then the most recent.
+    """
+    new_ok = "error" not in new and "error" not in new.get("scores", {})
+    old_ok = "error" not in old and "error" not in old.get("scores", {})
+    if new_ok != old_ok:
+        return new_ok
+    return new.get("timestamp", 0) >= old.get("timestamp", 0)
+
+
+@dataclass
+class MergeReport:
+    num_records: int = 0
+    num_duplicates: int = 0
+    missing_shards: List[Path] = field(default_factory=list)
+    missing_keys: List[WorkKey] = field(default_factory=list)
+    unexpected_keys: List[WorkKey] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing_shards and not self.missing_keys
+
+
+def merge_shards(
+    out_path: str | Path,
+    count: int,
+    expected_keys: Optional[Iterable[WorkKey]] = None,
+) -> MergeReport:
+    """
+    Merge the per-shard files of `out_path` into `out_path`, deduplicating
+    by work key, and write its offset index (see storage.index) so lookups
+    by key work on the merged file. If `expected_keys` is given, report
+    keys no shard covered. Only JSONL outputs (optionally .gz / .zst) can
+    be merged.
+    """
+    out_path = Path(out_path)
+    fmt = detect_format(out_path)
+    if fmt != "jsonl":
+        raise ValueError(
+            f"Cannot merge {fmt} shards ({out_path}); run sharded jobs with JSONL output "
+            "and convert the merged file afterwards."
+        )
+    report = MergeReport()
+    merged: Dict[WorkKey, Dict[str, Any]] = {}
+
+    for index in range(count):
+        path = shard_path(out_path, index, count)
+        if not path.exists():
+            report.missing_shards.append(path)
+            continue
+        for record in iter_jsonl(path):
+            key = work_key(record)
+            old = merged.get(key)
+            if old is not None:
+                report.num_duplicates += 1
+                if not _prefer(record, old):
+                    continue
+            merged[key] = record
+
+    if expected_keys is not None:
+        expected: Set[WorkKey] = set(expected_keys)
+        report.missing_keys = sorted(expected - merged.keys())
+        report.unexpected_keys = sorted(merged.keys() - expected)
+
+    with IndexedJsonlWriter(out_path) as writer:
+        for key in sorted(merged):
+            writer.write(merged[key])
+    report.num_records = len(merged)
+    return report
+
+
+def keys_from_jsonl(path: str | Path, skip_errors: bool = True) -> Set[WorkKey]:
+    """
+    Work keys present in a JSONL file, e.g. the Phase 2 responses that
+    Phase 3 is expected to have scored.
+    """
+    return {
+        work_key(record)
+        for record in iter_jsonl(path)
+        if not (skip_errors and "error" in record)
+    }
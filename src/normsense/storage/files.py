@@ -0,0 +1,142 @@
+from __future__ import annotations
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, TextIO
+
+# Suffix -> codec for transparently compressed artifacts (e.g. scores.jsonl.zst).
+COMPRESSION_SUFFIXES: Dict[str, str] = {".gz": "gzip", ".zst": "zstd"}
+COMPRESSION_CHOICES = ["none", "gz", "zst"]
+
+DEFAULT_BUFFER_SIZE = 1 << 20  # 1 MiB blocks between Python and the codec / disk
+
+
+def compression_of(path: str | Path) -> Optional[str]:
+    return COMPRESSION_SUFFIXES.get(Path(path).suffix)
+
+
+def with_compression(path: str | Path, compression: str | None) -> Path:
+    """
+    Append the suffix for `compression` ("gz", "zst", or None / "none").
+    """
+    path = Path(path)
+    if not compression or compression == "none":
+        return path
+    return path.with_name(f"{path.name}.{compression}")
+
+
+def base_name(path: str | Path) -> str:
+    """
+    File name without its compression suffix: scores.jsonl.gz -> scores.jsonl
+    """
+    path = Path(path)
+    if path.suffix in COMPRESSION_SUFFIXES:
+        return path.stem
+    return path.name
+
+
+def find_artifact(path: str | Path) -> Path:
+    """
+    Return `path`, or its .gz / .zst sibling if only a compressed copy exists.
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+    for suffix in COMPRESSION_SUFFIXES:
+        candidate = path.with_name(path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return path
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstandard is required for .zst files. Install it with `pip install zstandard`."
+        ) from None
+    return zstandard
+
+
+def open_binary(
+    path: str | Path,
+    mode: str = "rb",
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    level: int | None = None,
+) -> BinaryIO:
+    """
+    Open a (possibly compressed) file as a buffered binary stream.
+    mode is "rb", "wb" or "ab"; compression follows the file suffix.
+    """
+    if mode not in ("rb", "wb", "ab"):
+        raise ValueError(f"Unsupported mode {mode!r}")
+    path = Path(path)
+    codec = compression_of(path)
+    reading = mode == "rb"
+
+    if codec == "gzip":
+        raw = gzip.GzipFile(path, mode, compresslevel=6 if level is None else level)
+        if reading:
+            # Already buffered; read1() then stops at decompression steps, so a
+            # truncated stream yields everything before the cut.
+            return raw
+    elif codec == "zstd":
+        zstd = _zstandard()
+        fh = open(path, mode)
+        if reading:
+            raw = zstd.ZstdDecompressor().stream_reader(fh, read_across_frames=True, closefd=True)
+        else:
+            # Appending starts a new frame; zstd readers decode concatenated frames.
+            raw = zstd.ZstdCompressor(level=3 if level is None else level).stream_writer(fh, closefd=True)
+    else:
+        return open(path, mode, buffering=buffer_size)
+
+    if reading:
+        return io.BufferedReader(raw, buffer_size=buffer_size)
+    return io.BufferedWriter(raw, buffer_size=buffer_size)
+
+
+def open_text(
+    path: str | Path,
+    mode: str = "r",
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    level: int | None = None,
+) -> TextIO:
+    """
+    Open a (possibly compressed) UTF-8 text file for streaming.
+    mode is "r", "w" or "a"; compression follows the file suffix.
+    """
+    if mode not in ("r", "w", "a"):
+        raise ValueError(f"Unsupported mode {mode!r}")
+    path = Path(path)
+    if mode != "r":
+        path.parent.mkdir(parents=True, exist_ok=True)
+    binary = open_binary(path, mode + "b", buffer_size=buffer_size, level=level)
+    return io.TextIOWrapper(binary, encoding="utf-8", newline="\n")
+
+
+def iter_jsonl(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a JSONL file (compressed by suffix).
+
+    A torn last line or truncated compressed stream, as left by a writer
+    that died mid-record, ends the stream with a warning; a malformed line
+    anywhere else is an error.
+    """
+    with open_text(path) as f:
+        try:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if line.endswith("\n"):
+                        raise ValueError(f"{path}:{line_no}: malformed JSON line") from None
+                    print(f"[WARN] Skipping torn last line {line_no} of {path}")
+                    return
+                yield record
+        except EOFError:
+            print(f"[WARN] {path} is truncated; stopping at the last complete record")
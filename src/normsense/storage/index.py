@@ -0,0 +1,371 @@
+from __future__ import annotations
+import json
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .files import _zstandard, compression_of
+from .writer import RecordWriter
+
+# Sidecar offset index for Phase 2 / Phase 3 JSONL files (plain, .gz or .zst).
+#
+# Each record is located by (block, pos, length):
+#   plain JSONL:      block = 0, pos = byte offset of the line in the file
+#   compressed JSONL: block = byte offset of the gzip member / zstd frame that
+#                     holds the line, pos = offset of the line inside the
+#                     decompressed block
+# IndexedJsonlWriter writes compressed output as independent blocks of at
+# most ~1000 records, so a lookup decompresses one small block. Block
+# boundaries are independent of the writer's durability flushes: a flush
+# only sync-flushes the open block (everything written so far becomes
+# decodable) and the block is closed at the record / byte threshold, so slow
+# producers do not end up with many tiny, separately compressed blocks.
+# A compressed file written as a single stream still indexes correctly, but
+# lookups have to decompress from the start of the file.
+
+WorkKey = Tuple[str, str, str]  # (scenario_id, prompt_variant, model_name)
+Location = Tuple[int, int, int]  # (block, pos, length)
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+_READ_BYTES = 1 << 20
+
+
+def index_path(path: str | Path) -> Path:
+    """
+    Sidecar path of a data file: responses.jsonl.zst -> responses.jsonl.zst.idx
+    """
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def record_key(record: Dict[str, Any]) -> Optional[WorkKey]:
+    try:
+        return (record["scenario_id"], record["prompt_variant"], record["model_name"])
+    except KeyError:
+        return None
+
+
+def _decompressor(codec: str):
+    if codec == "gzip":
+        return zlib.decompressobj(wbits=31)
+    return _zstandard().ZstdDecompressor().decompressobj()
+
+
+class _BlockCompressor:
+    """
+    Incremental compressor for one gzip member / zstd frame.
+    """
+
+    def __init__(self, codec: str, level: Optional[int]) -> None:
+        self.codec = codec
+        if codec == "gzip":
+            self._obj = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+        else:
+            self._obj = _zstandard().ZstdCompressor(level=3 if level is None else level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def sync(self) -> bytes:
+        """
+        Emit everything compressed so far without ending the block.
+        """
+        if self.codec == "gzip":
+            return self._obj.flush(zlib.Z_SYNC_FLUSH)
+        return self._obj.flush(_zstandard().COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class IndexedJsonlWriter(RecordWriter):
+    """
+    RecordWriter that also records the offset of every record and writes
+    the index next to the output when it is finalized.
+
+        with IndexedJsonlWriter(out_path) as writer:
+            writer.write(record)
+
+    Compressed output is written as one gzip member / zstd frame per
+    `block_records` records or `block_bytes` uncompressed bytes, whichever
+    comes first; flushes in between only sync-flush the open block. If a
+    run dies before close, rebuild the index of the recovered file with
+    build_index().
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        level: Optional[int] = None,
+        block_records: int = 1000,
+        block_bytes: int = 1 << 20,
+        **kwargs: Any,
+    ) -> None:
+        self.codec = compression_of(Path(path))
+        self.level = level
+        self.block_records = block_records
+        self.block_bytes = block_bytes
+        self._raw_offset = 0
+        self._locations: Dict[WorkKey, Location] = {}
+        # Open block: compressor, its offset in the file, decompressed size, records.
+        self._block: Optional[_BlockCompressor] = None
+        self._block_start = self._block_pos = self._block_count = 0
+        super().__init__(path, **kwargs)
+
+    def _open_stream(self):
+        # Raw file: blocks are compressed here so their offsets are known.
+        return open(self.tmp_path, "wb", buffering=_READ_BYTES)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.write_line(json.dumps(record, ensure_ascii=False), key=record_key(record))
+
+    def _write_block(self, entries: List[Tuple[bytes, Any]]) -> None:
+        if self.codec is None:
+            for data, key in entries:
+                if key is not None:
+                    self._locations[key] = (0, self._raw_offset, len(data))
+                self._raw_offset += len(data)
+            super()._write_block(entries)
+            return
+
+        out: List[bytes] = []
+        written = self._raw_offset
+        for data, key in entries:
+            if self._block is None:
+                self._block = _BlockCompressor(self.codec, self.level)
+                self._block_start, self._block_pos, self._block_count = written, 0, 0
+            if key is not None:
+                self._locations[key] = (self._block_start, self._block_pos, len(data))
+            self._block_pos += len(data)
+            self._block_count += 1
+            chunk = self._block.compress(data)
+            if self._block_count >= self.block_records or self._block_pos >= self.block_bytes:
+                chunk += self._block.finish()
+                self._block = None
+            out.append(chunk)
+            written += len(chunk)
+        if self._block is not None:
+            out.append(self._block.sync())
+        compressed = b"".join(out)
+        self._stream.write(compressed)
+        self._raw_offset += len(compressed)
+
+    def _finish_stream(self) -> None:
+        if self._block is not None:
+            tail = self._block.finish()
+            self._block = None
+            self._stream.write(tail)
+            self._raw_offset += len(tail)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        super().close()
+        OffsetIndex(self.path, self.codec, self._locations).save()
+
+
+def _split_lines(buf: bytes, base: int) -> Tuple[List[Tuple[int, bytes]], bytes, int]:
+    """
+    Split complete lines off `buf` (which starts at offset `base`).
+    Returns ([(offset, line)], incomplete tail, offset of the tail).
+    """
+    lines = []
+    start = 0
+    while True:
+        nl = buf.find(b"\n", start)
+        if nl < 0:
+            break
+        lines.append((base + start, buf[start:nl + 1]))
+        start = nl + 1
+    return lines, buf[start:], base + start
+
+
+def _scan_lines(path: Path, codec: Optional[str]) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield (block, pos, line) for every line of a JSONL file.
+    """
+    if codec is None:
+        offset = 0
+        with path.open("rb") as f:
+            for line in f:
+                yield 0, offset, line
+                offset += len(line)
+        return
+
+    with path.open("rb") as f:
+        block = raw_pos = 0
+        dec = _decompressor(codec)
+        tail, tail_pos = b"", 0
+        data = f.read(_READ_BYTES)
+        while data:
+            lines, tail, tail_pos = _split_lines(tail + dec.decompress(data), tail_pos)
+            for pos, line in lines:
+                yield block, pos, line
+            if dec.eof:
+                # Block (gzip member / zstd frame) finished; the next starts right after it.
+                if tail:
+                    yield block, tail_pos, tail
+                rest = dec.unused_data
+                raw_pos += len(data) - len(rest)
+                block, dec = raw_pos, _decompressor(codec)
+                tail, tail_pos = b"", 0
+                data = rest or f.read(_READ_BYTES)
+            else:
+                raw_pos += len(data)
+                data = f.read(_READ_BYTES)
+        if tail:
+            yield block, tail_pos, tail
+
+
+def _read_block_spans(f, codec: str, block: int, spans: List[Tuple[int, int]]) -> List[bytes]:
+    """
+    Decompress one block just far enough to cut out `spans` (sorted (pos, length)).
+    """
+    f.seek(block)
+    dec = _decompressor(codec)
+    buf, buf_start = b"", 0
+    out: List[bytes] = []
+    while len(out) < len(spans):
+        data = f.read(_READ_BYTES)
+        if not data:
+            break
+        buf += dec.decompress(data)
+        while len(out) < len(spans):
+            pos, length = spans[len(out)]
+            if pos + length > buf_start + len(buf):
+                break
+            out.append(buf[pos - buf_start: pos - buf_start + length])
+        # Drop decompressed bytes that no remaining span needs.
+        keep_from = spans[len(out)][0] if len(out) < len(spans) else buf_start + len(buf)
+        drop = min(max(keep_from - buf_start, 0), len(buf))
+        buf, buf_start = buf[drop:], buf_start + drop
+        if dec.eof:
+            break
+    if len(out) < len(spans):
+        raise RuntimeError(f"Offset index out of date for {f.name}; rebuild it with build_index().")
+    return out
+
+
+@dataclass
+class OffsetIndex:
+    """
+    (scenario_id, prompt_variant, model_name) -> location of the record in
+    `path`. When a key occurs more than once the last occurrence wins.
+    """
+
+    path: Path
+    codec: Optional[str]
+    locations: Dict[WorkKey, Location]
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __contains__(self, key: WorkKey) -> bool:
+        return tuple(key) in self.locations
+
+    def keys(self) -> Iterable[WorkKey]:
+        return self.locations.keys()
+
+    def save(self) -> Path:
+        out = index_path(self.path)
+        header = {
+            "version": INDEX_VERSION,
+            "compression": self.codec,
+            "source_size": self.path.stat().st_size,
+        }
+        tmp = out.with_name(out.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write("#" + json.dumps(header) + "\n")
+            for key, loc in self.locations.items():
+                f.write("\t".join(key) + "\t" + "\t".join(map(str, loc)) + "\n")
+        tmp.replace(out)
+        return out
+
+    def fetch(self, key: WorkKey) -> Optional[Dict[str, Any]]:
+        """
+        Read one record, or None if the key is not in the index.
+        """
+        return self.fetch_many([key]).get(tuple(key))
+
+    def fetch_many(self, keys: Iterable[WorkKey]) -> Dict[WorkKey, Dict[str, Any]]:
+        """
+        Read several records with one seek per record (plain JSONL) or one
+        partial decompression per block (compressed). Unknown keys are skipped.
+        """
+        by_block: Dict[int, List[Tuple[int, int, WorkKey]]] = {}
+        for key in keys:
+            key = tuple(key)
+            loc = self.locations.get(key)
+            if loc is not None:
+                block, pos, length = loc
+                by_block.setdefault(block, []).append((pos, length, key))
+
+        found: Dict[WorkKey, Dict[str, Any]] = {}
+        with self.path.open("rb") as f:
+            for block in sorted(by_block):
+                entries = sorted(by_block[block])
+                if self.codec is None:
+                    lines = []
+                    for pos, length, _ in entries:
+                        f.seek(pos)
+                        lines.append(f.read(length))
+                else:
+                    lines = _read_block_spans(f, self.codec, block, [(p, n) for p, n, _ in entries])
+                for (_, _, key), line in zip(entries, lines):
+                    found[key] = json.loads(line)
+        return found
+
+
+def build_index(path: str | Path) -> OffsetIndex:
+    """
+    Index an existing JSONL / .jsonl.gz / .jsonl.zst file with one streaming
+    pass and write the sidecar.
+    """
+    path = Path(path)
+    codec = compression_of(path)
+    locations: Dict[WorkKey, Location] = {}
+    for block, pos, line in _scan_lines(path, codec):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            if line.endswith(b"\n"):
+                raise
+            # Torn last line of a crashed writer
+            break
+        key = record_key(record)
+        if key is not None:
+            locations[key] = (block, pos, len(line))
+    index = OffsetIndex(path, codec, locations)
+    index.save()
+    return index
+
+
+def load_index(path: str | Path, build_missing: bool = False) -> OffsetIndex:
+    """
+    Load the sidecar index of `path` (the data file, not the .idx file).
+    A missing or stale index is rebuilt when build_missing=True and is an
+    error otherwise.
+    """
+    path = Path(path)
+    sidecar = index_path(path)
+    if not sidecar.exists():
+        if build_missing:
+            return build_index(path)
+        raise RuntimeError(f"No offset index for {path}. Build it with build_index() first.")
+
+    with sidecar.open("r", encoding="utf-8") as f:
+        header = json.loads(f.readline()[1:])
+        if header.get("source_size") != path.stat().st_size:
+            if build_missing:
+                return build_index(path)
+            raise RuntimeError(f"Offset index for {path} is out of date. Rebuild it with build_index().")
+        locations: Dict[WorkKey, Location] = {}
+        for line in f:
+            sid, variant, model, block, pos, length = line.rstrip("\n").split("\t")
+            locations[(sid, variant, model)] = (int(block), int(pos), int(length))
+    return OffsetIndex(path, header.get("compression"), locations)
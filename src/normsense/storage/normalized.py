@@ -0,0 +1,192 @@
+from __future__ import annotations
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Set
+
+import pandas as pd
+
+from .files import iter_jsonl
+from .writer import replace_dir, start_partial_dir
+
+
+# Long prompt strings are stored once in prompts.jsonl and referenced by id.
+PROMPT_FIELDS = ["system_prompt", "user_prompt"]
+
+# Per-scenario metadata repeated on every Phase 2 record; stored once per
+# scenario in scenarios.jsonl.
+SCENARIO_FIELDS = {
+    "scenario_domain": "domain",
+    "scenario_norm_type": "norm_type",
+    "scenario_cultural_tag": "cultural_tag",
+    "scenario_stakes_level": "stakes_level",
+    "scenario_prompt_source": "prompt_source",
+}
+
+PROMPTS_FILE = "prompts.jsonl"
+SCENARIOS_FILE = "scenarios.jsonl"
+ROWS_FILE = "records.jsonl"
+
+
+def content_id(text: str) -> str:
+    """
+    Stable id of a prompt string (first 16 hex chars of its SHA-256).
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _dump(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    if not path.exists():
+        return
+    yield from iter_jsonl(path)
+
+
+class NormalizedRecordWriter:
+    """
+    Write Phase 2 / Phase 3 records in normalized form to a directory:
+
+      prompts.jsonl    {"id", "text"}        one line per distinct prompt
+      scenarios.jsonl  {"scenario_id", ...}  one line per scenario
+      records.jsonl    narrow rows with system_prompt_id / user_prompt_id
+
+    With 3 system prompts and ~100 user prompts, each row shrinks to ids,
+    the response text and bookkeeping fields.
+
+    Like RecordWriter, the files are written to a hidden .partial-<name>
+    directory that is fsynced and moved into place on a clean close, so a
+    crash never replaces a previous output with a partial one.
+    overwrite=False starts from a copy of the existing output and appends.
+    """
+
+    def __init__(self, root: str | Path, overwrite: bool = True) -> None:
+        self.root = Path(root)
+        self.tmp_root = start_partial_dir(self.root, keep_existing=not overwrite)
+
+        self._prompt_ids: Set[str] = {p["id"] for p in _read_jsonl(self.tmp_root / PROMPTS_FILE)}
+        self._scenario_ids: Set[str] = {
+            s["scenario_id"] for s in _read_jsonl(self.tmp_root / SCENARIOS_FILE)
+        }
+        self._prompts = (self.tmp_root / PROMPTS_FILE).open("a", encoding="utf-8")
+        self._scenarios = (self.tmp_root / SCENARIOS_FILE).open("a", encoding="utf-8")
+        self._rows = (self.tmp_root / ROWS_FILE).open("a", encoding="utf-8")
+        self.num_written = 0
+        self._closed = False
+
+    def write(self, record: Dict[str, Any]) -> None:
+        row = dict(record)
+
+        for field in PROMPT_FIELDS:
+            text = row.pop(field, None)
+            if text is None:
+                continue
+            pid = content_id(text)
+            if pid not in self._prompt_ids:
+                self._prompt_ids.add(pid)
+                self._prompts.write(_dump({"id": pid, "text": text}))
+                # New ids are rare; flush so rows never reference an unwritten id.
+                self._prompts.flush()
+            row[f"{field}_id"] = pid
+
+        meta = {name: row.pop(field) for field, name in SCENARIO_FIELDS.items() if field in row}
+        scenario_id = row.get("scenario_id")
+        if meta and scenario_id not in self._scenario_ids:
+            self._scenario_ids.add(scenario_id)
+            self._scenarios.write(_dump({"scenario_id": scenario_id, **meta}))
+            self._scenarios.flush()
+
+        self._rows.write(_dump(row))
+        self.num_written += 1
+
+    def _close_files(self) -> None:
+        for stream in (self._prompts, self._scenarios, self._rows):
+            stream.close()
+        self._closed = True
+
+    def close(self) -> None:
+        """
+        Flush, fsync and atomically move the output directory into place.
+        """
+        if self._closed:
+            return
+        self._close_files()
+        replace_dir(self.tmp_root, self.root)
+
+    def abort(self) -> None:
+        """
+        Flush and close, but leave the output at the .partial path.
+        """
+        if self._closed:
+            return
+        self._close_files()
+        print(f"[WARN] Left partial output with {self.num_written} records at {self.tmp_root}")
+
+    def __enter__(self) -> "NormalizedRecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def load_lookup_tables(root: str | Path) -> tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
+    """
+    Return (prompt text by id, scenario metadata by scenario_id).
+    """
+    root = Path(root)
+    prompts = {p["id"]: p["text"] for p in _read_jsonl(root / PROMPTS_FILE)}
+    scenarios = {s.pop("scenario_id"): s for s in _read_jsonl(root / SCENARIOS_FILE)}
+    return prompts, scenarios
+
+
+def iter_wide_records(root: str | Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a normalized directory in their original wide form.
+    """
+    root = Path(root)
+    prompts, scenarios = load_lookup_tables(root)
+    reverse_fields = {name: field for field, name in SCENARIO_FIELDS.items()}
+
+    for row in _read_jsonl(root / ROWS_FILE):
+        record: Dict[str, Any] = {}
+        meta = scenarios.get(row.get("scenario_id"))
+        for key, value in row.items():
+            if key.endswith("_prompt_id") and key[: -len("_id")] in PROMPT_FIELDS:
+                record[key[: -len("_id")]] = prompts[value]
+            else:
+                record[key] = value
+            if key == "scenario_id" and meta and "error" not in row:
+                for name, meta_value in meta.items():
+                    record[reverse_fields[name]] = meta_value
+        yield record
+
+
+def load_normalized_df(root: str | Path, wide: bool = False) -> pd.DataFrame:
+    """
+    Load the rows of a normalized directory as a DataFrame.
+
+    Scenario metadata is joined back in under its wide column names; prompt
+    texts stay as ids unless wide=True.
+    """
+    root = Path(root)
+    df = pd.DataFrame.from_records(list(_read_jsonl(root / ROWS_FILE)))
+    prompts, scenarios = load_lookup_tables(root)
+
+    if scenarios and "scenario_id" in df.columns:
+        reverse_fields = {name: field for field, name in SCENARIO_FIELDS.items()}
+        meta = pd.DataFrame.from_dict(scenarios, orient="index").rename(columns=reverse_fields)
+        meta.index.name = "scenario_id"
+        df = df.merge(meta.reset_index(), on="scenario_id", how="left")
+
+    if wide:
+        for field in PROMPT_FIELDS:
+            col = f"{field}_id"
+            if col in df.columns:
+                df[field] = df[col].map(prompts)
+                df = df.drop(columns=[col])
+    return df
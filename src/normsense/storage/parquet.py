@@ -0,0 +1,314 @@
+from __future__ import annotations
+import json
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from .writer import replace_dir, start_partial_dir
+
+
+PARTITION_COLS = ["model_name", "prompt_variant"]
+SCORE_DIMENSIONS = ["politeness", "empathy", "contextual_fit", "overall"]
+
+
+def _pyarrow():
+    """
+    Import pyarrow on first use (it is only needed for Parquet output).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError(
+            "pyarrow is required for Parquet storage. Install it with `pip install pyarrow`."
+        ) from None
+    return pa, pq
+
+
+def is_parquet_path(path: str | Path) -> bool:
+    """
+    True for a .parquet file or a (partitioned) .parquet dataset directory.
+    """
+    return Path(path).suffix == ".parquet"
+
+
+def _to_float(value: Any) -> Optional[float]:
+    # Judges occasionally return scores as strings ("4") or junk.
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_score_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Phase 3 record -> flat row (one column per score dimension).
+    """
+    scores = rec.get("scores") or {}
+    row = {
+        "scenario_id": rec.get("scenario_id"),
+        "scenario_domain": rec.get("scenario_domain"),
+        "scenario_norm_type": rec.get("scenario_norm_type"),
+        "scenario_cultural_tag": rec.get("scenario_cultural_tag"),
+        "scenario_stakes_level": rec.get("scenario_stakes_level"),
+        "model_name": rec.get("model_name"),
+        "prompt_variant": rec.get("prompt_variant"),
+    }
+    for dim in SCORE_DIMENSIONS:
+        row[dim] = _to_float(scores.get(dim))
+    row["rationale"] = scores.get("rationale")
+    row["judge"] = scores.get("judge")
+    row["error"] = scores.get("error")
+    row["timestamp"] = rec.get("timestamp")
+    return row
+
+
+def flatten_response_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Phase 2 record -> flat row; the free-form `raw` payload is kept as JSON text.
+    """
+    row = {
+        "scenario_id": rec.get("scenario_id"),
+        "scenario_domain": rec.get("scenario_domain"),
+        "scenario_norm_type": rec.get("scenario_norm_type"),
+        "scenario_cultural_tag": rec.get("scenario_cultural_tag"),
+        "scenario_stakes_level": rec.get("scenario_stakes_level"),
+        "scenario_prompt_source": rec.get("scenario_prompt_source"),
+        "model_name": rec.get("model_name"),
+        "prompt_variant": rec.get("prompt_variant"),
+        "system_prompt": rec.get("system_prompt"),
+        "user_prompt": rec.get("user_prompt"),
+        "response_text": rec.get("response_text"),
+        "raw": json.dumps(rec["raw"], ensure_ascii=False) if rec.get("raw") is not None else None,
+        "error": rec.get("error"),
+        "timestamp": rec.get("timestamp"),
+    }
+    return row
+
+
+def _schema(kind: str):
+    pa, _ = _pyarrow()
+    if kind == "scores":
+        return pa.schema(
+            [(c, pa.string()) for c in (
+                "scenario_id", "scenario_domain", "scenario_norm_type", "scenario_cultural_tag",
+                "scenario_stakes_level", "model_name", "prompt_variant",
+            )]
+            + [(dim, pa.float32()) for dim in SCORE_DIMENSIONS]
+            + [("rationale", pa.string()), ("judge", pa.string()), ("error", pa.string())]
+            + [("timestamp", pa.float64())]
+        )
+    if kind == "responses":
+        string_cols = [
+            "scenario_id", "scenario_domain", "scenario_norm_type", "scenario_cultural_tag",
+            "scenario_stakes_level", "scenario_prompt_source", "model_name", "prompt_variant",
+            "system_prompt", "user_prompt", "response_text", "raw", "error",
+        ]
+        return pa.schema([(c, pa.string()) for c in string_cols] + [("timestamp", pa.float64())])
+    raise ValueError(f"Unknown record kind: {kind!r} (expected 'scores' or 'responses')")
+
+
+_FLATTEN = {"scores": flatten_score_record, "responses": flatten_response_record}
+
+
+class ParquetRecordWriter:
+    """
+    Buffer Phase 2 / Phase 3 records and write them as a Parquet dataset
+    partitioned by model_name / prompt_variant (hive layout), one file per
+    partition per flushed batch.
+
+    Usable as the `write` callback of the runners:
+        with ParquetRecordWriter(out_dir, kind="scores") as writer:
+            writer.write(record)
+
+    Like RecordWriter, the dataset is written to a hidden .partial-<name>
+    directory and moved into place on a clean close, so a crash never
+    replaces a previous output with a partial one. overwrite=False starts
+    from a copy of the existing dataset and adds to it.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        kind: str,
+        batch_size: int = 50_000,
+        partition_cols: Sequence[str] = PARTITION_COLS,
+        overwrite: bool = True,
+    ) -> None:
+        self.root = Path(root)
+        self.tmp_root = start_partial_dir(self.root, keep_existing=not overwrite)
+        self.kind = kind
+        self.schema = _schema(kind)
+        self.flatten = _FLATTEN[kind]
+        self.batch_size = batch_size
+        self.partition_cols = list(partition_cols)
+        self._rows: List[Dict[str, Any]] = []
+        self.num_written = 0
+        self._closed = False
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._rows.append(self.flatten(record))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        pa, pq = _pyarrow()
+        table = pa.Table.from_pylist(self._rows, schema=self.schema)
+        pq.write_to_dataset(
+            table,
+            root_path=str(self.tmp_root),
+            partition_cols=self.partition_cols,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            compression="zstd",
+        )
+        self.num_written += len(self._rows)
+        self._rows = []
+
+    def close(self) -> None:
+        """
+        Write the last batch and atomically move the dataset into place.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        replace_dir(self.tmp_root, self.root)
+
+    def abort(self) -> None:
+        """
+        Write the last batch, but leave the dataset at the .partial path.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        print(f"[WARN] Left partial output with {self.num_written} records at {self.tmp_root}")
+
+    def __enter__(self) -> "ParquetRecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_parquet_records(
+    path: str | Path,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[List[Any]] = None,
+) -> pd.DataFrame:
+    """
+    Read a Parquet file / dataset into a DataFrame, touching only `columns`.
+    Partition columns come back as pandas categoricals.
+    """
+    _, pq = _pyarrow()
+    table = pq.read_table(
+        str(path),
+        columns=list(columns) if columns is not None else None,
+        filters=filters,
+        partitioning="hive",
+    )
+    return table.to_pandas()
+
+
+def iter_parquet_frames(
+    path: str | Path,
+    columns: Optional[Sequence[str]] = None,
+    batch_size: int = 200_000,
+) -> Iterable[pd.DataFrame]:
+    """
+    Stream a Parquet file / dataset as DataFrames of at most `batch_size`
+    rows, touching only `columns`.
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(str(path), format="parquet", partitioning="hive")
+    for batch in dataset.to_batches(
+        columns=list(columns) if columns is not None else None,
+        batch_size=batch_size,
+    ):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def parquet_column_names(path: str | Path) -> List[str]:
+    """
+    Column names of a Parquet file / dataset (including partition columns),
+    read from the metadata only.
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+
+    return list(ds.dataset(str(path), format="parquet", partitioning="hive").schema.names)
+
+
+def unflatten_score_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flat Parquet row -> Phase 3 record, the inverse of flatten_score_record:
+    the dimensions, rationale, judge and error move back under "scores".
+    Null values are left out, as they are absent from JSONL records.
+    """
+    scores = {}
+    for key in (*SCORE_DIMENSIONS, "rationale", "judge", "error"):
+        value = row.pop(key, None)
+        if value is not None:
+            scores[key] = value
+    record = {k: v for k, v in row.items() if v is not None and k != "timestamp"}
+    record["scores"] = scores
+    record["timestamp"] = row.get("timestamp")
+    return record
+
+
+def unflatten_response_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flat Parquet row -> Phase 2 record, the inverse of flatten_response_record.
+    A null `error` is dropped so `"error" in record` keeps its JSONL meaning.
+    """
+    if row.get("raw") is not None:
+        row["raw"] = json.loads(row["raw"])
+    if row.get("error", 0) is None:
+        del row["error"]
+    return row
+
+
+def iter_parquet_records(
+    path: str | Path,
+    columns: Optional[Sequence[str]] = None,
+    batch_size: int = 10_000,
+) -> Iterable[Dict[str, Any]]:
+    """
+    Stream rows of a Parquet file / dataset as dicts, batch by batch.
+
+    With all columns, rows of a score or response dataset come back in
+    their JSONL record form (see unflatten_score_row / unflatten_response_row);
+    with `columns`, as flat rows.
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(str(path), format="parquet", partitioning="hive")
+    names = set(dataset.schema.names)
+    unflatten = None
+    if columns is None:
+        if "response_text" in names:
+            unflatten = unflatten_response_row
+        elif set(SCORE_DIMENSIONS) <= names:
+            unflatten = unflatten_score_row
+    for batch in dataset.to_batches(
+        columns=list(columns) if columns is not None else None,
+        batch_size=batch_size,
+    ):
+        for row in batch.to_pylist():
+            yield unflatten(row) if unflatten is not None else row
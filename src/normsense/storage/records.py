@@ -0,0 +1,103 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator
+
+from .files import base_name, iter_jsonl, with_compression
+from .writer import RecordWriter
+
+OUTPUT_FORMATS = ["jsonl", "parquet", "normalized"]
+
+RecordSink = Callable[[Dict[str, Any]], None]
+
+
+def output_path(path: str | Path, fmt: str, compression: str | None = None) -> Path:
+    """
+    Map the default .jsonl artifact path to the path used for `fmt`
+    (a .parquet dataset directory for Parquet, a .normalized directory for
+    the normalized layout). `compression` ("gz" / "zst") applies to JSONL.
+    """
+    path = Path(path)
+    plain = path.with_name(base_name(path))
+    if fmt == "parquet":
+        return plain.with_suffix(".parquet")
+    if fmt == "normalized":
+        return plain.with_suffix(".normalized")
+    if compression is not None:
+        return with_compression(plain, compression)
+    return path
+
+
+def detect_format(path: str | Path) -> str:
+    """
+    Storage format of an artifact path; .jsonl.gz / .jsonl.zst count as JSONL.
+    """
+    suffix = Path(path).suffix
+    if suffix == ".parquet":
+        return "parquet"
+    if suffix == ".normalized":
+        return "normalized"
+    return "jsonl"
+
+
+@contextmanager
+def record_sink(
+    path: str | Path,
+    fmt: str = "jsonl",
+    kind: str = "responses",
+    index: bool = False,
+) -> Iterator[RecordSink]:
+    """
+    Open an output for Phase 2 ("responses") or Phase 3 ("scores") records
+    and yield a `write(record)` callable. index=True also writes a sidecar
+    offset index for JSONL output (see storage.index).
+    """
+    path = Path(path)
+    if fmt == "parquet":
+        from .parquet import ParquetRecordWriter
+
+        with ParquetRecordWriter(path, kind=kind) as writer:
+            yield writer.write
+        return
+
+    if fmt == "normalized":
+        from .normalized import NormalizedRecordWriter
+
+        with NormalizedRecordWriter(path) as writer:
+            yield writer.write
+        return
+
+    if fmt != "jsonl":
+        raise ValueError(f"Unknown output format {fmt!r}. Expected one of {OUTPUT_FORMATS}")
+
+    if index:
+        from .index import IndexedJsonlWriter
+
+        with IndexedJsonlWriter(path) as writer:
+            yield writer.write
+        return
+
+    with RecordWriter(path) as writer:
+        yield writer.write
+
+
+def iter_records(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream Phase 2 / Phase 3 records in their wide (JSONL) form from any
+    supported storage format.
+    """
+    path = Path(path)
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        from .parquet import iter_parquet_records
+
+        yield from iter_parquet_records(path)
+        return
+
+    if fmt == "normalized":
+        from .normalized import iter_wide_records
+
+        yield from iter_wide_records(path)
+        return
+
+    yield from iter_jsonl(path)
@@ -0,0 +1,373 @@
+from __future__ import annotations
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from normsense.scenarios import Scenario
+
+
+SCORE_DIMENSIONS = ["politeness", "empathy", "contextual_fit", "overall"]
+FACETS = ["domain", "norm_type", "cultural_tag", "stakes_level"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    label       TEXT,
+    meta        TEXT,
+    created_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    run_id        TEXT NOT NULL,
+    scenario_id   TEXT NOT NULL,
+    domain        TEXT,
+    norm_type     TEXT,
+    cultural_tag  TEXT,
+    stakes_level  TEXT,
+    prompt_source TEXT,
+    text          TEXT,
+    PRIMARY KEY (run_id, scenario_id)
+);
+CREATE TABLE IF NOT EXISTS responses (
+    run_id         TEXT NOT NULL,
+    scenario_id    TEXT NOT NULL,
+    prompt_variant TEXT NOT NULL,
+    model_name     TEXT NOT NULL,
+    response_text  TEXT,
+    error          TEXT,
+    timestamp      REAL,
+    PRIMARY KEY (run_id, scenario_id, prompt_variant, model_name)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id         TEXT NOT NULL,
+    scenario_id    TEXT NOT NULL,
+    prompt_variant TEXT NOT NULL,
+    model_name     TEXT NOT NULL,
+    politeness     REAL,
+    empathy        REAL,
+    contextual_fit REAL,
+    overall        REAL,
+    rationale      TEXT,
+    error          TEXT,
+    timestamp      REAL,
+    PRIMARY KEY (run_id, scenario_id, prompt_variant, model_name)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_model ON scores (model_name, prompt_variant);
+CREATE INDEX IF NOT EXISTS idx_scores_variant ON scores (prompt_variant);
+CREATE INDEX IF NOT EXISTS idx_responses_model ON responses (model_name, prompt_variant);
+CREATE INDEX IF NOT EXISTS idx_scenarios_domain ON scenarios (domain);
+CREATE INDEX IF NOT EXISTS idx_scenarios_norm_type ON scenarios (norm_type);
+CREATE INDEX IF NOT EXISTS idx_scenarios_cultural_tag ON scenarios (cultural_tag);
+CREATE INDEX IF NOT EXISTS idx_scenarios_stakes_level ON scenarios (stakes_level);
+"""
+
+# Columns usable in group_by / where, qualified for the scores-scenarios join.
+_COLUMNS = {
+    "run_id": "s.run_id",
+    "scenario_id": "s.scenario_id",
+    "model_name": "s.model_name",
+    "prompt_variant": "s.prompt_variant",
+    **{facet: f"c.{facet}" for facet in FACETS},
+}
+
+_STATS = ["mean", "std", "min", "max"]
+
+# Phase 2 record field -> scenarios column
+_RECORD_FACETS = {
+    "scenario_domain": "domain",
+    "scenario_norm_type": "norm_type",
+    "scenario_cultural_tag": "cultural_tag",
+    "scenario_stakes_level": "stakes_level",
+    "scenario_prompt_source": "prompt_source",
+}
+
+Where = Dict[str, Any]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    # Judges occasionally return scores as strings ("4") or junk.
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def _column(name: str) -> str:
+    try:
+        return _COLUMNS[name]
+    except KeyError:
+        raise ValueError(f"Unknown column {name!r}. Expected one of {sorted(_COLUMNS)}") from None
+
+
+def _filters(runs: Optional[Sequence[str]], where: Optional[Where]) -> Tuple[str, List[Any]]:
+    """
+    SQL conditions for a run selection plus {column: value or [values]}.
+    """
+    conditions: List[str] = []
+    params: List[Any] = []
+    clauses = dict(where or {})
+    if runs is not None:
+        clauses["run_id"] = list(runs)
+    for name, value in clauses.items():
+        col = _column(name)
+        if isinstance(value, (list, tuple, set)):
+            values = [_enum_value(v) for v in value]
+            conditions.append(f"{col} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        else:
+            conditions.append(f"{col} = ?")
+            params.append(_enum_value(value))
+    return " AND ".join(conditions), params
+
+
+class ResultsStore:
+    """
+    Analytical store of scenarios, responses and scores from many runs in
+    one SQLite file, keyed by run_id and indexed by model, variant and the
+    scenario facets (domain, norm_type, cultural_tag, stakes_level).
+
+    Re-ingesting a run replaces its rows. Aggregations run as SQL GROUP BY
+    queries, so only the grouped result is loaded into pandas.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60.0, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # --- ingest -------------------------------------------------------------
+
+    def add_run(self, run_id: str, label: str | None = None, meta: Dict[str, Any] | None = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO runs (run_id, label, meta, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET "
+                "label = COALESCE(excluded.label, label), meta = COALESCE(excluded.meta, meta)",
+                (run_id, label, json.dumps(meta) if meta is not None else None, time.time()),
+            )
+
+    def _ensure_run(self, conn: sqlite3.Connection, run_id: str) -> None:
+        conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, created_at) VALUES (?, ?)",
+            (run_id, time.time()),
+        )
+
+    def ingest_scenarios(self, run_id: str, scenarios: Iterable[Scenario]) -> int:
+        rows = (
+            (
+                run_id, s.id, _enum_value(s.domain), _enum_value(s.norm_type),
+                s.cultural_tag, s.stakes_level, s.prompt_source, s.text,
+            )
+            for s in scenarios
+        )
+        with self._transaction() as conn:
+            self._ensure_run(conn, run_id)
+            cur = conn.executemany("INSERT OR REPLACE INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return cur.rowcount
+
+    def ingest_responses(self, run_id: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Ingest Phase 2 records. Scenario facets carried on the records fill
+        in scenarios that were not ingested explicitly.
+        """
+        facets: Dict[str, Tuple[Any, ...]] = {}
+
+        def rows():
+            for record in records:
+                if "scenario_domain" in record:
+                    facets[record["scenario_id"]] = tuple(record.get(f) for f in _RECORD_FACETS)
+                yield (
+                    run_id, record["scenario_id"], record["prompt_variant"], record["model_name"],
+                    record.get("response_text"), record.get("error"), record.get("timestamp"),
+                )
+
+        with self._transaction() as conn:
+            self._ensure_run(conn, run_id)
+            cur = conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)", rows())
+            conn.executemany(
+                "INSERT OR IGNORE INTO scenarios "
+                "(run_id, scenario_id, domain, norm_type, cultural_tag, stakes_level, prompt_source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, scenario_id, *values) for scenario_id, values in facets.items()],
+            )
+        return cur.rowcount
+
+    def ingest_scores(self, run_id: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Ingest Phase 3 records. Like ingest_responses, scenario facets
+        carried on the records fill in missing scenarios.
+        """
+        facets: Dict[str, Tuple[Any, ...]] = {}
+
+        def rows():
+            for record in records:
+                if "scenario_domain" in record:
+                    facets[record["scenario_id"]] = tuple(record.get(f) for f in _RECORD_FACETS)
+                scores = record.get("scores") or {}
+                yield (
+                    run_id, record["scenario_id"], record["prompt_variant"], record["model_name"],
+                    *(_to_float(scores.get(dim)) for dim in SCORE_DIMENSIONS),
+                    scores.get("rationale"), scores.get("error"), record.get("timestamp"),
+                )
+
+        with self._transaction() as conn:
+            self._ensure_run(conn, run_id)
+            cur = conn.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows()
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO scenarios "
+                "(run_id, scenario_id, domain, norm_type, cultural_tag, stakes_level, prompt_source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, scenario_id, *values) for scenario_id, values in facets.items()],
+            )
+        return cur.rowcount
+
+    def delete_run(self, run_id: str) -> None:
+        with self._transaction() as conn:
+            for table in ("scores", "responses", "scenarios", "runs"):
+                conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    # --- queries ------------------------------------------------------------
+
+    def runs(self) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT r.run_id, r.label, r.created_at, "
+            "(SELECT COUNT(*) FROM responses WHERE run_id = r.run_id) AS num_responses, "
+            "(SELECT COUNT(*) FROM scores WHERE run_id = r.run_id) AS num_scores "
+            "FROM runs r ORDER BY r.created_at",
+            self.conn,
+        )
+
+    def aggregate(
+        self,
+        group_by: Sequence[str] = ("model_name", "prompt_variant"),
+        runs: Optional[Sequence[str]] = None,
+        where: Optional[Where] = None,
+        metrics: Sequence[str] = SCORE_DIMENSIONS,
+        stats: Sequence[str] = ("mean",),
+    ) -> pd.DataFrame:
+        """
+        Score statistics per group, computed in SQL over judge-successful rows.
+
+        group_by / where take run_id, scenario_id, model_name, prompt_variant
+        and the facets; `where` values may be a single value or a list.
+        Returns the group columns, n, and {metric}_{stat} for each stat in
+        mean / std / min / max.
+        """
+        for stat in stats:
+            if stat not in _STATS:
+                raise ValueError(f"Unknown stat {stat!r}. Expected one of {_STATS}")
+        for metric in metrics:
+            if metric not in SCORE_DIMENSIONS:
+                raise ValueError(f"Unknown metric {metric!r}. Expected one of {SCORE_DIMENSIONS}")
+
+        group_cols = [_column(name) for name in group_by]
+        select = [f"{col} AS {name}" for col, name in zip(group_cols, group_by)]
+        select.append("COUNT(s.scenario_id) AS n")
+        for metric in metrics:
+            col = f"s.{metric}"
+            if "mean" in stats or "std" in stats:
+                select.append(f"AVG({col}) AS {metric}_mean")
+            if "std" in stats:
+                # SQLite has no STDDEV; finish from the per-group sums below.
+                select += [f"COUNT({col}) AS {metric}__n", f"AVG({col} * {col}) AS {metric}__sq"]
+            if "min" in stats:
+                select.append(f"MIN({col}) AS {metric}_min")
+            if "max" in stats:
+                select.append(f"MAX({col}) AS {metric}_max")
+
+        conditions, params = _filters(runs, where)
+        sql = (
+            f"SELECT {', '.join(select)} FROM scores s "
+            "LEFT JOIN scenarios c ON c.run_id = s.run_id AND c.scenario_id = s.scenario_id "
+            "WHERE s.error IS NULL"
+        )
+        if conditions:
+            sql += f" AND {conditions}"
+        if group_cols:
+            sql += f" GROUP BY {', '.join(group_cols)} ORDER BY {', '.join(group_cols)}"
+        df = pd.read_sql_query(sql, self.conn, params=params)
+
+        if "std" in stats:
+            for metric in metrics:
+                n = df.pop(f"{metric}__n")
+                var = (df.pop(f"{metric}__sq") - df[f"{metric}_mean"] ** 2).clip(lower=0)
+                # Sample standard deviation, as pandas' .std()
+                df[f"{metric}_std"] = (var * n / (n - 1)).where(n > 1) ** 0.5
+            if "mean" not in stats:
+                df = df.drop(columns=[f"{m}_mean" for m in metrics])
+        return df
+
+    def scores(
+        self,
+        runs: Optional[Sequence[str]] = None,
+        where: Optional[Where] = None,
+        include_errors: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Score rows joined with their scenario facets.
+        """
+        conditions, params = _filters(runs, where)
+        sql = (
+            "SELECT s.run_id, s.scenario_id, s.model_name, s.prompt_variant, "
+            + ", ".join(f"c.{facet}" for facet in FACETS) + ", "
+            + ", ".join(f"s.{dim}" for dim in SCORE_DIMENSIONS)
+            + ", s.rationale, s.error FROM scores s "
+            "LEFT JOIN scenarios c ON c.run_id = s.run_id AND c.scenario_id = s.scenario_id"
+        )
+        clauses = [] if include_errors else ["s.error IS NULL"]
+        if conditions:
+            clauses.append(conditions)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def responses(
+        self,
+        runs: Optional[Sequence[str]] = None,
+        where: Optional[Where] = None,
+    ) -> pd.DataFrame:
+        """
+        Response rows joined with their scenario facets.
+        """
+        conditions, params = _filters(runs, where)
+        sql = (
+            "SELECT s.run_id, s.scenario_id, s.model_name, s.prompt_variant, "
+            + ", ".join(f"c.{facet}" for facet in FACETS)
+            + ", s.response_text, s.error FROM responses s "
+            "LEFT JOIN scenarios c ON c.run_id = s.run_id AND c.scenario_id = s.scenario_id"
+        )
+        if conditions:
+            sql += f" WHERE {conditions}"
+        return pd.read_sql_query(sql, self.conn, params=params)
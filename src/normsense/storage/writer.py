@@ -0,0 +1,236 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .files import open_binary
+
+
+def partial_path(path: str | Path) -> Path:
+    """
+    Temp file a RecordWriter fills before the final rename. The prefix keeps
+    the compression suffix, so .gz / .zst output is compressed as it streams.
+    """
+    path = Path(path)
+    return path.with_name(f".partial-{path.name}")
+
+
+def _fsync(stream) -> None:
+    try:
+        os.fsync(stream.fileno())
+    except (AttributeError, OSError, ValueError):
+        # Some codec wrappers do not expose a file descriptor.
+        pass
+
+
+def _fsync_path(path: Path) -> None:
+    # Directories too, so a rename survives a power loss (POSIX only).
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def start_partial_dir(path: str | Path, keep_existing: bool = False) -> Path:
+    """
+    Create the .partial-<name> directory a directory-shaped output (Parquet
+    dataset, normalized layout) is written into before replace_dir() moves it
+    into place. With keep_existing it starts as a copy of the current output,
+    for writers that append. A stale partial directory from a crashed run is
+    discarded.
+    """
+    path = Path(path)
+    tmp = partial_path(path)
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if keep_existing and path.exists():
+        shutil.copytree(path, tmp)
+    else:
+        tmp.mkdir()
+    return tmp
+
+
+def replace_dir(tmp: Path, path: Path) -> None:
+    """
+    Fsync a finished partial directory and move it to `path`. os.replace() cannot replace
+    a non-empty directory, so a previous output is first renamed aside and
+    only deleted once the new one is in place; a crash in between leaves it
+    at .old-<name>.
+    """
+    for dirpath, _, filenames in os.walk(tmp):
+        for name in filenames:
+            _fsync_path(Path(dirpath) / name)
+        _fsync_path(Path(dirpath))
+    old = None
+    if path.exists():
+        old = path.with_name(f".old-{path.name}")
+        if old.exists():
+            shutil.rmtree(old)
+        os.replace(path, old)
+    os.replace(tmp, path)
+    _fsync_path(path.parent)
+    if old is not None:
+        shutil.rmtree(old)
+
+
+class RecordWriter:
+    """
+    Buffered, crash-safe JSONL writer shared by the pipeline scripts.
+
+    Records are buffered in memory and written in blocks once
+    `flush_records` records or `flush_bytes` bytes are pending, or
+    `flush_seconds` have passed (a background thread also flushes idle
+    buffers). The file is fsynced at most every `fsync_seconds`.
+
+    Output goes to a hidden .partial-<name> file that is fsynced and
+    atomically renamed to `path` on a clean close, so the final path never
+    holds a half-written artifact. If the `with` block raises, the partial
+    file is kept (flushed) for inspection and the final path is untouched.
+
+    write() is thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        flush_records: int = 1000,
+        flush_bytes: int = 1 << 20,
+        flush_seconds: float = 5.0,
+        fsync_seconds: float = 30.0,
+    ) -> None:
+        self.path = Path(path)
+        self.tmp_path = partial_path(self.path)
+        self.flush_records = flush_records
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.fsync_seconds = fsync_seconds
+        self.num_written = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._stream = self._open_stream()
+        self._lock = threading.Lock()
+        # (encoded line, work key or None)
+        self._pending: List[Tuple[bytes, Any]] = []
+        self._pending_bytes = 0
+        self._last_flush = self._last_fsync = time.monotonic()
+        self._closed = False
+
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_seconds > 0:
+            self._flusher = threading.Thread(target=self._flush_idle, name="record-writer-flush", daemon=True)
+            self._flusher.start()
+
+    def _open_stream(self):
+        return open_binary(self.tmp_path, "wb")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.write_line(json.dumps(record, ensure_ascii=False))
+
+    def write_line(self, line: str, key: Any = None) -> None:
+        """
+        Write one already-serialized JSON line (without the newline).
+        """
+        data = (line + "\n").encode("utf-8")
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"RecordWriter for {self.path} is closed")
+            self._pending.append((data, key))
+            self._pending_bytes += len(data)
+            self.num_written += 1
+            if (
+                len(self._pending) >= self.flush_records
+                or self._pending_bytes >= self.flush_bytes
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            ):
+                self._flush_locked()
+
+    def _flush_locked(self, fsync: bool = False) -> None:
+        if self._pending:
+            self._write_block(self._pending)
+            self._pending, self._pending_bytes = [], 0
+        self._stream.flush()
+        # io.BufferedWriter.flush() does not flush a .gz / .zst codec stream
+        # underneath it; without this, flushed records sit in the compressor.
+        raw = getattr(self._stream, "raw", None)
+        if raw is not None:
+            raw.flush()
+        now = time.monotonic()
+        self._last_flush = now
+        if fsync or now - self._last_fsync >= self.fsync_seconds:
+            _fsync(self._stream)
+            self._last_fsync = now
+
+    def _write_block(self, entries: List[Tuple[bytes, Any]]) -> None:
+        # One write per block; only whole lines ever reach the file.
+        self._stream.write(b"".join(data for data, _ in entries))
+
+    def _finish_stream(self) -> None:
+        # Hook for writers that keep an open compressed block across flushes.
+        pass
+
+    def flush(self, fsync: bool = False) -> None:
+        with self._lock:
+            if not self._closed:
+                self._flush_locked(fsync=fsync)
+
+    def _flush_idle(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_seconds:
+                    self._flush_locked()
+
+    def _shutdown(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._finish_stream()
+            self._closed = True
+            # Closing writes the codec trailer; fsync what is on disk after that.
+            self._stream.close()
+            _fsync_path(self.tmp_path)
+
+    def close(self) -> None:
+        """
+        Flush, fsync and atomically move the output into place.
+        """
+        if self._closed:
+            return
+        self._shutdown()
+        os.replace(self.tmp_path, self.path)
+        _fsync_path(self.path.parent)
+
+    def abort(self) -> None:
+        """
+        Flush and close, but leave the output at the .partial path.
+        """
+        if self._closed:
+            return
+        self._shutdown()
+        print(f"[WARN] Left partial output with {self.num_written} records at {self.tmp_path}")
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,292 @@
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT    NOT NULL,
+    task_key      TEXT    NOT NULL,
+    payload       TEXT    NOT NULL,
+    status        TEXT    NOT NULL DEFAULT 'pending',
+    worker_id     TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    result        TEXT,
+    error         TEXT,
+    created_at    REAL    NOT NULL,
+    finished_at   REAL,
+    UNIQUE (kind, task_key)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (kind, status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_tasks_finished ON tasks (status, finished_at);
+"""
+
+# (kind, task_key, payload) for tasks enqueued together with a completion
+FollowUp = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass
+class Task:
+    id: int
+    kind: str
+    key: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class WorkQueue:
+    """
+    Durable lease-based task queue in a single SQLite file.
+
+    Workers lease pending tasks for `lease_seconds`; a task whose lease
+    expires (worker killed / preempted) goes back to pending on the next
+    lease call, up to `max_attempts` times. Completing a task is only
+    accepted from the worker currently holding the lease, so each task's
+    result is recorded exactly once.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit mode; writes use explicit BEGIN IMMEDIATE transactions.
+        self.conn = sqlite3.connect(str(self.path), timeout=60.0, isolation_level=None)
+        self.conn.execute("PRAGMA busy_timeout = 60000")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _insert(self, conn: sqlite3.Connection, tasks: Iterable[FollowUp]) -> int:
+        now = time.time()
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO tasks (kind, task_key, payload, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (kind, key, json.dumps(payload, ensure_ascii=False), now)
+                for kind, key, payload in tasks
+            ),
+        )
+        return cur.rowcount
+
+    def enqueue_many(self, tasks: Iterable[FollowUp]) -> int:
+        """
+        Add tasks; already-known (kind, key) pairs are ignored, so
+        re-initialising a queue is safe. Returns the number of new tasks.
+        """
+        with self._transaction() as conn:
+            return self._insert(conn, tasks)
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', worker_id = NULL, lease_expires = NULL, "
+            "error = 'lease expired too many times', finished_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now,),
+        )
+
+    def lease(
+        self,
+        kind: str | Iterable[str],
+        worker_id: str,
+        limit: int = 1,
+        lease_seconds: float | None = None,
+    ) -> List[Task]:
+        """
+        Lease up to `limit` pending tasks of the given kind(s).
+        """
+        kinds = [kind] if isinstance(kind, str) else list(kind)
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        now = time.time()
+        marks = ",".join("?" * len(kinds))
+
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+            rows = conn.execute(
+                f"SELECT id, kind, task_key, payload, attempts FROM tasks "
+                f"WHERE status = 'pending' AND kind IN ({marks}) ORDER BY id LIMIT ?",
+                (*kinds, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker_id = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(worker_id, now + lease_seconds, row[0]) for row in rows],
+            )
+
+        return [
+            Task(id=row[0], kind=row[1], key=row[2], payload=json.loads(row[3]), attempts=row[4] + 1)
+            for row in rows
+        ]
+
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: float | None = None) -> bool:
+        """
+        Extend a lease. Returns False if the lease was lost.
+        """
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET lease_expires = ? "
+                "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (time.time() + lease_seconds, task_id, worker_id),
+            )
+        return cur.rowcount == 1
+
+    @contextmanager
+    def keep_leased(self, task_id: int, worker_id: str, interval: float | None = None) -> Iterator[None]:
+        """
+        Renew a task's lease every `interval` seconds (a third of the lease by
+        default) from a background thread while the block runs, so long tasks
+        are not re-leased to other workers. The thread uses its own connection.
+        """
+        interval = self.lease_seconds / 3 if interval is None else interval
+        stop = threading.Event()
+
+        def renew() -> None:
+            with WorkQueue(self.path, self.lease_seconds, self.max_attempts) as queue:
+                while not stop.wait(interval):
+                    if not queue.heartbeat(task_id, worker_id):
+                        print(f"[WARN] Lost the lease on task {task_id}")
+                        return
+
+        thread = threading.Thread(target=renew, name=f"lease-{task_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(
+        self,
+        task_id: int,
+        worker_id: str,
+        result: Dict[str, Any],
+        follow_up: Iterable[FollowUp] = (),
+    ) -> bool:
+        """
+        Store a task's result and enqueue follow-up tasks atomically.
+        Returns False (and records nothing) if the lease was lost meanwhile.
+        """
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, finished_at = ?, "
+                "lease_expires = NULL WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (json.dumps(result, ensure_ascii=False), time.time(), task_id, worker_id),
+            )
+            if cur.rowcount != 1:
+                return False
+            self._insert(conn, follow_up)
+        return True
+
+    def fail(self, task_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Release a task after an error: back to pending while attempts remain.
+        """
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET "
+                "status = CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "finished_at = CASE WHEN ? AND attempts < ? THEN NULL ELSE ? END, "
+                "error = ?, worker_id = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (
+                    retry, self.max_attempts,
+                    retry, self.max_attempts, time.time(),
+                    error, task_id, worker_id,
+                ),
+            )
+        return cur.rowcount == 1
+
+    def stats(self, window_seconds: float = 60.0) -> Dict[str, Any]:
+        """
+        Queue depth per kind and status, plus completions per second over
+        the last `window_seconds`.
+        """
+        now = time.time()
+        depth: Dict[str, Dict[str, int]] = {}
+        for kind, status, n in self.conn.execute(
+            "SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"
+        ):
+            depth.setdefault(kind, {})[status] = n
+        (recent,) = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = 'done' AND finished_at >= ?",
+            (now - window_seconds,),
+        ).fetchone()
+        return {
+            "depth": depth,
+            "done_last_window": recent,
+            "throughput_per_s": recent / window_seconds if window_seconds else 0.0,
+        }
+
+    def outstanding(self, kind: str | Iterable[str] | None = None) -> int:
+        """
+        Number of pending or leased tasks (of the given kinds).
+        """
+        query = "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')"
+        params: Tuple[Any, ...] = ()
+        if kind is not None:
+            kinds = [kind] if isinstance(kind, str) else list(kind)
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params = tuple(kinds)
+        (n,) = self.conn.execute(query, params).fetchone()
+        return n
+
+    def iter_results(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """
+        Results of finished tasks of one kind, in task order.
+        """
+        for (result,) in self.conn.execute(
+            "SELECT result FROM tasks WHERE kind = ? AND status = 'done' ORDER BY id",
+            (kind,),
+        ):
+            yield json.loads(result)
+
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT status, result, error, attempts FROM tasks WHERE kind = ? AND task_key = ?",
+            (kind, key),
+        ).fetchone()
+        if row is None:
+            return None
+        status, result, error, attempts = row
+        return {
+            "status": status,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "attempts": attempts,
+        }